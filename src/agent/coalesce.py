@@ -0,0 +1,151 @@
+import os
+import json
+import asyncio
+import hashlib
+import threading
+from typing import AsyncIterator, Callable, Optional
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+
+def is_coalescing_enabled() -> bool:
+    """Identical runs share one execution unless AGENT_COALESCE_DISABLED=1."""
+    return os.getenv("AGENT_COALESCE_DISABLED", "0") != "1"
+
+
+def normalize_query(query: str) -> str:
+    """Case and whitespace do not change what the agent builds."""
+    return " ".join(query.lower().split())
+
+
+def run_key(query: str, options: dict) -> Optional[str]:
+    """
+    The key identical runs share: the normalized query plus every option
+    that changes the graph or its output (models are fixed per node in
+    agent/llm.py). None for runs that must stay on their own, because the
+    caller chose the thread or collects the metrics.
+    """
+    if options.get("thread_id") or options.get("metrics") is not None:
+        return None
+    payload = json.dumps([normalize_query(query), options], sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SharedRun:
+    """
+    One execution of an event stream with any number of subscribers.
+    Events are kept, so a subscriber that attaches late first gets
+    everything it missed (the run info, logs and files so far), then
+    follows live. The run is cancelled when its last subscriber leaves.
+    """
+
+    def __init__(self, events: AsyncIterator[dict], on_done: Callable[["SharedRun"], None]):
+        self.history = []
+        self.subscribers = 0
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._on_done = on_done
+        self._changed = asyncio.Event()
+        self._task = asyncio.ensure_future(self._pump(events))
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _pump(self, events: AsyncIterator[dict]):
+        try:
+            async for event in events:
+                self.history.append(event)
+                self._notify()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+        except Exception as e:
+            self.error = e
+        finally:
+            self.done = True
+            self._on_done(self)
+            self._notify()
+
+    async def events(self) -> AsyncIterator[dict]:
+        """Yields every event of the run, from the first one."""
+        index = 0
+        while True:
+            changed = self._changed
+            if index < len(self.history):
+                index += 1
+                yield self.history[index - 1]
+                continue
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await changed.wait()
+
+    def leave(self):
+        """Called when a subscriber stops listening."""
+        self.subscribers -= 1
+        if self.subscribers == 0 and not self.done:
+            # Nobody is watching anymore: stop like an unshared run would
+            self._on_done(self)
+            self._task.cancel()
+
+
+class RunCoalescer:
+    """
+    Single-flight for agent runs: while a run for a key is in progress,
+    another request with the same key attaches to it instead of starting
+    a second planner -> architect -> coder pipeline. It receives
+    {"coalesced": {"subscribers": n}} first, then the run's events.
+    """
+
+    def __init__(self):
+        self._runs = {}  # key -> SharedRun
+        self.started = 0
+        self.attached = 0
+
+    def astream(self, key: Optional[str], start: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+        if key is None:
+            return start()
+        return self._astream(key, start)
+
+    async def _astream(self, key: str, start: Callable[[], AsyncIterator[dict]]) -> AsyncIterator[dict]:
+        run = self._runs.get(key)
+        if run is None:
+            self.started += 1
+            run = SharedRun(start(), on_done=lambda done: self._forget(key, done))
+            self._runs[key] = run
+        run.subscribers += 1
+        try:
+            if run.subscribers > 1:
+                self.attached += 1
+                logger.info("Attached to the run in progress for the same request.")
+                yield {"coalesced": {"subscribers": run.subscribers}}
+            async for event in run.events():
+                yield event
+        finally:
+            run.leave()
+
+    def _forget(self, key: str, run: SharedRun):
+        if self._runs.get(key) is run:
+            del self._runs[key]
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._runs)
+
+
+# -- Shared coalescer --
+
+_coalescer: Optional[RunCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def get_run_coalescer() -> RunCoalescer:
+    """The process-wide coalescer (lives on the shared event loop)."""
+    global _coalescer
+    if _coalescer is None:
+        with _coalescer_lock:
+            if _coalescer is None:
+                _coalescer = RunCoalescer()
+    return _coalescer
@@ -1,56 +1,159 @@
+import time
+import uuid
+import asyncio
+from typing import List
+from functools import lru_cache
+from langchain_core.runnables import RunnableConfig, RunnableLambda
 from langgraph.graph import StateGraph, START, END
+from langgraph.types import Send, Overwrite
 from agent.state import AgentState
-from nodes.project_planner import run_project_planner
-from nodes.file_architect import run_file_architect
-from nodes.coder_loop import run_code, run_critic
-from core.store import save_workspace_to_disk
+from agent.policy import CritiquePolicy, get_critique_policy
+from nodes.project_planner import run_project_planner, arun_project_planner
+from nodes.file_architect import run_file_architect, arun_file_architect
+from nodes.coder_loop import run_code, arun_code, run_critic, arun_critic, route_coder
+from nodes.static_check import run_static_check
+from nodes.plan_memo import run_plan_lookup, route_plan_lookup
+from nodes.fused_planner import run_fused_planner, arun_fused_planner, route_fused_planner
+from core.store import save_workspace_to_disk, get_output_dir, get_workspace_store
+from core.symbols import extract_symbols
+from core.artifacts import get_text, get_texts, put_text, release_run, set_artifact_owner
+from core.dependencies import ready_files, can_start_early
+from core.async_utils import run_sync, iter_sync
+from core.checkpoint import get_checkpointer
+from core.metrics import RunMetrics, get_metrics_path, instrument
+from core.log import get_logger, set_run_id
+
+logger = get_logger(__name__)
+
+# Default number of files coded at the same time in parallel mode
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Safety net against endless loops. Every file takes up to ~12 steps
+# (3-4 x coder/static check/critic + queue handling), so leave room for big projects.
+RECURSION_LIMIT = 250
 
 # -- 1. Define Helper Nodes & Conditional Logic --
 
 
-def commit_code_to_workspace(state: AgentState) -> dict:
+def node(name: str, func, afunc=None) -> RunnableLambda:
     """
-    A simple node to "commit" the perfect code to the final workspace.
+    Wraps a node (and its async version, if it has one), so the graph
+    can run with `stream` as well as `astream`. Every execution is
+    recorded in the run's metrics (see core/metrics.py).
+    """
+    func, afunc = instrument(name, func, afunc)
+    return RunnableLambda(func, afunc=afunc, name=name)
+
+
+def review_outcome_log(state: AgentState, config: RunnableConfig = None) -> str:
     """
-    logs = state.get("logs", [])
+    The log entry explaining why a file is being committed.
+    (Routing edges cannot write to the state, so committing nodes log it.)
+    """
+    if state.get("critique") == "PERFECT":
+        return f"✅ Final review passed for **{state['current_file']}**. Committing code."
+    if get_critique_policy(config).is_acceptable(state.get("critique_severity")):
+        return (
+            f"✅ Only minor issues left in **{state['current_file']}**. "
+            "Committing code."
+        )
+    return (
+        f"⚠️ Max correction attempts reached for **{state['current_file']}**. "
+        "Committing code anyway."
+    )
 
+
+def iteration_summary_log(state: AgentState, config: RunnableConfig = None) -> str:
+    """
+    The log entry with how many rounds a file used out of its budget,
+    and roughly how much time committing early saved.
+    """
     current_file = state["current_file"]
-    current_code = state["current_code_draft"]
+    iterations = state["coder_iterations"]
+    budget = get_critique_policy(config).max_iterations(
+        current_file, get_text(state.get("current_code_draft"))
+    )
+
+    summary = f"📊 **{current_file}**: committed after {iterations} of {budget} iterations"
+    started_at = state.get("file_started_at")
+    if started_at and 0 < iterations < budget:
+        # Assume every skipped round would have taken as long as the average one
+        per_iteration = (time.time() - started_at) / iterations
+        summary += f" (~{per_iteration * (budget - iterations):.1f}s saved)"
 
-    # Update the workspace
-    workspace = state["workspace"]
-    workspace[current_file] = current_code
+    logger.info("%s", summary.replace("**", ""))
+    return summary + "."
 
-    print(f"    > Code for {current_file} saved to workspace.")
+
+def persist_committed_file(filename: str, code: str, config: RunnableConfig) -> List[str]:
+    """
+    Streaming mode: writes a committed file to the run's output directory
+    right away (see `get_output_dir`). Returns the log entries for it.
+    A failed write is reported but does not stop the run.
+    """
+    output_dir = get_output_dir(config)
+    if not output_dir:
+        return []
+    try:
+        written = get_workspace_store(output_dir).save_file(filename, code)
+    except (OSError, ValueError) as e:
+        logger.warning("Could not save %s to %s: %s", filename, output_dir, e)
+        return [f"⚠️ Could not save **{filename}** to disk: {e}"]
+    if not written:
+        return [f"💾 **{filename}** is unchanged on disk."]
+    return [f"💾 Saved **{filename}** to `{output_dir}`."]
+
+
+def commit_code_to_workspace(state: AgentState, config: RunnableConfig) -> dict:
+    """
+    A simple node to "commit" the perfect code to the final workspace.
+    """
+    logs = [review_outcome_log(state, config), iteration_summary_log(state, config)]
+
+    current_file = state["current_file"]
+    current_code = get_text(state["current_code_draft"])
+
+    logger.info("Code for %s saved to workspace.", current_file)
     logs.append(f"✅ Code for **{current_file}** saved to workspace.")
+    logs.extend(persist_committed_file(current_file, current_code, config))
 
     # Clear the loop variables
     return {
-        "workspace": workspace,
+        # Merged into the workspace by its reducer (as an artifact ref)
+        "workspace": {current_file: put_text(current_code)},
+        # Later files see what this one defines
+        "symbol_index": {current_file: extract_symbols(current_file, current_code)},
         "current_file": None,
         "current_code_draft": None,
         "critique": None,
+        "critique_severity": None,
+        "file_started_at": None,
         "coder_iterations": 0,
         "logs": logs,
     }
 
 
+def file_queue_check_node(state: AgentState) -> dict:
+    """
+    Reports the state of the file queue before routing.
+    """
+    if not state["files_to_code_queue"]:
+        return {"logs": ["✅ All files generated. Project complete."]}
+    return {"logs": ["📁 Files remaining. Moving to next file..."]}
+
+
 def decide_which_file_to_code(state: AgentState) -> str:
     """
     This is our first conditional edge.
     It *only* checks the file queue to decide the next step.
     It does *not* modify the state.
     """
-    logs = state.get("logs", [])
-
     if not state["files_to_code_queue"]:
         # The queue is empty, we are done!
-        print("    > Queue empty. Ending graph.")
-        logs.append("✅ All files generated. Project complete.")
+        logger.debug("Queue empty. Ending graph.")
         return "END"
     else:
-        print(f"    > Queue has files. Preparing next file.")
-        logs.append("📁 Files remaining. Moving to next file...")
+        logger.debug("Queue has files. Preparing next file.")
         return "prepare_next_file"
 
 
@@ -60,95 +163,426 @@ def prepare_next_file_node(state: AgentState) -> dict:
     It pops a file from the queue, sets 'current_file',
     and resets the coder loop variables.
     """
-    print(f"--- 2c. PREPARING NEXT FILE ---")
-    logs = state.get("logs", [])
+    logger.debug("Preparing next file")
+    logs = []
 
-    # Get the queue from the state
-    queue = state["files_to_code_queue"]
-    # Pop the next file
-    next_file = queue.pop(0)
+    # Take the next file off the queue
+    next_file = state["files_to_code_queue"][0]
 
     logs.append(f"🧩 Preparing next file: **{next_file}**")
 
-    print(f"    > Next file to code: {next_file}")
+    logger.info("Next file to code: %s", next_file)
 
     return {
-        "files_to_code_queue": queue,
+        "files_to_code_queue": [next_file],
         "current_file": next_file,
         "coder_iterations": 0,
         "critique": None,
+        "critique_severity": None,
         "current_code_draft": None,
+        "draft_stopped_early": False,
+        "partial_critique": None,
+        "file_started_at": time.time(),
         "logs": logs,
     }
 
 
-def check_critique(state: AgentState) -> str:
+def check_critique(state: AgentState, config: RunnableConfig) -> str:
     """
     This is our second conditional edge.
-    It checks the critic's output and routes to the correct node.
+    It checks the critic's output and routes to the correct node,
+    following the critique policy passed in the config.
     """
-    print(f"--- 3c. CHECKING CRITIQUE ---")
-    logs = state.get("logs", [])
-
+    policy = get_critique_policy(config)
     critique = state.get("critique")
+    severity = state.get("critique_severity")
     iterations = state["coder_iterations"]
 
-    print(f"--- After 3c. checking critique {critique}")
+    logger.debug(
+        "Checking critique (%s) for %s: %s", severity, state["current_file"], critique
+    )
+
+    if critique == "PERFECT":
+        logger.debug("Critique is PERFECT. Committing code.")
+        return "commit_code"
+
+    # Not worth another round (e.g. only cosmetic issues)
+    if policy.is_acceptable(severity):
+        logger.debug("Only %s issues left. Committing code.", severity)
+        return "commit_code"
 
     # Safety check to prevent infinite loops
-    if iterations > 2:
-        logs.append(
-            f"⚠️ Max correction attempts reached for **{state['current_file']}**. Committing code anyway."
-        )
-        print(f"    > ERROR: Max iterations reached for {state['current_file']}.")
+    budget = policy.max_iterations(state["current_file"], get_text(state.get("current_code_draft")))
+    if iterations >= budget:
+        logger.warning("Max iterations (%d) reached for %s.", budget, state["current_file"])
         return "commit_code"
 
-    if critique == "PERFECT":
-        logs.append(
-            f"✅ Final review passed for **{state['current_file']}**. Committing code."
+    logger.debug("Critique is NOT perfect. Returning to coder.")
+    return "retry_coder"
+
+
+def route_static_check(state: AgentState, config: RunnableConfig) -> str:
+    """
+    Conditional edge after the static checks.
+    Clean drafts go to the LLM critic, anything with a critique (errors, or
+    "PERFECT" for files that need no review) is routed like a critique.
+    """
+    if state.get("critique") is None:
+        return "critic"
+    return check_critique(state, config)
+
+
+def dispatch_files_node(state: AgentState) -> dict:
+    """
+    Picks the next wave for the parallel coding mode: every queued file
+    whose dependencies are already in the workspace.
+    """
+    queue = state.get("files_to_code_queue") or []
+    if not state.get("file_plans"):
+        return {
+            "current_wave": [],
+            "logs": ["⚠️ No file plans available. Nothing to code."],
+        }
+    if not queue:
+        # Every file was coded while the architect was still planning
+        return {"current_wave": [], "logs": ["✅ All files generated. Project complete."]}
+
+    wave = ready_files(queue, state.get("file_dependencies") or {}, state.get("workspace") or {})
+    return {
+        "current_wave": wave,
+        "files_to_code_queue": wave,
+        "logs": [f"⚡ Coding {len(wave)} files in parallel: {', '.join(wave)}"],
+    }
+
+
+def file_branch_input(state: AgentState, filename: str) -> dict:
+    """The state a per-file coder/critic subgraph starts from."""
+    return {
+        # The branch codes one file, it only needs that file's plan
+        "file_plans": {filename: state["file_plans"][filename]},
+        "current_file": filename,
+        "current_code_draft": None,
+        "draft_stopped_early": False,
+        "partial_critique": None,
+        "critique": None,
+        "critique_severity": None,
+        "coder_iterations": 0,
+        "file_started_at": time.time(),
+        "symbol_index": state.get("symbol_index") or {},
+        "logs": [],
+    }
+
+
+def fan_out_files(state: AgentState) -> list:
+    """
+    Conditional edge for the parallel coding mode.
+    Sends every file of the current wave to its own coder/critic subgraph.
+    """
+    wave = state.get("current_wave") or []
+
+    if not wave:
+        logger.info("No files to code. Ending graph.")
+        return [END]
+
+    logger.info("Fanning out %d files to parallel coders.", len(wave))
+
+    return [Send("code_file", file_branch_input(state, filename)) for filename in wave]
+
+
+def collect_workspace_node(state: AgentState) -> dict:
+    """
+    Join node for the parallel coding mode.
+    Runs once every file branch of a wave has merged its code into the workspace.
+    """
+    logger.info("Collected %d files from parallel coders.", len(state["workspace"]))
+    if state.get("files_to_code_queue"):
+        return {
+            "current_wave": [],
+            "logs": [f"📁 {len(state['workspace'])} files done. Moving to the next wave..."],
+        }
+    return {"current_wave": [], "logs": ["✅ All files generated. Project complete."]}
+
+
+def decide_next_wave(state: AgentState) -> str:
+    """
+    Conditional edge after a wave: dispatch the next one, or finish.
+    """
+    if state.get("files_to_code_queue"):
+        return "dispatch_files"
+    return "END"
+
+
+# ---- 2. Assemble the Graph --
+
+
+def add_coder_loop(builder: StateGraph, commit_target: str, static_checks: bool = True):
+    """
+    Adds the coder -> (static checks) -> critic self-correction loop.
+    Finished files are routed to 'commit_target'.
+    """
+    builder.add_node("coder", node("coder", run_code, arun_code))
+    builder.add_node("critic", node("critic", run_critic, arun_critic))
+
+    # Drafts cut short by the speculative critic go straight back to the coder
+    review = "static_check" if static_checks else "critic"
+    builder.add_conditional_edges(
+        "coder", route_coder, {"review": review, "retry_coder": "coder"}
+    )
+
+    if static_checks:
+        # Cheap local checks first, the LLM critic only sees clean drafts
+        builder.add_node("static_check", node("static_check", run_static_check))
+        builder.add_conditional_edges(
+            "static_check",
+            route_static_check,
+            {
+                "critic": "critic",
+                "commit_code": commit_target,
+                "retry_coder": "coder",
+            },
         )
-        print(f"    > Critique is PERFECT. Committing code.")
-        return "commit_code"
-    else:
-        logs.append(
-            f"🔁 Revisions needed for **{state['current_file']}**. Sending back to coder."
+
+    builder.add_conditional_edges(
+        "critic",
+        check_critique,
+        # If 'PERFECT' commit, if flawed retry
+        {
+            "commit_code": commit_target,
+            "retry_coder": "coder",
+        },
+    )
+
+
+def create_file_subgraph(static_checks: bool = True) -> StateGraph:
+    """
+    Creates the coder/critic self-correction loop for a *single* file.
+    Used by the parallel coding mode, one instance per file.
+    """
+    builder = StateGraph(AgentState)
+
+    add_coder_loop(builder, commit_target=END, static_checks=static_checks)
+    builder.add_edge(START, "coder")
+
+    return builder.compile()
+
+
+async def acode_file(file_graph, state: AgentState, config: RunnableConfig) -> dict:
+    """
+    Runs the per-file subgraph for one file and returns the file,
+    its symbols and its log entries as a state update.
+    """
+    current_file = state["current_file"]
+    result = await file_graph.ainvoke(state)
+
+    # The subgraph started with empty logs, so these are all new
+    logs = result.get("logs", [])
+    logs.append(review_outcome_log(result, config))
+    logs.append(iteration_summary_log(result, config))
+    logger.info("Code for %s saved to workspace.", current_file)
+    logs.append(f"✅ Code for **{current_file}** saved to workspace.")
+
+    code = get_text(result.get("current_code_draft")) or ""
+    logs.extend(
+        await asyncio.to_thread(persist_committed_file, current_file, code, config)
+    )
+    return {
+        "workspace": {current_file: put_text(code)},
+        "symbol_index": {current_file: extract_symbols(current_file, code)},
+        "logs": logs,
+    }
+
+
+def make_code_file_node(file_graph):
+    """
+    Wraps the per-file subgraph as a node of the main graph.
+    Only the finished file and its log entries are returned, so parallel
+    branches merge into 'workspace' and 'logs' through their reducers.
+    """
+
+    async def acode_file_node(state: AgentState, config: RunnableConfig) -> dict:
+        return await acode_file(file_graph, state, config)
+
+    def code_file_node(state: AgentState, config: RunnableConfig) -> dict:
+        return run_sync(acode_file_node(state, config))
+
+    return node("code_file", code_file_node, acode_file_node)
+
+
+def make_file_architect_node(file_graph):
+    """
+    The file architect for the parallel mode. Its plans are parsed while
+    they stream in, and every file that depends on nothing (e.g. the
+    HTML pages) starts its coder/critic subgraph as soon as its plan is
+    complete, while the architect is still planning the other files.
+    Those files are committed with the architect's update and left out
+    of the queue.
+    """
+
+    async def afile_architect_node(state: AgentState, config: RunnableConfig) -> dict:
+        max_concurrency = (config or {}).get("max_concurrency") or DEFAULT_MAX_CONCURRENCY
+        semaphore = asyncio.Semaphore(max_concurrency)
+        file_structure = state.get("file_structure") or []
+        early = {}  # filename -> task
+
+        async def code_early(filename: str, file_plans: dict):
+            async with semaphore:
+                branch = file_branch_input({**state, "file_plans": file_plans}, filename)
+                return await acode_file(file_graph, branch, config)
+
+        def start_early(filename: str, file_plans: dict):
+            if filename in early or filename not in file_structure:
+                return
+            if can_start_early(filename, file_plans[filename], file_structure):
+                logger.info("Coding %s while the architect plans the rest.", filename)
+                early[filename] = asyncio.create_task(code_early(filename, dict(file_plans)))
+
+        try:
+            result = await arun_file_architect(state, on_plan=start_early)
+        except BaseException:
+            for task in early.values():
+                task.cancel()
+            raise
+
+        if not result.get("file_plans"):
+            # Planning failed, the early files are not part of a project
+            for task in early.values():
+                task.cancel()
+            await asyncio.gather(*early.values(), return_exceptions=True)
+            return result
+
+        updates = await asyncio.gather(*early.values(), return_exceptions=True)
+        for update in updates:
+            if isinstance(update, BaseException):
+                raise update
+
+        logs = result["logs"]
+        if early:
+            logs.append(f"⚡ Started coding early: {', '.join(early)}")
+        for update in updates:
+            result["workspace"] = {**result.get("workspace", {}), **update["workspace"]}
+            result["symbol_index"] = {**result.get("symbol_index", {}), **update["symbol_index"]}
+            logs.extend(update["logs"])
+        result["files_to_code_queue"] = Overwrite(
+            [f for f in result["files_to_code_queue"].value if f not in early]
         )
-        print(f"    > Critique is NOT perfect. Returning to coder.")
-        return "retry_coder"
+        return result
 
+    def file_architect_node(state: AgentState, config: RunnableConfig) -> dict:
+        return run_sync(afile_architect_node(state, config))
 
-# ---- 2. Assemble the Graph --
+    return node("file_architect", file_architect_node, afile_architect_node)
 
 
-def create_agent_graph() -> StateGraph:
+def create_agent_graph(
+    parallel: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    static_checks: bool = True,
+    fused_planning: bool = False,
+    checkpointer=None,
+) -> StateGraph:
     """
     Creates and compiles the complete LangGraph agent.
+
+    Args:
+        parallel: If True, every file gets its own coder/critic loop, and
+            the files run in waves: all files whose dependencies are done
+            are coded at the same time.
+        max_concurrency: Upper bound on files being coded at once.
+        static_checks: Validate drafts locally before the LLM critic, and
+            send broken drafts straight back to the coder.
+        fused_planning: Plan the project and all files in one LLM call
+            (the "fused_planner" node), and only run the planner and
+            architect if its answer is unusable.
+        checkpointer: Saves the state after every step, so a run can be
+            resumed by its thread ID. Runs then need a "thread_id" in
+            their configurable.
     """
 
     # Initialize the graph with state
     builder = StateGraph(AgentState)
 
     # Add all nodes
-    builder.add_node("project_planner", run_project_planner)
-    builder.add_node("file_architect", run_file_architect)
+    builder.add_node("plan_lookup", node("plan_lookup", run_plan_lookup))
+    builder.add_node(
+        "project_planner",
+        node("project_planner", run_project_planner, arun_project_planner),
+    )
+    if parallel:
+        file_graph = create_file_subgraph(static_checks)
+        # Files that depend on nothing start while the architect streams
+        builder.add_node("file_architect", make_file_architect_node(file_graph))
+    else:
+        builder.add_node(
+            "file_architect",
+            node("file_architect", run_file_architect, arun_file_architect),
+        )
+
+    # Where coding starts once the file plans exist
+    coding_entry = "dispatch_files" if parallel else "file_queue_check"
+
+    # 1. Reuse the plan of a similar request, or plan from scratch
+    builder.add_edge(START, "plan_lookup")
+    builder.add_conditional_edges(
+        "plan_lookup",
+        route_plan_lookup,
+        {
+            "plan": "fused_planner" if fused_planning else "project_planner",
+            "code": coding_entry,
+        },
+    )
+
+    if fused_planning:
+        # One call for both plans, the two-stage path is the fallback
+        builder.add_node(
+            "fused_planner",
+            node("fused_planner", run_fused_planner, arun_fused_planner),
+        )
+        builder.add_conditional_edges(
+            "fused_planner",
+            route_fused_planner,
+            {"code": coding_entry, "fallback": "project_planner"},
+        )
+
+    # 2. Planner -> Architect
+    builder.add_edge("project_planner", "file_architect")
+
+    if parallel:
+        # 3. Architect -> one coder/critic subgraph per file (map)
+        builder.add_node("code_file", make_code_file_node(file_graph))
+        builder.add_node("collect_workspace", node("collect_workspace", collect_workspace_node))
+        builder.add_node("dispatch_files", node("dispatch_files", dispatch_files_node))
+
+        builder.add_edge("file_architect", "dispatch_files")
+        builder.add_conditional_edges(
+            "dispatch_files", fan_out_files, ["code_file", END]
+        )
 
-    # This is a "dummy" node that just routes
-    builder.add_node("file_queue_check", lambda state: state)
+        # 4. All branches -> join (reduce), then the next wave
+        builder.add_edge("code_file", "collect_workspace")
+        builder.add_conditional_edges(
+            "collect_workspace",
+            decide_next_wave,
+            {"dispatch_files": "dispatch_files", "END": END},
+        )
+
+        logger.debug("Agent graph (parallel) compiled.")
+
+        app = builder.compile(checkpointer=checkpointer)
+        return app.with_config(
+            {"recursion_limit": RECURSION_LIMIT, "max_concurrency": max_concurrency}
+        )
+
+    # This node only logs, the conditional edge after it routes
+    builder.add_node("file_queue_check", node("file_queue_check", file_queue_check_node))
 
     # new node that prepares the next file to be worked on
-    builder.add_node("prepare_next_file", prepare_next_file_node)
+    builder.add_node("prepare_next_file", node("prepare_next_file", prepare_next_file_node))
 
-    builder.add_node("coder", run_code)
-    builder.add_node("critic", run_critic)
-    builder.add_node("commit_code", commit_code_to_workspace)
+    builder.add_node("commit_code", node("commit_code", commit_code_to_workspace))
+    add_coder_loop(builder, commit_target="commit_code", static_checks=static_checks)
 
     # ---Define the graph flow ( edges ) --
 
-    # 1. Planner Edge
-    builder.add_edge(START, "project_planner")
-
-    # 2. Planner -> Architect
-    builder.add_edge("project_planner", "file_architect")
     builder.add_edge("file_architect", "file_queue_check")
 
     # 3. Architect -> Conditional Edge 1
@@ -165,86 +599,401 @@ def create_agent_graph() -> StateGraph:
     # 4. Connect prepare_file to coder edge
     builder.add_edge("prepare_next_file", "coder")
 
-    # 5. Self Correction Loop (Critic -> Conditional Edge 2 (The Coder Loop))
-    builder.add_edge("coder", "critic")
-    builder.add_conditional_edges(
-        "critic",
-        check_critique,
-        # If 'PERFECT' commit, if flawed retry
-        {
-            "commit_code": "commit_code",
-            "retry_coder": "coder",
-        },
-    )
+    # 5. Self Correction Loop (added by add_coder_loop above)
 
     # After committing, go back to check the queue
     builder.add_edge("commit_code", "file_queue_check")
 
     # Compile the graph
-    print("✅ Agent Graph compiled successfully.")
+    logger.debug("Agent graph compiled.")
 
-    app = builder.compile()
+    app = builder.compile(checkpointer=checkpointer)
 
     # Set the default config (including recursion limit) on the compiled app
-    return app.with_config({"recursion_limit": 100})
+    return app.with_config({"recursion_limit": RECURSION_LIMIT})
 
 
 # --- 3. Create a runnable instance ---
 
-app = create_agent_graph()
+
+@lru_cache(maxsize=None)
+def get_agent_graph(
+    parallel: bool = False, static_checks: bool = True, fused_planning: bool = False
+):
+    """
+    Returns a compiled graph for the requested mode, compiling it only once.
+    It saves checkpoints with the shared SQLite checkpointer (if enabled).
+    """
+    return create_agent_graph(
+        parallel=parallel,
+        static_checks=static_checks,
+        fused_planning=fused_planning,
+        checkpointer=get_checkpointer(),
+    )
+
+
+app = get_agent_graph()
 
 # ---4. Main function to run the agent ---
 
 
-def run_agent(query: str):
+def make_initial_state(query: str) -> AgentState:
     """
-    The main entry point to run the agent.
+    Returns the empty state a new run starts from.
     """
-
-    # Initial state
-    initial_state: AgentState = {
+    return {
         "query": query,
         "project_title": None,
         "project_description": None,
         "tech_stack": None,
         "file_structure": None,
-        "file_plans": None,
+        "file_plans": {},
+        "file_dependencies": {},
         "files_to_code_queue": [],
+        "current_wave": [],
         "current_file": None,
         "current_code_draft": None,
         "critique": None,
+        "critique_severity": None,
+        "file_started_at": None,
         "workspace": {},
+        "symbol_index": {},
         "coder_iterations": 0,
+        "draft_stopped_early": False,
+        "partial_critique": None,
         "logs": [],
     }
 
-    # The 'stream' method lets you see the output of each node
-    # as it runs
-    final_state = {}
 
-    for step in app.stream(initial_state, config={"recursion_limit": 100}):
-        # 'step' is a dictionary where the key is the node name
-        # and the value is the output (the updated state dict)
-        node_name = list(step.keys())[0]
-        node_output = list(step.values())[0]
+def make_run_config(
+    thread_id: str,
+    parallel: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    correction_mode: str = "full",
+    static_checks: bool = True,
+    critique_policy: CritiquePolicy = None,
+    metrics: RunMetrics = None,
+    output_dir: str = None,
+    reuse_plans: bool = True,
+    fused_planning: bool = False,
+    speculative_critic: bool = False,
+) -> dict:
+    """
+    Returns the config for one run of the agent graph.
+    Simple configurable values (like the graph mode) are also saved
+    in each checkpoint's metadata, which is how `resume` finds them.
+    """
+    return {
+        "recursion_limit": RECURSION_LIMIT,
+        "max_concurrency": max_concurrency,
+        "configurable": {
+            "thread_id": thread_id,
+            "parallel": parallel,
+            "static_checks": static_checks,
+            "correction_mode": correction_mode,
+            "critique_policy": critique_policy,
+            "metrics": metrics,
+            "output_dir": output_dir,
+            "reuse_plans": reuse_plans,
+            "fused_planning": fused_planning,
+            "speculative_critic": speculative_critic,
+        },
+    }
+
 
+def resolve_update(step: dict) -> dict:
+    """
+    A node update as callers see it: the artifact refs in 'workspace',
+    'file_plans' and 'current_code_draft' replaced by their texts.
+    """
+    resolved = {}
+    for node_name, update in step.items():
+        if isinstance(update, dict):
+            update = dict(update)
+            for key in ("workspace", "file_plans"):
+                if update.get(key):
+                    update[key] = get_texts(update[key])
+            if update.get("current_code_draft"):
+                update["current_code_draft"] = get_text(update["current_code_draft"])
+        resolved[node_name] = update
+    return resolved
+
+
+async def _astream_run(graph, graph_input, config: dict, stream_tokens: bool):
+    """
+    Streams a run (or resumes it when 'graph_input' is None)
+    and yields its node updates (with texts instead of artifact refs)
+    and draft events, then
+    {"metrics": summary} with the run's timings (see `RunMetrics.summary`).
+
+    The run's artifacts are released once it has finished and its texts
+    were yielded. An interrupted run keeps them for `resume`, unless
+    checkpointing is off and it could never be resumed.
+    """
+    stream_mode = ["updates", "custom"] if stream_tokens else ["updates"]
+    thread_id = config["configurable"]["thread_id"]
+    finished = False
+
+    try:
+        # subgraphs=True so drafts from parallel per-file coders are forwarded too.
+        # Checkpoints are written in the background while the next step runs.
+        async for namespace, mode, step in graph.astream(
+            graph_input,
+            config=config,
+            stream_mode=stream_mode,
+            subgraphs=True,
+            durability="async",
+        ):
+            if mode == "custom":
+                # A chunk of the coder's draft
+                yield step
+                continue
+            if namespace:
+                # Updates inside a per-file subgraph, reported by its parent node
+                continue
+            if step.get("__metadata__", {}).get("cached"):
+                # Saved before an interruption, already part of the resumed state
+                continue
+
+            # 'step' is a dictionary where the key is the node name
+            # and the value is the output (the updated state dict)
+            node_name = list(step.keys())[0]
+
+            yield resolve_update(step)
+
+            logger.debug("Finished node: %s", node_name)
+        finished = True
+    finally:
+        if finished or get_checkpointer() is None:
+            release_run(thread_id)
+
+    logger.info("Agent run complete.")
+
+    metrics = config["configurable"].get("metrics")
+    if metrics is not None:
+        metrics_path = get_metrics_path()
+        if metrics_path:
+            metrics.write_jsonl(metrics_path)
+        yield {"metrics": metrics.summary()}
+
+
+async def arun_agent(
+    query: str,
+    parallel: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    stream_tokens: bool = False,
+    correction_mode: str = "full",
+    static_checks: bool = True,
+    critique_policy: CritiquePolicy = None,
+    thread_id: str = None,
+    metrics: RunMetrics = None,
+    output_dir: str = None,
+    reuse_plans: bool = True,
+    fused_planning: bool = False,
+    speculative_critic: bool = False,
+):
+    """
+    The main entry point to run the agent (async version).
+    Many runs can share one event loop, since no node blocks a thread
+    while it waits for the LLM.
+
+    The first event is {"run": {"thread_id": ...}}. Pass that ID to
+    `resume` to continue the run if it is interrupted. The last one is
+    {"metrics": ...} with per-node and per-file timings and token counts
+    (also appended to AGENT_METRICS_PATH as JSON lines, if it is set).
+
+    Args:
+        query: The user's app idea.
+        parallel: Code independent files at the same time (in dependency
+            waves) instead of one by one.
+        max_concurrency: Max files coded at once in parallel mode.
+        stream_tokens: Also yield the coder's draft while it is written, as
+            {"coder_draft": {"current_file", "iteration", "delta"}} events.
+        correction_mode: "full" rewrites the whole file after a critique,
+            "patch" asks only for SEARCH/REPLACE edits and applies them.
+        static_checks: Check drafts locally before asking the LLM critic.
+        critique_policy: Iteration budgets and the critique severity that is
+            good enough to commit. Defaults to `DEFAULT_CRITIQUE_POLICY`.
+        thread_id: ID the run's checkpoints are saved under (a new one
+            is generated by default).
+        metrics: Collector for the run's node records, to inspect them
+            in-process (a new one is created by default).
+        output_dir: Write every file to this directory as soon as it is
+            committed (defaults to AGENT_OUTPUT_DIR, off if neither is set).
+        reuse_plans: Skip the planner and architect when a similar request
+            was planned before, and reuse its plan (see core/plan_memo.py).
+        fused_planning: Plan the project and every file in one LLM call,
+            falling back to the planner + architect if that fails.
+        speculative_critic: Review long drafts while they are written and
+            stop a draft early when its beginning has a blocking problem.
+    """
+    graph = get_agent_graph(
+        parallel=parallel, static_checks=static_checks, fused_planning=fused_planning
+    )
+    thread_id = thread_id or uuid.uuid4().hex
+    # Log records from this run (and the node tasks it starts) carry its ID
+    set_run_id(thread_id)
+    set_artifact_owner(thread_id)
+
+    config = make_run_config(
+        thread_id,
+        parallel=parallel,
+        max_concurrency=max_concurrency,
+        correction_mode=correction_mode,
+        static_checks=static_checks,
+        critique_policy=critique_policy,
+        metrics=metrics or RunMetrics(thread_id),
+        output_dir=output_dir,
+        reuse_plans=reuse_plans,
+        fused_planning=fused_planning,
+        speculative_critic=speculative_critic,
+    )
+
+    yield {"run": {"thread_id": thread_id}}
+
+    async for step in _astream_run(graph, make_initial_state(query), config, stream_tokens):
         yield step
 
-        # Keep track of the final state
-        if node_output:
-            final_state.update(node_output)
-        print(f"\n--- Finished Node: {node_name} ---")
 
-    print("\n--- ✅ Agent Run Complete ---")
+async def aresume(
+    thread_id: str,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    stream_tokens: bool = False,
+    critique_policy: CritiquePolicy = None,
+):
+    """
+    Continues an interrupted run from its last checkpoint (async version).
+    Files committed before the interruption are not coded again.
+
+    The first event is {"run": {"thread_id", "resumed", "workspace", "logs",
+    "planned_files", "parallel"}} with the state saved so far, followed by
+    the same events as `arun_agent`.
+    """
+    checkpointer = get_checkpointer()
+    if checkpointer is None:
+        raise RuntimeError("Checkpointing is disabled, runs cannot be resumed.")
+    set_run_id(thread_id)
+    set_artifact_owner(thread_id)
+
+    saved = await checkpointer.aget_tuple({"configurable": {"thread_id": thread_id}})
+    if saved is None:
+        raise ValueError(f"No saved run found for thread '{thread_id}'.")
+
+    # Continue with the same graph and options the run started with
+    options = saved.metadata
+    parallel = options.get("parallel", False)
+    static_checks = options.get("static_checks", True)
+    fused_planning = options.get("fused_planning", False)
+    graph = get_agent_graph(
+        parallel=parallel, static_checks=static_checks, fused_planning=fused_planning
+    )
+    config = make_run_config(
+        thread_id,
+        parallel=parallel,
+        max_concurrency=max_concurrency,
+        correction_mode=options.get("correction_mode", "full"),
+        static_checks=static_checks,
+        critique_policy=critique_policy,
+        metrics=RunMetrics(thread_id),
+        output_dir=options.get("output_dir"),
+        reuse_plans=options.get("reuse_plans", True),
+        fused_planning=fused_planning,
+        speculative_critic=options.get("speculative_critic", False),
+    )
+
+    snapshot = await graph.aget_state(config)
+    yield {
+        "run": {
+            "thread_id": thread_id,
+            "resumed": True,
+            # A finished run has released its files already
+            "workspace": get_texts(snapshot.values.get("workspace"), missing_ok=not snapshot.tasks)
+            or {},
+            "logs": snapshot.values.get("logs") or [],
+            "planned_files": list(snapshot.values.get("file_plans") or {}),
+            "parallel": parallel,
+        }
+    }
+
+    # Tasks whose results were saved before the interruption are not run again
+    if not snapshot.tasks:
+        logger.info("Run %s already finished. Nothing to resume.", thread_id)
+        return
+
+    logger.info("Resuming run %s at: %s", thread_id, [t.name for t in snapshot.tasks])
+    async for step in _astream_run(graph, None, config, stream_tokens):
+        yield step
+
+
+def run_agent(
+    query: str,
+    parallel: bool = False,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    stream_tokens: bool = False,
+    correction_mode: str = "full",
+    static_checks: bool = True,
+    critique_policy: CritiquePolicy = None,
+    thread_id: str = None,
+    metrics: RunMetrics = None,
+    output_dir: str = None,
+    reuse_plans: bool = True,
+    fused_planning: bool = False,
+    speculative_critic: bool = False,
+):
+    """
+    The main entry point to run the agent.
+    Sync version of `arun_agent`, it runs on the shared event loop.
+    """
+    yield from iter_sync(
+        arun_agent(
+            query,
+            parallel=parallel,
+            max_concurrency=max_concurrency,
+            stream_tokens=stream_tokens,
+            correction_mode=correction_mode,
+            static_checks=static_checks,
+            critique_policy=critique_policy,
+            thread_id=thread_id,
+            metrics=metrics,
+            output_dir=output_dir,
+            reuse_plans=reuse_plans,
+            fused_planning=fused_planning,
+            speculative_critic=speculative_critic,
+        )
+    )
+
+
+def resume(
+    thread_id: str,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    stream_tokens: bool = False,
+    critique_policy: CritiquePolicy = None,
+):
+    """
+    Continues an interrupted run from its last checkpoint.
+    Sync version of `aresume`.
+    """
+    yield from iter_sync(
+        aresume(
+            thread_id,
+            max_concurrency=max_concurrency,
+            stream_tokens=stream_tokens,
+            critique_policy=critique_policy,
+        )
+    )
 
 
 if __name__ == "__main__":
     # Test the full agent
     test_query = "Build a simple counter app with HTML, CSS, and JS. It needs a number, an increment button, and a decrement button."
 
-    workspace = run_agent(test_query)
+    workspace = {}
+    for event in run_agent(test_query):
+        for update in event.values():
+            workspace.update((update or {}).get("workspace") or {})
 
-    save_workspace_to_disk(workspace, "project_output")
+    result = save_workspace_to_disk(workspace, "project_output")
+    print(f"Saved {len(result.written)} files, {len(result.unchanged)} unchanged.")
 
     print("\n\n--- 🚀 FINAL WORKSPACE 🚀 ---")
     for filename, code in workspace.items():
@@ -1,14 +1,42 @@
 import os
+import json
+import time
+import asyncio
+import threading
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.runnables import Runnable
+from langchain_core.runnables import Runnable, RunnableConfig
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.rate_limiters import InMemoryRateLimiter
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 # Import our custom parsers
-from core.parsers import ProjectPlan, FilePlans
+from core.parsers import ProjectPlan, ProjectBlueprint, FilePlans, CriticVerdict
+from core.cache import get_response_cache, is_cache_enabled, make_cache_key
+from core.metrics import approx_tokens, record_llm_call
+from core.retry import (
+    acall_with_retries,
+    astream_with_retries,
+    call_with_retries,
+    stream_with_retries,
+)
 
 load_dotenv()
 
+# -- Process-wide client registry --
+# Chat models are expensive to build (API key lookup, HTTP transport),
+# so each (model, temperature) pair is built once and shared, and each
+# (model, temperature, schema) runnable is derived from it once.
+_CHAT_MODELS: dict = {}
+_LLM_REGISTRY: dict = {}
+_REGISTRY_LOCK = threading.Lock()
+
+# One token bucket per provider, shared by every model of that provider,
+# so all nodes and runs of the process stay under its request rate
+_RATE_LIMITERS: dict = {}
+_RATE_LIMITERS_LOCK = threading.Lock()
+
 
 def get_google_api_key():
     """Fetches the Google API key from environment variables."""
@@ -21,6 +49,38 @@ def get_google_api_key():
     return api_key
 
 
+def get_rate_limiter(provider: str = "google"):
+    """
+    The shared token bucket of a provider: LLM_REQUESTS_PER_SECOND requests
+    per second on average (default 5, 0 turns it off), in bursts of up to
+    LLM_MAX_BURST (default 10). Cache hits do not use a token.
+    """
+    requests_per_second = float(os.getenv("LLM_REQUESTS_PER_SECOND", "5"))
+    if requests_per_second <= 0:
+        return None
+    with _RATE_LIMITERS_LOCK:
+        if provider not in _RATE_LIMITERS:
+            _RATE_LIMITERS[provider] = InMemoryRateLimiter(
+                requests_per_second=requests_per_second,
+                check_every_n_seconds=0.05,
+                max_bucket_size=float(os.getenv("LLM_MAX_BURST", "10")),
+            )
+        return _RATE_LIMITERS[provider]
+
+
+def create_chat_model(model_name: str, temperature: float) -> BaseChatModel:
+    """
+    Builds a new Gemini chat model. Every instance owns its own HTTP client,
+    so prefer `get_llm`, which reuses instances across calls.
+    """
+    return ChatGoogleGenerativeAI(
+        model=model_name,
+        temperature=temperature,
+        google_api_key=get_google_api_key(),
+        rate_limiter=get_rate_limiter("google"),
+    )
+
+
 def create_structured_llm(
     model_name: str = "gemini-2.0-flash",
     temperature: float = 0.0,
@@ -39,10 +99,13 @@ def create_structured_llm(
         into the provided schema.
     """
     # Initialize the Gemini Chat model
-    llm = ChatGoogleGenerativeAI(
-        model=model_name, temperature=temperature, google_api_key=get_google_api_key()
-    )
+    llm = create_chat_model(model_name, temperature)
 
+    return _bind_schema(llm, parser_schema)
+
+
+def _bind_schema(llm: BaseChatModel, parser_schema: type[BaseModel] = None) -> Runnable:
+    """Binds the parser schema to a chat model, if one is given."""
     if parser_schema:
         structured_llm = llm.with_structured_output(parser_schema)
         return structured_llm
@@ -50,13 +113,235 @@ def create_structured_llm(
         return llm
 
 
+class CachedLLM(Runnable):
+    """
+    Serves repeated LLM calls from the local response cache.
+
+    Sits right after the prompt in a chain (`PROMPT | llm`), so the cache key
+    is the rendered prompt plus the model settings. Only deterministic calls
+    (temperature <= LLM_CACHE_MAX_TEMPERATURE, default 0.0) are cached.
+    Pass {"configurable": {"bypass_llm_cache": True}} to skip the cache.
+
+    Calls the provider throttles (HTTP 429) are retried with jittered
+    backoff (see core/retry.py). Streams are only retried before their
+    first chunk.
+    """
+
+    def __init__(
+        self,
+        llm: Runnable,
+        model_name: str,
+        temperature: float,
+        parser_schema: type[BaseModel] = None,
+    ):
+        self.llm = llm
+        self.model_name = model_name
+        self.temperature = temperature
+        self.parser_schema = parser_schema
+
+    def _cache_key(self, input, config: RunnableConfig = None):
+        """Returns the cache key, or None if this call must skip the cache."""
+        if not is_cache_enabled():
+            return None
+
+        configurable = (config or {}).get("configurable", {})
+        max_temperature = float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.0"))
+        if configurable.get("bypass_llm_cache") or self.temperature > max_temperature:
+            get_response_cache().record_bypass()
+            return None
+
+        prompt_text = input.to_string() if hasattr(input, "to_string") else str(input)
+        schema_name = self.parser_schema.__name__ if self.parser_schema else ""
+        return make_cache_key(prompt_text, self.model_name, self.temperature, schema_name)
+
+    def _encode(self, output) -> str:
+        if self.parser_schema:
+            return output.model_dump_json()
+        return json.dumps(output.content)
+
+    def _decode(self, value: str):
+        if self.parser_schema:
+            return self.parser_schema.model_validate_json(value)
+        return AIMessage(content=json.loads(value))
+
+    def _record_call(self, input, output, started: float, cached: bool = False):
+        """Reports the call's latency and tokens to the running node's metrics."""
+        usage = getattr(output, "usage_metadata", None)
+        if usage:
+            input_tokens, output_tokens = usage["input_tokens"], usage["output_tokens"]
+        else:
+            prompt_text = input.to_string() if hasattr(input, "to_string") else str(input)
+            input_tokens = approx_tokens(prompt_text)
+            output_tokens = approx_tokens(self._encode(output)) if output is not None else 0
+        record_llm_call(time.perf_counter() - started, input_tokens, output_tokens, cached)
+
+    def invoke(self, input, config: RunnableConfig = None, **kwargs):
+        started = time.perf_counter()
+        key = self._cache_key(input, config)
+        if key is None:
+            output = call_with_retries(lambda: self.llm.invoke(input, config, **kwargs))
+            self._record_call(input, output, started)
+            return output
+
+        cache = get_response_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            output = self._decode(cached)
+            self._record_call(input, output, started, cached=True)
+            return output
+
+        output = call_with_retries(lambda: self.llm.invoke(input, config, **kwargs))
+        # No output (e.g. no tool call for a structured schema) is left to the caller, never cached
+        if output is not None:
+            cache.put(key, self._encode(output))
+        self._record_call(input, output, started)
+        return output
+
+    def stream(self, input, config: RunnableConfig = None, **kwargs):
+        # Structured outputs only make sense once complete
+        if self.parser_schema:
+            yield self.invoke(input, config, **kwargs)
+            return
+
+        started = time.perf_counter()
+        key = self._cache_key(input, config)
+        cache = get_response_cache() if key is not None else None
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            output = self._decode(cached)
+            self._record_call(input, output, started, cached=True)
+            yield output
+            return
+
+        # Pass chunks through as they arrive, store the full message at the end
+        message = None
+        complete = False
+        try:
+            for chunk in stream_with_retries(lambda: self.llm.stream(input, config, **kwargs)):
+                message = chunk if message is None else message + chunk
+                yield chunk
+            complete = True
+        finally:
+            # A stream the caller stopped early is recorded, but never cached
+            if complete and message is not None and cache is not None:
+                cache.put(key, self._encode(message))
+            self._record_call(input, message, started)
+
+    async def ainvoke(self, input, config: RunnableConfig = None, **kwargs):
+        started = time.perf_counter()
+        key = self._cache_key(input, config)
+        if key is None:
+            output = await acall_with_retries(lambda: self.llm.ainvoke(input, config, **kwargs))
+            self._record_call(input, output, started)
+            return output
+
+        # The cache is on disk: keep its reads and writes off the event loop
+        cache = get_response_cache()
+        cached = await asyncio.to_thread(cache.get, key)
+        if cached is not None:
+            output = self._decode(cached)
+            self._record_call(input, output, started, cached=True)
+            return output
+
+        output = await acall_with_retries(lambda: self.llm.ainvoke(input, config, **kwargs))
+        # No output (e.g. no tool call for a structured schema) is left to the caller, never cached
+        if output is not None:
+            await asyncio.to_thread(cache.put, key, self._encode(output))
+        self._record_call(input, output, started)
+        return output
+
+    async def astream(self, input, config: RunnableConfig = None, **kwargs):
+        if self.parser_schema:
+            yield await self.ainvoke(input, config, **kwargs)
+            return
+
+        started = time.perf_counter()
+        key = self._cache_key(input, config)
+        cache = get_response_cache() if key is not None else None
+        cached = await asyncio.to_thread(cache.get, key) if cache is not None else None
+        if cached is not None:
+            output = self._decode(cached)
+            self._record_call(input, output, started, cached=True)
+            yield output
+            return
+
+        message = None
+        complete = False
+        try:
+            async for chunk in astream_with_retries(
+                lambda: self.llm.astream(input, config, **kwargs)
+            ):
+                message = chunk if message is None else message + chunk
+                yield chunk
+            complete = True
+        finally:
+            if complete and message is not None and cache is not None:
+                await asyncio.to_thread(cache.put, key, self._encode(message))
+            self._record_call(input, message, started)
+
+
+def get_llm(
+    model_name: str = "gemini-2.0-flash",
+    temperature: float = 0.0,
+    parser_schema: type[BaseModel] = None,
+) -> Runnable:
+    """
+    Same as `create_structured_llm`, but returns a shared instance.
+
+    The chat model is created lazily on first use and then reused by every
+    caller with the same (model, temperature), so its HTTP connection pool
+    is kept warm between node calls. Deterministic calls are also served
+    from the local response cache (see `CachedLLM`).
+    """
+    key = (model_name, temperature, parser_schema)
+    llm = _LLM_REGISTRY.get(key)
+    if llm is not None:
+        return llm
+
+    with _REGISTRY_LOCK:
+        # Another thread may have built it while we waited for the lock
+        llm = _LLM_REGISTRY.get(key)
+        if llm is None:
+            chat_model = _CHAT_MODELS.get((model_name, temperature))
+            if chat_model is None:
+                chat_model = create_chat_model(model_name, temperature)
+                _CHAT_MODELS[(model_name, temperature)] = chat_model
+
+            llm = CachedLLM(
+                _bind_schema(chat_model, parser_schema),
+                model_name,
+                temperature,
+                parser_schema,
+            )
+            _LLM_REGISTRY[key] = llm
+
+    return llm
+
+
+def clear_llm_registry():
+    """Drops every shared client, e.g. after changing the API key."""
+    with _REGISTRY_LOCK:
+        _LLM_REGISTRY.clear()
+        _CHAT_MODELS.clear()
+    with _RATE_LIMITERS_LOCK:
+        _RATE_LIMITERS.clear()
+
+
 # -- Pre-built llm's for agent nodes --
 
 def get_project_planner_llm() -> Runnable:
     """
     Returns a pre-configured LLM that *only* outputs a ProjectPlan.
     """
-    return create_structured_llm(parser_schema=ProjectPlan)
+    return get_llm(parser_schema=ProjectPlan)
+
+
+def get_fused_planner_llm() -> Runnable:
+    """
+    Returns a pre-configured LLM that *only* outputs a ProjectBlueprint
+    (the project plan and every file plan at once).
+    """
+    return get_llm(parser_schema=ProjectBlueprint)
 
 
 def get_file_architect_llm() -> Runnable:
@@ -64,7 +349,7 @@ def get_file_architect_llm() -> Runnable:
     Returns a standard, non-structured LLM.
     We will parse the output manually in the node.
     """
-    return create_structured_llm(
+    return get_llm(
         parser_schema=None,
         model_name="gemini-2.0-flash",
         temperature=0.0,
@@ -77,7 +362,7 @@ def get_coder_llm() -> Runnable:
     We don't use a parser here because we want the output to be
     the code itself, not a JSON object.
     """
-    return create_structured_llm(
+    return get_llm(
         parser_schema=None,
         model_name="gemini-2.0-flash",
         temperature=0.1,
@@ -86,12 +371,12 @@ def get_coder_llm() -> Runnable:
 
 def get_critic_llm() -> Runnable:
     """
-    Returns a standard, non-structured LLM for writing critiques.
-    The critique is simple text (either "PERFECT" or a critique).
+    Returns an LLM that *only* outputs a CriticVerdict
+    (passed, severity and a list of issues).
     We use a faster, cheaper model for this.
     """
-    return create_structured_llm(
-        parser_schema=None,
+    return get_llm(
+        parser_schema=CriticVerdict,
         model_name="gemini-2.0-flash",
         temperature=0.0,
     )
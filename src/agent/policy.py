@@ -0,0 +1,70 @@
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from langchain_core.runnables import RunnableConfig
+
+# Critique severities, from harmless to broken
+SEVERITIES = ["none", "minor", "major", "blocking"]
+
+
+@dataclass
+class CritiquePolicy:
+    """
+    Decides when a file is good enough to commit.
+
+    - Every extension has its own iteration budget (e.g. a stylesheet gets
+      fewer rounds than app logic), falling back to `default_max_iterations`.
+    - Small drafts are capped at `small_file_max_iterations`, large ones get
+      `large_file_extra_iterations` more rounds.
+    - Critiques at or below `commit_severity` are committed right away.
+    """
+
+    default_max_iterations: int = 3
+    max_iterations_by_extension: Dict[str, int] = field(
+        default_factory=lambda: {
+            ".css": 2,
+            ".html": 3,
+            ".js": 3,
+            ".json": 1,
+            ".md": 1,
+            ".txt": 1,
+        }
+    )
+    small_file_chars: int = 1500
+    small_file_max_iterations: int = 2
+    large_file_chars: int = 12000
+    large_file_extra_iterations: int = 1
+    commit_severity: str = "minor"
+
+    def max_iterations(self, filename: str, draft: Optional[str] = None) -> int:
+        """The number of coder rounds a file may use."""
+        extension = os.path.splitext(filename)[1].lower()
+        budget = self.max_iterations_by_extension.get(
+            extension, self.default_max_iterations
+        )
+
+        size = len(draft or "")
+        if size and size < self.small_file_chars:
+            budget = min(budget, self.small_file_max_iterations)
+        elif size > self.large_file_chars:
+            budget += self.large_file_extra_iterations
+
+        return max(1, budget)
+
+    def is_acceptable(self, severity: Optional[str]) -> bool:
+        """True if a critique of this severity is not worth another round."""
+        if severity not in SEVERITIES:
+            return False
+        return SEVERITIES.index(severity) <= SEVERITIES.index(self.commit_severity)
+
+
+DEFAULT_CRITIQUE_POLICY = CritiquePolicy()
+
+
+def get_critique_policy(config: RunnableConfig = None) -> CritiquePolicy:
+    """
+    Returns the policy passed as {"configurable": {"critique_policy": ...}},
+    or the default one.
+    """
+    configurable = (config or {}).get("configurable", {})
+    return configurable.get("critique_policy") or DEFAULT_CRITIQUE_POLICY
@@ -0,0 +1,180 @@
+import os
+import heapq
+import asyncio
+import itertools
+import threading
+from typing import AsyncIterator, Callable, Optional
+from agent.graph import arun_agent, aresume
+from agent.coalesce import get_run_coalescer, is_coalescing_enabled, run_key
+from core.async_utils import iter_sync
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+DEFAULT_MAX_RUNNING = 4
+DEFAULT_MAX_QUEUED = 20
+
+
+class SchedulerBusy(RuntimeError):
+    """Raised when a run is submitted while the queue is full."""
+
+
+class RunScheduler:
+    """
+    Admits agent runs to a bounded pool: at most 'max_running' runs
+    execute at once, the rest wait in a priority queue (lower priority
+    values first, FIFO within a priority). More than 'max_queued' waiting
+    runs are refused with SchedulerBusy, so load is pushed back to the
+    caller instead of piling up.
+
+    Lives on the shared event loop (see core/async_utils.py), like the
+    runs it schedules.
+    """
+
+    def __init__(self, max_running: int = DEFAULT_MAX_RUNNING, max_queued: int = DEFAULT_MAX_QUEUED):
+        self.max_running = max(1, max_running)
+        self.max_queued = max(0, max_queued)
+        self.running = 0
+        self._waiting = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiting)
+
+    def _notify(self):
+        """Wakes every waiter so it can report its new queue position."""
+        if self._changed is not None:
+            self._changed.set()
+        self._changed = asyncio.Event()
+
+    def position(self, ticket: asyncio.Future) -> int:
+        """1-based place of a waiting ticket in the queue, 0 once it may run."""
+        if ticket.done():
+            return 0
+        mine = next(entry for entry in self._waiting if entry[2] is ticket)
+        return 1 + sum(1 for entry in self._waiting if entry < mine)
+
+    def _enqueue(self, priority: int) -> asyncio.Future:
+        ticket = asyncio.get_running_loop().create_future()
+        if self.running < self.max_running and not self._waiting:
+            self.running += 1
+            ticket.set_result(None)
+            return ticket
+        if len(self._waiting) >= self.max_queued:
+            raise SchedulerBusy(
+                f"{self.running} runs in progress and {len(self._waiting)} waiting. Try again later."
+            )
+        heapq.heappush(self._waiting, (priority, next(self._seq), ticket))
+        self._notify()
+        return ticket
+
+    def _release(self):
+        """Hands the finished run's slot to the next waiting run."""
+        self.running -= 1
+        while self._waiting and self.running < self.max_running:
+            _, _, ticket = heapq.heappop(self._waiting)
+            if not ticket.done():
+                self.running += 1
+                ticket.set_result(None)
+        self._notify()
+
+    def _withdraw(self, ticket: asyncio.Future):
+        """Removes a run that gave up while waiting."""
+        self._waiting = [entry for entry in self._waiting if entry[2] is not ticket]
+        heapq.heapify(self._waiting)
+        ticket.cancel()
+        self._notify()
+
+    async def astream(
+        self, start: Callable[[], AsyncIterator[dict]], priority: int = 0
+    ) -> AsyncIterator[dict]:
+        """
+        Waits for a slot, then yields the events of start() (e.g. an
+        `arun_agent` generator). While waiting it yields
+        {"queue": {"position", "running", "queued"}} whenever the position
+        changes, and {"queue": {"position": 0, ...}} when the run starts.
+        """
+        ticket = self._enqueue(priority)
+        try:
+            last_position = None
+            while not ticket.done():
+                position = self.position(ticket)
+                if position != last_position:
+                    last_position = position
+                    yield {"queue": {"position": position, "running": self.running, "queued": self.queued}}
+                changed = asyncio.ensure_future(self._changed.wait())
+                try:
+                    await asyncio.wait([ticket, changed], return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    changed.cancel()
+            if last_position is not None:
+                yield {"queue": {"position": 0, "running": self.running, "queued": self.queued}}
+        except BaseException:
+            if not ticket.done():
+                self._withdraw(ticket)
+            elif not ticket.cancelled():
+                self._release()
+            raise
+
+        try:
+            async for event in start():
+                yield event
+        finally:
+            self._release()
+
+
+# -- Shared scheduler, configured from environment variables --
+
+_scheduler: Optional[RunScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_run_scheduler() -> RunScheduler:
+    """
+    The process-wide scheduler: AGENT_MAX_CONCURRENT_RUNS runs at once
+    (default 4), up to AGENT_MAX_QUEUED_RUNS waiting (default 20).
+    """
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RunScheduler(
+                    max_running=int(os.getenv("AGENT_MAX_CONCURRENT_RUNS", DEFAULT_MAX_RUNNING)),
+                    max_queued=int(os.getenv("AGENT_MAX_QUEUED_RUNS", DEFAULT_MAX_QUEUED)),
+                )
+    return _scheduler
+
+
+def arun_scheduled(query: str, priority: int = 0, **options) -> AsyncIterator[dict]:
+    """
+    `arun_agent` behind the shared scheduler (queue events first). While
+    an identical request is in progress, this attaches to that run
+    instead of queueing a new one (see agent/coalesce.py).
+    """
+    key = run_key(query, options) if is_coalescing_enabled() else None
+    return get_run_coalescer().astream(
+        key, lambda: get_run_scheduler().astream(lambda: arun_agent(query, **options), priority)
+    )
+
+
+def aresume_scheduled(thread_id: str, priority: int = 0, **options) -> AsyncIterator[dict]:
+    """`aresume` behind the shared scheduler, one resume per thread at a time."""
+    key = run_key(thread_id, {"resume": True, **options}) if is_coalescing_enabled() else None
+    return get_run_coalescer().astream(
+        key, lambda: get_run_scheduler().astream(lambda: aresume(thread_id, **options), priority)
+    )
+
+
+def run_scheduled(query: str, priority: int = 0, **options):
+    """
+    Sync version of `arun_scheduled`, e.g. for the Streamlit app.
+    Raises SchedulerBusy if the queue is full.
+    """
+    yield from iter_sync(arun_scheduled(query, priority, **options))
+
+
+def resume_scheduled(thread_id: str, priority: int = 0, **options):
+    """Sync version of `aresume_scheduled`."""
+    yield from iter_sync(aresume_scheduled(thread_id, priority, **options))
@@ -1,4 +1,40 @@
-from typing import TypedDict, List, Dict, Optional
+from typing import TypedDict, List, Dict, Optional, Annotated, Sequence
+from langgraph.channels import DeltaChannel
+
+
+def merge_workspace_writes(
+    current: Dict[str, str], writes: Sequence[Dict[str, str]]
+) -> Dict[str, str]:
+    """
+    Reducer for the per-file delta channels ('workspace', 'symbol_index',
+    'file_plans', 'file_dependencies'): applies a list of per-file updates
+    in order, so parallel coder branches can each write their own file
+    without overwriting each other.
+    """
+    merged = dict(current or {})
+    for update in writes:
+        merged.update(update or {})
+    return merged
+
+
+def drop_queued_files(current: List[str], writes: Sequence[List[str]]) -> List[str]:
+    """
+    Reducer for the 'files_to_code_queue' delta channel: every write lists
+    the files taken off the queue. The planners set the whole queue once,
+    with an `Overwrite`.
+    """
+    taken = {filename for files in writes for filename in files or []}
+    return [filename for filename in current or [] if filename not in taken]
+
+
+def append_logs(current: List[str], writes: Sequence[List[str]]) -> List[str]:
+    """
+    Reducer for the 'logs' channel: appends every batch of new entries.
+    """
+    logs = list(current or [])
+    for entries in writes:
+        logs.extend(entries or [])
+    return logs
 
 
 class AgentState(TypedDict):
@@ -18,24 +54,57 @@ class AgentState(TypedDict):
     file_structure: Optional[List[str]]  # e.g., ["index.html", "style.css", "app.js"]
 
     # ---Node 2 Output: File-by-File Plan---
-    file_plans: Optional[Dict[str, str]]  # Maps filename -> detailed plan
+    # Large texts (plans, drafts, committed code) are artifact refs, see core/artifacts.py
+    # Written once per run: a delta channel, so checkpoints do not repeat it on every step
+    file_plans: Annotated[Dict[str, str], DeltaChannel(merge_workspace_writes)]  # Maps filename -> ref of its detailed plan
+
+    # Maps filename -> the files it has to be coded after (see core/dependencies.py)
+    file_dependencies: Annotated[Dict[str, List[str]], DeltaChannel(merge_workspace_writes)]
 
     # -- Node 3 ( Code Loop ) State ----
 
-    files_to_code_queue: List[str]
+    # In dependency order: every file comes after the files it depends on.
+    # Nodes return only the files they take off it (see drop_queued_files).
+    files_to_code_queue: Annotated[List[str], DeltaChannel(drop_queued_files)]
+
+    # Parallel mode: the files being coded at the same time right now
+    current_wave: Optional[List[str]]
 
     current_file: Optional[str]
 
-    current_code_draft: Optional[str]
+    current_code_draft: Optional[str]  # ref of the draft
 
     # to check if critique is there or not
     critique: Optional[str]
 
+    # How bad the critique is: "none", "minor", "major" or "blocking"
+    critique_severity: Optional[str]
+
+    # When work on the current file started (time.time()), for timing logs
+    file_started_at: Optional[float]
+
     # The *final* code, built up file by file.
-    workspace: Dict[str, str]  # Maps filename -> "PERFECT" code
+    # Updates are merged (not replaced) so parallel branches can commit.
+    # Checkpoints store only the new files of each step, not the whole workspace.
+    workspace: Annotated[Dict[str, str], DeltaChannel(merge_workspace_writes)]  # Maps filename -> ref of its "PERFECT" code
+
+    # Element IDs, classes, selectors and functions of every committed file
+    # (filename -> {kind: [names]}), shown to the coder for later files.
+    # Merged per file like the workspace.
+    symbol_index: Annotated[Dict[str, Dict[str, List[str]]], DeltaChannel(merge_workspace_writes)]
 
     # A counter to prevent infinite loops in the coder
     coder_iterations: int
 
+    # Speculative critic: the coder stopped the draft because a review of
+    # its beginning found a blocking problem (the draft is incomplete)
+    draft_stopped_early: Optional[bool]
+
+    # Speculative critic: blocking issues a review of the draft's beginning
+    # found after the draft was already finished (shown to the full critic)
+    partial_critique: Optional[str]
+
     # for user logs
-    logs: List[str]
+    # Nodes return only their *new* entries, which are appended here
+    # (and are all that checkpoints store for this channel).
+    logs: Annotated[List[str], DeltaChannel(append_logs)]
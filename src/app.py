@@ -1,10 +1,11 @@
 import streamlit as st
 import time
-from agent.graph import run_agent
+from agent.graph import DEFAULT_MAX_CONCURRENCY
+from agent.scheduler import run_scheduled, resume_scheduled, SchedulerBusy
+from core.retry import is_throttling_error
+from core.archive import IncrementalZip, build_zip, workspace_hash, get_compression_level
 from dotenv import load_dotenv
 import os
-import io
-import zipfile
 import streamlit.components.v1 as components
 import json
 
@@ -61,105 +62,74 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# ✅ Header
-st.markdown('<h1 class="main-header">🤖 Code Buddy</h1>', unsafe_allow_html=True)
-st.markdown(
-    '<p class="subtitle">Your AI partner for turning ideas into web applications</p>',
-    unsafe_allow_html=True,
-)
-st.markdown("---")
-
-# ✅ Prompt Input
-prompt = st.text_area(
-    "✨ **Describe your app idea**",
-    key="prompt_input",
-    placeholder="Example: Build a weather dashboard with search and 5-day forecast",
-    height=180,
-    help="Be specific about layout and features",
-)
-
-col1, col2, col3 = st.columns([1, 2, 1])
-with col2:
-    run_button = st.button(
-        "🚀 Generate Web App", type="primary", use_container_width=True
-    )
-
-# ✅ Button Click Handler (runs agent once)
-if run_button:
-    if not prompt:
-        st.error("⚠️ Please describe your app idea first!")
-    else:
-        st.markdown("### 🚧 **Building your app...**")
+# Graph steps for the progress bar: planning, then per planned file either
+# queue check, prepare, coder, static check, critic, commit and about one
+# correction (one by one), or the file's branch and its wave's dispatch and
+# collect steps (in parallel)
+PLANNING_STEPS = 3
+STEPS_PER_FILE = {False: 8, True: 2}
+FILES_BEFORE_PLANNING = 3  # assumed until the plan is known
 
-        log_box = st.empty()
-        progress = st.progress(0)
 
-        logs = []
-        workspace = {}
+def estimate_steps(file_count: int, parallel: bool) -> int:
+    """Graph steps left to code 'file_count' files."""
+    return max(1, file_count * STEPS_PER_FILE[parallel])
 
-        step_count = 0
-        estimated_steps = 50  # for percentage indicator
 
-        for update in run_agent(prompt):
-            step_count += 1
-            progress.progress(step_count / estimated_steps)
+def language_for(filename: str) -> str:
+    """Syntax highlighting language for a generated file."""
+    if filename.endswith(".html"):
+        return "html"
+    if filename.endswith(".css"):
+        return "css"
+    return "javascript"
 
-            state_update = list(update.values())[0]
 
-            # ✅ live update logs
-            if "logs" in state_update:
-                logs = state_update["logs"]
-                log_box.code("\n".join(logs))
+@st.cache_data(max_entries=8, show_spinner=False)
+def cached_project_zip(key: str, _workspace: dict, level: int) -> bytes:
+    """The project ZIP, built once per workspace version ('key' is its content hash)."""
+    return build_zip(_workspace, level)
 
-            # ✅ live update workspace
-            if "workspace" in state_update:
-                workspace = state_update["workspace"]
-                st.session_state["workspace"] = workspace
-                st.session_state["logs"] = logs
 
-        progress.empty()
-        st.success("✅ App generation complete!")
+def project_zip(workspace: dict) -> bytes:
+    """
+    The ZIP download for a workspace. The archive built while the files
+    were committed is used as is, otherwise it comes from the cache.
+    """
+    key = workspace_hash(workspace)
+    builder = st.session_state.get("zip_builder")
+    if builder is not None and builder.workspace_hash() == key:
+        return builder.getvalue()
+    return cached_project_zip(key, workspace, get_compression_level())
 
-# ✅ ---------------- DISPLAY SECTION (persists after rerun) ----------------
-if "workspace" in st.session_state:
-    workspace = st.session_state["workspace"]
-    logs = st.session_state.get("logs", [])
 
-    # ✅ Success box
-    st.markdown(
-        """
-        <div class="success-box">
-            <h3 style="margin:0; color:#667eea;">✅ Generation Complete!</h3>
-            <p style="margin:0.5rem 0 0 0; color:#666;">Your web app is ready to preview</p>
-        </div>
-        """,
-        unsafe_allow_html=True,
-    )
-
-    # ✅ Show generated files
+@st.fragment
+def generated_files(workspace: dict):
+    """
+    The generated files, one at a time: only the selected file's code is
+    sent to the browser, and picking another file only reruns this fragment.
+    """
     st.markdown("### 📁 Generated Files")
-    for filename, code in workspace.items():
-        with st.expander(f"📄 {filename}"):
-            language = (
-                "html"
-                if filename.endswith(".html")
-                else "css" if filename.endswith(".css") else "javascript"
-            )
-            st.code(code, language=language)
+    if not workspace:
+        return
+    filename = st.radio(
+        "File", list(workspace), horizontal=True, label_visibility="collapsed", key="shown_file"
+    )
+    if filename in workspace:
+        st.code(workspace[filename], language=language_for(filename))
 
-    # ✅ Logs
-    st.markdown("### 📋 Generation Logs")
-    with st.expander("View Logs"):
-        st.code("\n".join(logs))
 
-    # ✅ Preview & Download
+@st.fragment
+def preview_and_download(workspace: dict):
+    """
+    Playground and ZIP download. Their buttons only rerun this fragment,
+    not the file panels and logs above.
+    """
     col_a, col_b = st.columns(2)
 
     # ✅ View Playground
     with col_a:
         if st.button("👁️ View Playground", use_container_width=True):
-            workspace = st.session_state.get("workspace", {})
-
             if "index.html" not in workspace:
                 st.warning("⚠️ No index.html found — preview works only for web apps.")
             else:
@@ -200,18 +170,294 @@ if "workspace" in st.session_state:
                     scrolling=False,
                 )
 
-    # ✅ Download ZIP
+    # ✅ Download ZIP (built once per workspace version, see project_zip)
     with col_b:
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-            for filename, code in workspace.items():
-                zip_file.writestr(filename, code)
-        zip_buffer.seek(0)
-
         st.download_button(
             label="📥 Download Code",
-            data=zip_buffer,
+            data=project_zip(workspace),
             file_name="codebuddy_project.zip",
             mime="application/zip",
+            on_click="ignore",
             use_container_width=True,
         )
+
+
+# ✅ Header
+st.markdown('<h1 class="main-header">🤖 Code Buddy</h1>', unsafe_allow_html=True)
+st.markdown(
+    '<p class="subtitle">Your AI partner for turning ideas into web applications</p>',
+    unsafe_allow_html=True,
+)
+st.markdown("---")
+
+# ✅ Prompt Input
+prompt = st.text_area(
+    "✨ **Describe your app idea**",
+    key="prompt_input",
+    placeholder="Example: Build a weather dashboard with search and 5-day forecast",
+    height=180,
+    help="Be specific about layout and features",
+)
+
+# ✅ Generation options
+with st.expander("⚙️ Options"):
+    parallel = st.toggle(
+        "⚡ Code files in parallel",
+        value=False,
+        help="Runs one coder/critic loop per file at the same time",
+    )
+    max_concurrency = st.slider(
+        "Max files coded at once",
+        min_value=1,
+        max_value=10,
+        value=DEFAULT_MAX_CONCURRENCY,
+        disabled=not parallel,
+    )
+    stream_tokens = st.toggle(
+        "📝 Show code while it is written",
+        value=True,
+        help="Streams each draft into its file panel as the coder writes it",
+    )
+    static_checks = st.toggle(
+        "🧪 Check drafts locally first",
+        value=True,
+        help="Broken HTML/JS/CSS goes straight back to the coder without an LLM review",
+    )
+    reuse_plans = st.toggle(
+        "♻️ Reuse plans of similar requests",
+        value=True,
+        help="Skips planning when a very similar app was planned before",
+    )
+    fused_planning = st.toggle(
+        "🧠 Plan all files in one call",
+        value=False,
+        help="One LLM call plans the project and every file (falls back to two calls if it fails)",
+    )
+    speculative_critic = st.toggle(
+        "⏩ Review drafts while they are written",
+        value=False,
+        help="Stops writing a long file early when its beginning is already on the wrong track",
+    )
+    correction_mode = st.radio(
+        "🩹 Corrections",
+        options=["full", "patch"],
+        format_func=lambda mode: {
+            "full": "Rewrite the whole file",
+            "patch": "Patch only the flawed parts",
+        }[mode],
+        horizontal=True,
+    )
+
+col1, col2, col3 = st.columns([1, 2, 1])
+with col2:
+    run_button = st.button(
+        "🚀 Generate Web App", type="primary", use_container_width=True
+    )
+
+    # ✅ A run that was interrupted (e.g. the page reloaded) can continue
+    resume_button = False
+    if st.session_state.get("thread_id") and not st.session_state.get("run_complete"):
+        resume_button = st.button("♻️ Resume last run", use_container_width=True)
+
+# ✅ Button Click Handler (runs agent once)
+if run_button or resume_button:
+    if run_button and not prompt:
+        st.error("⚠️ Please describe your app idea first!")
+    else:
+        st.markdown("### 🚧 **Building your app...**")
+
+        # New log entries are appended below the previous ones,
+        # so earlier entries are never re-rendered
+        log_box = st.container(height=300)
+        progress = st.progress(0)
+
+        # ✅ One live panel per file, filled while the coder writes
+        drafts_area = st.container()
+        drafts = {}  # filename -> (iteration, text so far)
+        draft_boxes = {}  # filename -> placeholder
+
+        logs = []
+        workspace = {}
+
+        # Files are compressed into the download as they are committed
+        zip_builder = IncrementalZip(get_compression_level())
+        st.session_state["zip_builder"] = zip_builder
+
+        # For the percentage indicator, refined once the files are planned
+        step_count = 0
+        estimated_steps = PLANNING_STEPS + estimate_steps(FILES_BEFORE_PLANNING, parallel)
+
+        if run_button:
+            updates = run_scheduled(
+                prompt,
+                parallel=parallel,
+                max_concurrency=max_concurrency,
+                stream_tokens=stream_tokens,
+                correction_mode=correction_mode,
+                static_checks=static_checks,
+                reuse_plans=reuse_plans,
+                fused_planning=fused_planning,
+                speculative_critic=speculative_critic,
+            )
+        else:
+            updates = resume_scheduled(
+                st.session_state["thread_id"],
+                max_concurrency=max_concurrency,
+                stream_tokens=stream_tokens,
+            )
+        st.session_state["run_complete"] = False
+
+        # Shows the place in line while other runs use all the slots
+        queue_box = st.empty()
+        failed = False
+
+        try:
+            for update in updates:
+                # ✅ the same request is already running: follow that run
+                if "coalesced" in update:
+                    entry = "🔗 This app is already being generated, following that run..."
+                    logs.append(entry)
+                    log_box.markdown(entry)
+                    continue
+
+                # ✅ waiting for a free run slot (not a graph step)
+                if "queue" in update:
+                    queue = update["queue"]
+                    if queue["position"]:
+                        queue_box.info(
+                            f"⏳ Waiting for a free slot: #{queue['position']} in line "
+                            f"({queue['running']} apps being generated)"
+                        )
+                    else:
+                        queue_box.empty()
+                    continue
+
+                # ✅ timings of the finished run (last event)
+                if "metrics" in update:
+                    st.session_state["metrics"] = update["metrics"]
+                    continue
+
+                # ✅ run info (first event), with the saved progress when resuming
+                if "run" in update:
+                    run_info = update["run"]
+                    st.session_state["thread_id"] = run_info["thread_id"]
+                    for entry in run_info.get("logs", []):
+                        logs.append(entry)
+                        log_box.markdown(entry)
+                    workspace.update(run_info.get("workspace", {}))
+                    zip_builder.update(workspace)
+                    if run_info.get("planned_files"):
+                        left = set(run_info["planned_files"]) - set(workspace)
+                        estimated_steps = estimate_steps(len(left), run_info.get("parallel", parallel))
+                    if workspace:
+                        st.session_state["workspace"] = workspace
+                    continue
+
+                # ✅ live draft chunks (not a graph step)
+                if "coder_draft" in update:
+                    chunk = update["coder_draft"]
+                    filename = chunk["current_file"]
+
+                    if filename not in draft_boxes:
+                        with drafts_area.expander(f"📝 {filename}", expanded=False):
+                            draft_boxes[filename] = st.empty()
+
+                    # A new iteration rewrites the file from scratch
+                    iteration, text = drafts.get(filename, (chunk["iteration"], ""))
+                    if iteration != chunk["iteration"]:
+                        text = ""
+                    text += chunk["delta"]
+                    drafts[filename] = (chunk["iteration"], text)
+
+                    draft_boxes[filename].code(text, language=language_for(filename))
+                    continue
+
+                step_count += 1
+                state_update = list(update.values())[0]
+
+                # ✅ the plan is known: estimate from the number of files
+                if state_update and state_update.get("file_plans"):
+                    estimated_steps = step_count + estimate_steps(
+                        len(state_update["file_plans"]), parallel
+                    )
+                progress.progress(min(1.0, step_count / estimated_steps))
+
+                # ✅ live update logs (nodes only send their new entries)
+                if state_update and state_update.get("logs"):
+                    logs.extend(state_update["logs"])
+                    for entry in state_update["logs"]:
+                        log_box.markdown(entry)
+
+                # ✅ live update workspace
+                if state_update and "workspace" in state_update:
+                    # Parallel coders send only their own file, so merge
+                    workspace.update(state_update["workspace"])
+                    zip_builder.update(state_update["workspace"])
+                    st.session_state["workspace"] = workspace
+        except SchedulerBusy as e:
+            failed = True
+            st.error(f"🚦 Too many apps are being generated right now. {e}")
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            failed = True
+            st.error("🚦 The LLM provider is rate limiting requests. Wait a minute, then use ♻️ Resume last run.")
+
+        queue_box.empty()
+        progress.empty()
+
+        if not failed:
+            st.session_state["logs"] = logs
+            st.session_state["run_complete"] = True
+            st.success("✅ App generation complete!")
+
+# ✅ ---------------- DISPLAY SECTION (persists after rerun) ----------------
+if "workspace" in st.session_state:
+    workspace = st.session_state["workspace"]
+    logs = st.session_state.get("logs", [])
+
+    # ✅ Success box
+    st.markdown(
+        """
+        <div class="success-box">
+            <h3 style="margin:0; color:#667eea;">✅ Generation Complete!</h3>
+            <p style="margin:0.5rem 0 0 0; color:#666;">Your web app is ready to preview</p>
+        </div>
+        """,
+        unsafe_allow_html=True,
+    )
+
+    # ✅ Show generated files
+    generated_files(workspace)
+
+    # ✅ Per-file timing breakdown
+    metrics = st.session_state.get("metrics")
+    if metrics:
+        st.markdown("### ⏱️ Timing")
+        st.caption(
+            f"{metrics['wall_s']:.1f}s in total, {metrics['llm_calls']} LLM calls "
+            f"({metrics['llm_latency_s']:.1f}s), {metrics['input_tokens']} input / "
+            f"{metrics['output_tokens']} output tokens"
+        )
+        st.table(
+            [
+                {
+                    "File": filename,
+                    "Time (s)": round(timing["wall_s"], 1),
+                    "Iterations": timing["iterations"],
+                    "Coder (s)": round(timing["coder_s"], 1),
+                    "Checks (s)": round(timing["static_check_s"], 2),
+                    "Critic (s)": round(timing["critic_s"], 1),
+                    "Tokens in/out": f"{timing['input_tokens']} / {timing['output_tokens']}",
+                }
+                for filename, timing in metrics["files"].items()
+            ]
+        )
+
+    # ✅ Logs
+    st.markdown("### 📋 Generation Logs")
+    with st.expander("View Logs"):
+        st.code("\n".join(logs))
+
+    # ✅ Preview & Download
+    preview_and_download(workspace)
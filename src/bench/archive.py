@@ -0,0 +1,79 @@
+"""
+Benchmark: the project ZIP download on every Streamlit rerun.
+
+For projects of growing size it compares what one rerun costs:
+  - "rebuild":  the previous code, a new ZIP_DEFLATED archive every time
+  - "cached":   hashing the workspace to find the cached archive
+                (what `project_zip` does when the builder is out of sync)
+  - "builder":  the IncrementalZip filled during the run is in sync
+                (hash from the stored digests, archive returned as is)
+It also reports how long the incremental builder took in total while
+files were committed, and the archive size per compression level.
+
+Run from the `src` folder:
+    python -m bench.archive [--files 10 50 200] [--size 6000] [--repeat 20]
+"""
+
+import time
+import argparse
+
+from bench.replay import synthetic_code
+from core.archive import IncrementalZip, build_zip, workspace_hash
+
+EXTENSIONS = [".html", ".css", ".js", ".json", ".md"]
+
+
+def make_workspace(files: int, size: int) -> dict:
+    return {
+        f"src/module_{i}{EXTENSIONS[i % len(EXTENSIONS)]}": synthetic_code(
+            f"f{EXTENSIONS[i % len(EXTENSIONS)]}", size
+        )
+        for i in range(files)
+    }
+
+
+def per_call_ms(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--size", type=int, default=6000, help="characters per file")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"--- ZIP download per rerun ({args.size} chars per file) ---")
+    print(
+        f"{'files':>6} {'rebuild ms':>11} {'cached ms':>10} {'builder ms':>11}"
+        f" {'built during run ms':>20}"
+    )
+    for files in args.files:
+        workspace = make_workspace(files, args.size)
+
+        start = time.perf_counter()
+        builder = IncrementalZip()
+        for filename, code in workspace.items():
+            builder.add(filename, code)  # one commit at a time
+        during_run = (time.perf_counter() - start) * 1000
+
+        rebuild = per_call_ms(lambda: build_zip(workspace), args.repeat)
+        cached = per_call_ms(lambda: workspace_hash(workspace), args.repeat)
+        key = workspace_hash(workspace)
+        in_sync = per_call_ms(
+            lambda: builder.workspace_hash() == key and builder.getvalue(), args.repeat
+        )
+        print(
+            f"{files:>6} {rebuild:>11.2f} {cached:>10.2f} {in_sync:>11.2f} {during_run:>20.1f}"
+        )
+
+    workspace = make_workspace(max(args.files), args.size)
+    raw = sum(len(code.encode("utf-8")) for code in workspace.values())
+    print(f"\n--- Compression level ({max(args.files)} files, {raw / 1024:.0f} KB) ---")
+    print(f"{'level':>6} {'build ms':>9} {'size KB':>8}")
+    for level in (0, 1, 6, 9):
+        elapsed = per_call_ms(lambda: build_zip(workspace, level), max(1, args.repeat // 4))
+        print(f"{level:>6} {elapsed:>9.1f} {len(build_zip(workspace, level)) / 1024:>8.0f}")
@@ -0,0 +1,147 @@
+"""
+Benchmark: cost of saving a checkpoint after every step.
+
+Runs the sequential agent against instant fake LLMs, once without a
+checkpointer and once with the SQLite one, and compares the time per
+step. It also compares the bytes written to the database with the size
+of the full state at each step (what saving whole `AgentState` dumps
+would cost): the per-file channels ('workspace', 'symbol_index',
+'file_plans', 'file_dependencies', the queue) and 'logs' only store
+their new entries, and plans, drafts and code are artifact refs (see
+core/artifacts.py). The bytes written per step still grow a little with
+the number of files (~3.9 KB at 5 files, ~4.4 KB at 40), but not with
+their size: `--file-kb` changes the size of every file. The artifact
+store's own bytes are reported separately.
+
+Run from the `src` folder:
+    python -m bench.checkpoints [--file-kb 4]
+"""
+
+import io
+import os
+import sqlite3
+import tempfile
+import time
+import uuid
+import argparse
+from contextlib import redirect_stdout
+
+# Every run has to plan its own file count
+os.environ.setdefault("PLAN_CACHE_DISABLED", "1")
+# Keep benchmark artifacts out of the app's own store
+os.environ.setdefault(
+    "AGENT_ARTIFACT_PATH", os.path.join(tempfile.gettempdir(), "bench_artifacts.sqlite")
+)
+
+import aiosqlite
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from bench.fake_llm import install_fake_llms
+from core.artifacts import get_artifact_store
+from core.checkpoint import SqliteCheckpointer
+from core.async_utils import run_on_loop
+
+FILE_COUNTS = [5, 20, 40]
+
+
+def make_code(kb: float) -> str:
+    """A file of about 'kb' KB, so the workspace grows like a real project."""
+    rows = max(1, int(kb * 1024 / 45))
+    return "<section>\n" + "  <p class='row'>Generated content line.</p>\n" * rows + "</section>"
+
+
+def stored_bytes(path: str) -> tuple:
+    """Bytes of checkpoint and pending-write blobs in the database, and the largest checkpoint."""
+    conn = sqlite3.connect(path)
+    try:
+        checkpoints, largest = conn.execute(
+            "SELECT COALESCE(SUM(LENGTH(checkpoint) + LENGTH(metadata)), 0),"
+            " COALESCE(MAX(LENGTH(checkpoint)), 0) FROM checkpoints"
+        ).fetchone()
+        writes = conn.execute("SELECT COALESCE(SUM(LENGTH(value)), 0) FROM writes").fetchone()[0]
+    finally:
+        conn.close()
+    return checkpoints + writes, largest
+
+
+def artifact_bytes() -> int:
+    """Bytes of text in the artifact store (identical files are stored once)."""
+    get_artifact_store().flush()
+    conn = sqlite3.connect(os.environ["AGENT_ARTIFACT_PATH"])
+    try:
+        return conn.execute("SELECT COALESCE(SUM(LENGTH(data)), 0) FROM blobs").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def run_once(file_count: int, code: str, checkpointer=None) -> dict:
+    files = [f"page_{i}.html" for i in range(file_count)]
+    install_fake_llms(files, critic_responses=["PERFECT"], code=code)
+
+    from agent.graph import create_agent_graph, make_initial_state, resolve_update
+
+    with redirect_stdout(io.StringIO()):
+        graph = create_agent_graph(checkpointer=checkpointer)
+    config = {
+        "recursion_limit": 20 * file_count + 20,
+        "configurable": {"thread_id": uuid.uuid4().hex},
+    }
+
+    serde = JsonPlusSerializer()
+    state = make_initial_state("benchmark app")
+    full_dump_bytes = 0
+    step_times = []
+
+    with redirect_stdout(io.StringIO()):
+        last = time.perf_counter()
+        for step in graph.stream(state, config=config):
+            step_times.append(time.perf_counter() - last)
+
+            # Track what a full dump of the state (with the texts) would weigh
+            update = list(resolve_update(step).values())[0] or {}
+            for key, value in update.items():
+                if key == "workspace":
+                    state["workspace"] = {**state["workspace"], **value}
+                elif key == "logs":
+                    state["logs"] = state["logs"] + value
+                else:
+                    state[key] = value
+            full_dump_bytes += len(serde.dumps_typed(state)[1])
+
+            last = time.perf_counter()
+
+    return {
+        "steps": len(step_times),
+        "step_ms": sum(step_times) / len(step_times) * 1000,
+        "full_dump_kb": full_dump_bytes / 1024,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--file-kb", type=float, default=4.0, help="size of every generated file")
+    args = parser.parse_args()
+    code = make_code(args.file_kb)
+
+    with redirect_stdout(io.StringIO()):
+        import agent.graph  # noqa: F401 (compiles the default graph once)
+
+    print(f"--- Checkpoint cost per step ({args.file_kb:g} KB files) ---")
+    print(
+        f"{'files':>6} {'steps':>6} {'no ckpt ms':>11} {'sqlite ms':>10}"
+        f" {'written KB':>11} {'largest KB':>11} {'artifacts KB':>13} {'full dumps KB':>14}"
+    )
+    for count in FILE_COUNTS:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "checkpoints.sqlite")
+            saver = run_on_loop(lambda: SqliteCheckpointer(aiosqlite.connect(path)))
+
+            base = run_once(count, code)
+            saved = run_once(count, code, checkpointer=saver)
+            written, largest = stored_bytes(path)
+
+        print(
+            f"{count:>6} {saved['steps']:>6} {base['step_ms']:>11.2f}"
+            f" {saved['step_ms']:>10.2f} {written / 1024:>11.0f} {largest / 1024:>11.1f}"
+            f" {artifact_bytes() / 1024:>13.0f} {saved['full_dump_kb']:>14.0f}"
+        )
@@ -0,0 +1,78 @@
+"""
+Benchmark: coalescing identical in-flight runs (agent/coalesce.py).
+
+Submits the same request several times, with the arrivals spread over
+a short window (like a popular demo prompt), through `arun_scheduled`
+with and without coalescing. Every LLM call is answered by a ReplayLLM
+(see bench/replay.py). Reports the pipelines started, LLM calls and
+p50/max time until each requester has its files.
+
+Run from the `src` folder:
+    python -m bench.coalesce [--requests 8] [--spread 2.0] [--latency 0.2] [--tokens-per-second 400]
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+
+os.environ.setdefault(
+    "AGENT_CHECKPOINT_PATH", os.path.join(tempfile.gettempdir(), "bench_checkpoints.sqlite")
+)
+os.environ.setdefault("PLAN_CACHE_DISABLED", "1")
+
+from agent.coalesce import get_run_coalescer
+from agent.scheduler import arun_scheduled
+from bench.e2e import DEFAULT_QUERIES, load_queries
+from bench.replay import LLMStats, Responder, install_replay_llms
+from core.async_utils import run_sync
+from core.metrics import percentile
+
+
+async def one_request(query: str, delay: float) -> tuple:
+    """Time until the run's last event, and the files received."""
+    await asyncio.sleep(delay)
+    start = time.perf_counter()
+    files = set()
+    async for event in arun_scheduled(query):
+        for update in event.values():
+            if isinstance(update, dict) and update.get("workspace"):
+                files.update(update["workspace"])
+    return time.perf_counter() - start, files
+
+
+async def burst(query: str, requests: int, spread: float) -> list:
+    delays = [spread * i / max(1, requests - 1) for i in range(requests)]
+    return await asyncio.gather(*(one_request(query, delay) for delay in delays))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--spread", type=float, default=2.0, help="seconds over which requests arrive")
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=400.0)
+    args = parser.parse_args()
+
+    entry = load_queries(DEFAULT_QUERIES)[0]
+    print(
+        f"--- {args.requests} identical requests within {args.spread:.1f}s"
+        f" ({entry.get('title', entry['query'][:20])}) ---"
+    )
+    print(f"{'coalescing':<11} {'runs':>5} {'calls':>6} {'p50 s':>7} {'max s':>7} {'same files':>11}")
+    for enabled in (False, True):
+        os.environ["AGENT_COALESCE_DISABLED"] = "0" if enabled else "1"
+        stats = LLMStats()
+        install_replay_llms(Responder(entry), stats, args.latency, args.tokens_per_second)
+        coalescer = get_run_coalescer()
+        started = coalescer.started
+
+        results = run_sync(burst(entry["query"], args.requests, args.spread))
+        times = [t for t, _ in results]
+        same = all(files == results[0][1] for _, files in results)
+        runs = coalescer.started - started if enabled else args.requests
+        print(
+            f"{'on' if enabled else 'off':<11} {runs:>5} {stats.summary()['llm_calls']:>6}"
+            f" {percentile(times, 0.5):>7.2f} {max(times):>7.2f} {str(same):>11}"
+        )
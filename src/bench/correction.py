@@ -0,0 +1,117 @@
+"""
+Benchmark: full-file rewrites vs. SEARCH/REPLACE patches for corrections.
+
+For every recorded critique loop (draft -> critique -> corrected file) it
+compares the output the coder has to generate:
+  - "full":  the whole corrected file (CODER_CORRECTION_PROMPT)
+  - "patch": only the SEARCH/REPLACE blocks that turn the draft into the
+             corrected file (CODER_PATCH_PROMPT), applied locally.
+
+The patch is derived from the recorded files with difflib, so this is the
+smallest patch a model could answer with. Output tokens are estimated at
+~4 characters per token, and seconds from a fixed generation speed.
+
+Run from the `src` folder:
+    python -m bench.correction [loops.jsonl] [--tokens-per-second 80]
+"""
+
+import os
+import json
+import time
+import difflib
+import argparse
+
+from core.metrics import approx_tokens
+from core.patching import apply_search_replace
+from core.prompts import CODER_CORRECTION_PROMPT, CODER_PATCH_PROMPT
+
+DEFAULT_LOOPS = os.path.join(os.path.dirname(__file__), "data", "critique_loops.jsonl")
+
+
+def make_patch(draft: str, corrected: str) -> str:
+    """
+    Builds SEARCH/REPLACE blocks that turn `draft` into `corrected`,
+    widening the context until every SEARCH part is unique.
+    """
+    old_lines = draft.split("\n")
+    new_lines = corrected.split("\n")
+
+    for context in range(1, 10):
+        blocks = []
+        matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+        for group in matcher.get_grouped_opcodes(context):
+            i1, i2 = group[0][1], group[-1][2]
+            j1, j2 = group[0][3], group[-1][4]
+            search = "\n".join(old_lines[i1:i2])
+            replace = "\n".join(new_lines[j1:j2])
+            blocks.append(
+                f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+            )
+        patch = "\n".join(blocks)
+
+        try:
+            if apply_search_replace(draft, patch) == corrected:
+                return patch
+        except ValueError:
+            pass  # Ambiguous SEARCH part, add more context
+
+    raise ValueError("Could not build a patch for this loop.")
+
+
+def load_loops(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("loops", nargs="?", default=DEFAULT_LOOPS)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    args = parser.parse_args()
+
+    loops = load_loops(args.loops)
+    rate = args.tokens_per_second
+
+    print(f"--- Correction output: full rewrite vs. patch ({len(loops)} loops) ---")
+    print(
+        f"{'file':<12} {'full out':>9} {'patch out':>10} {'saved':>7}"
+        f" {'saved s':>8} {'extra in':>9} {'apply ms':>9}"
+    )
+
+    total_full = total_patch = 0
+    for loop in loops:
+        prompt_input = {
+            "current_file": loop["file"],
+            "file_plan": loop["plan"],
+            "critique": loop["critique"],
+            "current_code_draft": loop["draft"],
+        }
+        full_out = approx_tokens(loop["corrected"])
+
+        patch = make_patch(loop["draft"], loop["corrected"])
+        patch_out = approx_tokens(patch)
+
+        start = time.perf_counter()
+        patched = apply_search_replace(loop["draft"], patch)
+        apply_ms = (time.perf_counter() - start) * 1000
+        assert patched == loop["corrected"]
+
+        # The patch prompt carries extra formatting instructions
+        extra_in = approx_tokens(CODER_PATCH_PROMPT.format(**prompt_input)) - approx_tokens(
+            CODER_CORRECTION_PROMPT.format(**prompt_input)
+        )
+
+        total_full += full_out
+        total_patch += patch_out
+        print(
+            f"{loop['file']:<12} {full_out:>9} {patch_out:>10}"
+            f" {1 - patch_out / full_out:>7.0%} {(full_out - patch_out) / rate:>8.2f}"
+            f" {extra_in:>9} {apply_ms:>9.3f}"
+        )
+
+    saved = total_full - total_patch
+    print(
+        f"\n    > Per retry: {saved / len(loops):.0f} output tokens and"
+        f" {saved / len(loops) / rate:.2f} s saved on average"
+        f" (at {rate:.0f} tokens/s)."
+    )
@@ -0,0 +1,164 @@
+"""
+Benchmark: end-to-end agent runs without a network.
+
+Runs `run_agent` for every query of a corpus while every LLM call is
+answered by a ReplayLLM (see bench/replay.py), with a simulated time to
+first token and generation speed. Reports per query the wall-clock time,
+LLM calls, (approximate) input/output tokens and critic retries, and
+p50/p95 latency per graph node over all runs (from the node metrics
+that `run_agent` records, see core/metrics.py).
+
+Run from the `src` folder:
+    python -m bench.e2e [queries.jsonl] [--latency 0.5] [--tokens-per-second 80]
+    python -m bench.e2e --replay recordings.jsonl   # serve recorded responses
+    python -m bench.e2e --record recordings.jsonl   # live run (needs GOOGLE_API_KEY)
+"""
+
+import io
+import os
+import json
+import time
+import argparse
+import tempfile
+from collections import defaultdict
+from contextlib import redirect_stdout
+
+# Keep benchmark runs out of the app's own checkpoint database
+os.environ.setdefault(
+    "AGENT_CHECKPOINT_PATH", os.path.join(tempfile.gettempdir(), "bench_checkpoints.sqlite")
+)
+# Every query has to be planned, or the timings would depend on earlier runs
+os.environ.setdefault("PLAN_CACHE_DISABLED", "1")
+
+from core.metrics import RunMetrics, percentile
+from bench.replay import (
+    LLMStats,
+    Recorder,
+    Responder,
+    install_recording_llms,
+    install_replay_llms,
+    load_recordings,
+)
+
+DEFAULT_QUERIES = os.path.join(os.path.dirname(__file__), "data", "queries.jsonl")
+
+
+def load_queries(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_query(query: str, options: dict) -> dict:
+    """
+    Runs the agent once and returns its wall-clock time and the duration
+    of every node execution: {"wall_s", "node_times": {node: [s]}}.
+    """
+    metrics = RunMetrics("bench")
+    with redirect_stdout(io.StringIO()):
+        from agent.graph import run_agent
+
+        start = time.perf_counter()
+        for _ in run_agent(query, metrics=metrics, **options):
+            pass
+        wall = time.perf_counter() - start
+
+    node_times = defaultdict(list)
+    for record in metrics.snapshot():
+        node_times[record.node].append(record.duration_s)
+    return {"wall_s": wall, "node_times": dict(node_times)}
+
+
+def print_report(results: list):
+    print(
+        f"{'query':<20} {'files':>5} {'wall s':>7} {'calls':>6}"
+        f" {'in tok':>8} {'out tok':>8} {'retries':>8}"
+    )
+    for r in results:
+        print(
+            f"{r['title'][:20]:<20} {r['files']:>5} {r['wall_s']:>7.2f} {r['llm_calls']:>6}"
+            f" {r['input_tokens']:>8} {r['output_tokens']:>8} {r['retries']:>8}"
+        )
+    print(
+        f"{'total':<20} {sum(r['files'] for r in results):>5}"
+        f" {sum(r['wall_s'] for r in results):>7.2f}"
+        f" {sum(r['llm_calls'] for r in results):>6}"
+        f" {sum(r['input_tokens'] for r in results):>8}"
+        f" {sum(r['output_tokens'] for r in results):>8}"
+        f" {sum(r['retries'] for r in results):>8}"
+    )
+
+    all_times = defaultdict(list)
+    for r in results:
+        for node, times in r["node_times"].items():
+            all_times[node].extend(times)
+
+    print(f"\n{'node':<20} {'count':>6} {'p50 ms':>9} {'p95 ms':>9}")
+    for node, times in all_times.items():
+        print(
+            f"{node:<20} {len(times):>6} {percentile(times, 0.5) * 1000:>9.1f}"
+            f" {percentile(times, 0.95) * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("queries", nargs="?", default=DEFAULT_QUERIES)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    parser.add_argument("--replay", help="recordings file to serve responses from")
+    parser.add_argument("--record", help="run against the real LLM and record to this file")
+    parser.add_argument("--parallel", action="store_true")
+    parser.add_argument("--correction-mode", default="full", choices=["full", "patch"])
+    parser.add_argument(
+        "--fused-planning", action="store_true", help="plan project and files in one call"
+    )
+    parser.add_argument(
+        "--speculative-critic", action="store_true", help="review drafts while they stream"
+    )
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    recordings = load_recordings(args.replay) if args.replay else None
+    options = {
+        "parallel": args.parallel,
+        "correction_mode": args.correction_mode,
+        "fused_planning": args.fused_planning,
+        "speculative_critic": args.speculative_critic,
+    }
+
+    if args.record:
+        for entry in queries:
+            install_recording_llms(Recorder(args.record, entry["query"]))
+            result = run_query(entry["query"], options)
+            print(f"    > Recorded {entry.get('title', entry['query'][:20])} in {result['wall_s']:.1f}s")
+        raise SystemExit(0)
+
+    source = f"replay of {args.replay}" if args.replay else "synthetic responses"
+    print(
+        f"--- End-to-end runs ({len(queries)} queries x {args.repeat}, {source},"
+        f" {args.latency:.2f}s to first token, {args.tokens_per_second:.0f} tokens/s,"
+        f" {'parallel' if args.parallel else 'serial'}, {args.correction_mode} corrections"
+        f"{', fused planning' if args.fused_planning else ''}"
+        f"{', speculative critic' if args.speculative_critic else ''}) ---"
+    )
+
+    results = []
+    for _ in range(args.repeat):
+        for entry in queries:
+            responder = Responder(entry, recordings)
+            stats = LLMStats()
+            install_replay_llms(responder, stats, args.latency, args.tokens_per_second)
+
+            result = run_query(entry["query"], options)
+            result.update(stats.summary())
+            result["title"] = entry.get("title", entry["query"])
+            result["files"] = len(responder.files)
+            results.append(result)
+
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
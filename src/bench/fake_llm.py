@@ -0,0 +1,110 @@
+import json
+import threading
+from itertools import cycle
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import Runnable
+
+from core.parsers import ProjectPlan, ProjectBlueprint, CriticVerdict
+
+
+def make_fake_chat_model(responses: list) -> GenericFakeChatModel:
+    """
+    Returns a local chat model that answers with the given responses
+    in order (looping forever), without touching the network.
+    """
+    return GenericFakeChatModel(
+        messages=cycle([AIMessage(content=text) for text in responses])
+    )
+
+
+class ScriptedLLM(Runnable):
+    """
+    A fake LLM that answers every agent node with a canned response.
+
+    It looks at the rendered prompt to find out which node is calling,
+    so a whole `run_agent` can run offline.
+    """
+
+    def __init__(
+        self,
+        parser_schema=None,
+        file_structure: list = None,
+        critic_responses: list = None,
+        code: str = "<div id='app'></div>",
+    ):
+        self.parser_schema = parser_schema
+        self.file_structure = file_structure or ["index.html", "style.css", "app.js"]
+        self.critic_responses = critic_responses
+        self.code = code
+
+    def invoke(self, input, config=None, **kwargs):
+        prompt_text = input.to_string() if hasattr(input, "to_string") else str(input)
+
+        if self.parser_schema is ProjectBlueprint:
+            return ProjectBlueprint(
+                project_title="Benchmark App",
+                project_description="A generated app used for benchmarks.",
+                tech_stack=["HTML", "CSS", "JavaScript"],
+                file_structure=self.file_structure,
+                file_plans=[
+                    {"filename": name, "plan": f"1. Write {name}."} for name in self.file_structure
+                ],
+            )
+        if self.parser_schema is ProjectPlan:
+            return ProjectPlan(
+                project_title="Benchmark App",
+                project_description="A generated app used for benchmarks.",
+                tech_stack=["HTML", "CSS", "JavaScript"],
+                file_structure=self.file_structure,
+            )
+        if "senior software architect" in prompt_text:
+            plans = {name: f"1. Write {name}." for name in self.file_structure}
+            return AIMessage(content=json.dumps(plans))
+        if "is still being written" in prompt_text:
+            # Speculative reviews of partial drafts always pass
+            return self._critic_response("PERFECT")
+        if "code reviewer" in prompt_text:
+            return self._critic_response(next(self.critic_responses))
+        return AIMessage(content=self.code)
+
+    def _critic_response(self, response):
+        """
+        Critic responses can be CriticVerdicts, or plain strings where
+        "PERFECT" passes and anything else is a major issue.
+        """
+        if isinstance(response, CriticVerdict):
+            return response
+        if self.parser_schema is not CriticVerdict:
+            return AIMessage(content=response)
+        if response == "PERFECT":
+            return CriticVerdict(passed=True, severity="none", issues=[])
+        return CriticVerdict(passed=False, severity="major", issues=[response])
+
+
+def install_fake_llms(
+    file_structure: list, critic_responses: list = ("PERFECT",), code: str = None
+):
+    """
+    Replaces `agent.llm.get_llm` so every node gets a ScriptedLLM.
+    Critic responses are handed out in order, looping forever.
+    """
+    import agent.llm as llm_module
+
+    lock = threading.Lock()
+    responses = cycle(critic_responses)
+
+    class _SharedCycle:
+        def __next__(self):
+            with lock:
+                return next(responses)
+
+    def fake_get_llm(model_name=None, temperature=0.0, parser_schema=None):
+        return ScriptedLLM(
+            parser_schema=parser_schema,
+            file_structure=file_structure,
+            critic_responses=_SharedCycle(),
+            code=code or "<div id='app'></div>",
+        )
+
+    llm_module.get_llm = fake_get_llm
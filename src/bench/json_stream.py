@@ -0,0 +1,113 @@
+"""
+Benchmark: parsing the file architect's JSON (core/json_stream.py).
+
+  - Robustness: how many file plans survive typical malformed responses
+    (trailing text with braces, missing commas, raw newlines, truncation)
+    with the previous find/rfind + json.loads parsing vs. the tolerant
+    stream parser.
+  - Streaming: when each plan is available at a simulated generation
+    speed, i.e. how much earlier the first file can start coding than
+    when waiting for the whole response.
+  - Parser cost per KB.
+
+Run from the `src` folder:
+    python -m bench.json_stream [--files 6] [--plan-chars 600] [--tokens-per-second 80]
+"""
+
+import json
+import time
+import argparse
+
+from core.json_stream import JSONObjectStream, parse_json_object
+
+CHARS_PER_TOKEN = 4
+
+
+def clean_json_response(raw_text: str) -> str:
+    """The architect's previous cleanup, kept for comparison."""
+    if raw_text.startswith("```json"):
+        raw_text = raw_text[7:]
+    if raw_text.startswith("```"):
+        raw_text = raw_text[3:]
+    if raw_text.endswith("```"):
+        raw_text = raw_text[:-3]
+    start_index = raw_text.find("{")
+    end_index = raw_text.rfind("}")
+    if start_index == -1 or end_index == -1:
+        raise ValueError("No valid JSON object found in the LLM response.")
+    return raw_text[start_index : end_index + 1]
+
+
+def old_parse(text: str) -> dict:
+    try:
+        return json.loads(clean_json_response(text))
+    except ValueError:
+        return {}
+
+
+def make_plans(files: int, plan_chars: int) -> dict:
+    names = ["index.html", "style.css", "app.js", "data.json", "utils.js", "about.html"]
+    plans = {}
+    for i in range(files):
+        name = names[i] if i < len(names) else f"module_{i}.js"
+        step = f"Add the element with id 'item-{i}' and wire it up. "
+        plans[name] = "".join(f"{n + 1}. {step}" for n in range(max(1, plan_chars // len(step))))
+    return plans
+
+
+def malformed_responses(plans: dict) -> dict:
+    """Name -> response text, for LLM mistakes seen in practice."""
+    clean = json.dumps(plans, indent=2)
+    pairs = [f'  "{name}": {json.dumps(plan)}' for name, plan in plans.items()]
+    return {
+        "clean": clean,
+        "fenced": f"```json\n{clean}\n```",
+        "text after": clean + "\n\nNote: the {app} div is the root.",
+        "missing comma": "{\n" + "\n".join(pairs) + "\n}",
+        "raw newlines": clean.replace(". 2.", ".\n2."),
+        "truncated": clean[: int(len(clean) * 0.8)],
+    }
+
+
+def stream_timeline(text: str, tokens_per_second: float) -> list:
+    """Seconds into the response at which each plan is complete."""
+    chunk = CHARS_PER_TOKEN * 4
+    stream = JSONObjectStream()
+    times = []
+    for start in range(0, len(text), chunk):
+        for _ in stream.feed(text[start : start + chunk]):
+            times.append(min(start + chunk, len(text)) / CHARS_PER_TOKEN / tokens_per_second)
+    return times
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=6)
+    parser.add_argument("--plan-chars", type=int, default=600)
+    parser.add_argument("--tokens-per-second", type=float, default=80.0)
+    args = parser.parse_args()
+
+    plans = make_plans(args.files, args.plan_chars)
+
+    print(f"--- Plans recovered ({len(plans)} files) ---")
+    print(f"{'response':<15} {'find/rfind':>11} {'stream':>7}")
+    for name, text in malformed_responses(plans).items():
+        print(f"{name:<15} {len(old_parse(text)):>11} {len(parse_json_object(text)):>7}")
+
+    text = json.dumps(plans, indent=2)
+    total = len(text) / CHARS_PER_TOKEN / args.tokens_per_second
+    times = stream_timeline(text, args.tokens_per_second)
+    print(f"\n--- Plan ready at ({args.tokens_per_second:.0f} tokens/s, {len(text)} chars) ---")
+    for (filename, _), at in zip(plans.items(), times):
+        print(f"{filename:<12} {at:>6.2f}s  (whole response: {total:.2f}s)")
+
+    big = json.dumps(make_plans(50, 2000))
+    repeat = 20
+    start = time.perf_counter()
+    for _ in range(repeat):
+        stream = JSONObjectStream()
+        for i in range(0, len(big), 16):
+            stream.feed(big[i : i + 16])
+        stream.finish()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"\n--- Parser cost: {elapsed * 1e6 / (len(big) / 1024):.0f} us per KB (16-char chunks) ---")
@@ -0,0 +1,51 @@
+"""
+Benchmark: per-call overhead of getting an LLM client.
+
+Compares the old path (a new ChatGoogleGenerativeAI for every node call)
+with the shared client registry. The Gemini client is built for real with
+a dummy API key, which never touches the network; the call itself goes to
+a local fake chat model so only the client overhead differs.
+
+Run from the `src` folder:
+    python -m bench.llm_clients
+"""
+
+import os
+import time
+
+os.environ.setdefault("GOOGLE_API_KEY", "benchmark-dummy-key")
+
+from agent.llm import create_structured_llm, get_llm, clear_llm_registry
+from bench.fake_llm import make_fake_chat_model
+from core.prompts import CRITIC_PROMPT
+
+CALLS = 60  # ~3 iterations x 2 LLM nodes x 10 files
+PROMPT_INPUT = {
+    "current_file": "index.html",
+    "file_plan": "1. Add a heading. 2. Add a button.",
+    "current_code_draft": "<h1>Hi</h1><button>Go</button>",
+}
+
+
+def run_calls(get_client) -> float:
+    """Runs CALLS critic-style calls and returns the mean ms per call."""
+    fake_llm = make_fake_chat_model(["PERFECT"])
+
+    start = time.perf_counter()
+    for _ in range(CALLS):
+        # Acquire the client like a node does, then call the fake model
+        get_client()
+        (CRITIC_PROMPT | fake_llm).invoke(PROMPT_INPUT)
+    return (time.perf_counter() - start) / CALLS * 1000
+
+
+if __name__ == "__main__":
+    clear_llm_registry()
+
+    before = run_calls(lambda: create_structured_llm(temperature=0.0))
+    after = run_calls(lambda: get_llm(temperature=0.0))
+
+    print(f"--- LLM client overhead ({CALLS} calls) ---")
+    print(f"    > New client per call : {before:8.3f} ms/call")
+    print(f"    > Shared registry     : {after:8.3f} ms/call")
+    print(f"    > Saved per run       : {(before - after) * CALLS / 1000:8.3f} s")
@@ -0,0 +1,116 @@
+"""
+Benchmark: per-step cost of the `logs` channel as projects grow.
+
+Runs the full agent against instant fake LLMs for projects of
+different sizes, with one coder/critic cycle per file, so the number of
+steps grows with the number of files. Nodes only emit their new log
+entries, and the channel (a DeltaChannel) saves only those in each
+checkpoint, so the bytes saved per step stay flat no matter how many
+files were already generated.
+
+Step times are reported as the median of the first and the last 10% of
+steps, and the last step on its own: checkpoints are written in the
+background, and a run only ends once every write has landed, so the last
+step grows with the number of steps whenever the writer falls behind.
+
+For every step it serializes what each channel would save, with the
+checkpointer's serializer:
+  - old: a plain list channel saves the whole log on every step that
+    adds to it
+  - new: the DeltaChannel saves only the entries the step added
+
+Run from the `src` folder:
+    python -m bench.logs
+"""
+
+import io
+import os
+import time
+import tempfile
+from contextlib import redirect_stdout
+
+os.environ.setdefault(
+    "AGENT_CHECKPOINT_PATH", os.path.join(tempfile.gettempdir(), "bench_checkpoints.sqlite")
+)
+# Every project size needs its own plan, not the one of the previous size
+os.environ.setdefault("PLAN_CACHE_DISABLED", "1")
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from bench.fake_llm import install_fake_llms
+from core.metrics import percentile
+
+FILE_COUNTS = [5, 20, 80]
+
+
+def serialized_size(serde: JsonPlusSerializer, value) -> int:
+    return len(serde.dumps_typed(value)[1])
+
+
+def run_once(file_count: int) -> dict:
+    files = [f"page_{i}.html" for i in range(file_count)]
+    # Every draft passes its first review: one coder/critic cycle per file
+    install_fake_llms(files, critic_responses=["PERFECT"])
+
+    from agent.graph import get_agent_graph, make_initial_state
+
+    # Sequential runs take ~6 steps per file, more than run_agent's limit
+    graph = get_agent_graph()
+    config = {
+        "recursion_limit": 20 * file_count + 20,
+        "configurable": {"thread_id": f"bench-logs-{file_count}-{time.time()}"},
+    }
+
+    serde = JsonPlusSerializer()
+    step_times = []
+    old_bytes = []
+    new_bytes = []
+    all_logs = []
+    committed = 0
+
+    with redirect_stdout(io.StringIO()):
+        last = time.perf_counter()
+        for step in graph.stream(
+            make_initial_state(f"benchmark app with {file_count} pages"), config=config
+        ):
+            now = time.perf_counter()
+            step_times.append(now - last)
+
+            node = list(step.keys())[0]
+            committed += node == "commit_code"
+            update = list(step.values())[0] or {}
+            new_logs = update.get("logs") or []
+            all_logs.extend(new_logs)
+            old_bytes.append(serialized_size(serde, all_logs) if new_logs else 0)
+            new_bytes.append(serialized_size(serde, new_logs) if new_logs else 0)
+
+            last = time.perf_counter()
+
+    steps = len(step_times)
+    tail = max(1, steps // 10)
+    return {
+        "files": committed,
+        "steps": steps,
+        "first_ms": percentile(step_times[:tail], 0.5) * 1000,
+        "last_ms": percentile(step_times[-tail - 1 : -1], 0.5) * 1000,
+        "end_ms": step_times[-1] * 1000,
+        "old_bytes": sum(old_bytes) / steps,
+        "new_bytes": sum(new_bytes) / steps,
+        "old_last": sum(old_bytes[-tail:]) / tail,
+        "new_last": sum(new_bytes[-tail:]) / tail,
+    }
+
+
+if __name__ == "__main__":
+    print("--- Per-step cost of logs (bytes: serialized logs channel per step) ---")
+    print(
+        f"{'files':>6} {'steps':>6} {'first 10% ms':>13} {'last 10% ms':>12} {'last step ms':>13}"
+        f" {'old B/step':>11} {'new B/step':>11} {'old B, last 10%':>16} {'new B, last 10%':>16}"
+    )
+    for count in FILE_COUNTS:
+        r = run_once(count)
+        print(
+            f"{r['files']:>6} {r['steps']:>6} {r['first_ms']:>13.3f} {r['last_ms']:>12.3f} {r['end_ms']:>13.1f}"
+            f" {r['old_bytes']:>11.0f} {r['new_bytes']:>11.0f}"
+            f" {r['old_last']:>16.0f} {r['new_last']:>16.0f}"
+        )
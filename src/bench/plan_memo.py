@@ -0,0 +1,159 @@
+"""
+Benchmark: reusing the plans of similar requests (core/plan_memo.py).
+
+  - Lookup latency (p50/p99) for memos of growing size, filled with
+    generated app requests.
+  - Matching quality on hand-written request pairs: paraphrases of the
+    same app should reuse its plan, different apps must not.
+  - The planner/architect LLM calls saved over a stream of requests
+    drawn from those apps, with and without reuse.
+
+Run from the `src` folder:
+    python -m bench.plan_memo [--sizes 1000 10000 50000] [--lookups 2000] [--threshold 0.9]
+"""
+
+import os
+import time
+import random
+import shutil
+import argparse
+import sqlite3
+import tempfile
+import json
+
+from core.metrics import percentile
+from core.plan_memo import PlanMemo, band_keys, embed_query, query_features
+
+# (stored request, similar request that should reuse its plan)
+SAME_APP = [
+    ("build me a simple to-do list app", "todo list app"),
+    ("to-do list with due dates", "make a todo list with due dates"),
+    ("a counter app with increment and decrement buttons", "counter with increment/decrement buttons"),
+    ("weather dashboard with city search", "Build a weather dashboard with a city search"),
+    ("calculator", "simple calculator app"),
+    ("pomodoro timer", "build a pomodoro timer website"),
+    ("tic tac toe game", "tic-tac-toe game"),
+    ("markdown previewer", "Build a markdown previewer web app"),
+    ("expense tracker with categories", "an expense tracker with categories"),
+    ("quiz app with a score counter", "make a quiz with a score counter"),
+]
+
+# (stored request, different request that must be planned again)
+DIFFERENT_APP = [
+    ("build me a simple to-do list app", "shopping list with prices"),
+    ("pomodoro timer", "pomodoro timer with weekly statistics"),
+    ("weather dashboard with city search", "weather dashboard with a 5-day forecast chart"),
+    ("calculator", "scientific calculator with graphing"),
+    ("tic tac toe game", "snake game"),
+    ("markdown previewer", "markdown editor with cloud sync and login"),
+    ("expense tracker with categories", "habit tracker with streaks"),
+    ("quiz app with a score counter", "flashcards for learning spanish"),
+    ("counter app", "countdown timer"),
+    ("landing page for a coffee shop", "landing page for a yoga studio"),
+    # An extra feature needs a plan of its own
+    ("a counter app with increment and decrement buttons",
+     "a counter app with increment, decrement and reset buttons"),
+    ("weather dashboard with a 5-day forecast", "weather dashboard with a 7-day forecast"),
+]
+
+SUBJECTS = [
+    "todo", "weather", "calculator", "quiz", "recipe", "expense", "habit", "pomodoro",
+    "chess", "snake", "kanban", "chat", "blog", "portfolio", "gallery", "music", "notes",
+    "budget", "fitness", "movie", "bookmark", "invoice", "inventory", "poll", "survey",
+]
+FEATURES = [
+    "dark mode", "search", "filters", "charts", "drag and drop", "local storage", "login",
+    "export to csv", "animations", "sound effects", "keyboard shortcuts", "tags",
+    "categories", "a timer", "statistics", "sharing", "comments", "ratings", "reminders",
+]
+
+PLAN = {
+    "project_title": "App",
+    "project_description": "An app.",
+    "tech_stack": ["HTML", "CSS", "JavaScript"],
+    "file_structure": ["index.html", "style.css", "app.js"],
+    "file_plans": {"index.html": "...", "style.css": "...", "app.js": "..."},
+}
+
+
+def random_request(rng: random.Random) -> str:
+    features = rng.sample(FEATURES, rng.randint(1, 3))
+    return f"{rng.choice(SUBJECTS)} {rng.choice(['app', 'tracker', 'dashboard', 'game'])} with {' and '.join(features)} #{rng.randint(0, 10**6)}"
+
+
+def fill(path: str, size: int, rng: random.Random, threshold: float) -> PlanMemo:
+    """A memo with 'size' entries (inserted in one transaction, then loaded)."""
+    with sqlite3.connect(path) as conn:
+        PlanMemo(path).clear()
+        plan = json.dumps(PLAN)
+        rows = []
+        for _ in range(size):
+            query = random_request(rng)
+            features = query_features(query)
+            vector, keys = embed_query(query, features), band_keys(features)
+            rows.append((query, vector.tobytes(), keys.tobytes(), plan, time.time()))
+        conn.executemany(
+            "INSERT INTO plans (query, vector, bands, plan, created_at) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+    return PlanMemo(path, threshold, max_entries=size + 1000)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    root = tempfile.mkdtemp(prefix="bench_plan_memo_")
+    try:
+        path = os.path.join(root, "plans.sqlite")
+
+        print("--- Lookup latency (new requests, mostly misses) ---")
+        print(f"{'entries':>8} {'p50 us':>8} {'p99 us':>8} {'load ms':>8}")
+        for size in args.sizes:
+            memo = fill(path, size, rng, args.threshold)
+            start = time.perf_counter()
+            PlanMemo(path, args.threshold)  # what the first lookup of a process pays
+            load_ms = (time.perf_counter() - start) * 1000
+
+            queries = [random_request(rng) for _ in range(args.lookups)]
+            times = []
+            for query in queries:
+                start = time.perf_counter()
+                memo.lookup(query)
+                times.append((time.perf_counter() - start) * 1e6)
+            print(
+                f"{size:>8} {percentile(times, 0.5):>8.0f} {percentile(times, 0.99):>8.0f}"
+                f" {load_ms:>8.0f}"
+            )
+
+        print(f"\n--- Matching (threshold {args.threshold}, {len(memo)} other entries) ---")
+        for stored, _ in SAME_APP + DIFFERENT_APP:
+            memo.remember(stored, {**PLAN, "project_title": stored})
+
+        def reused(stored: str, query: str) -> bool:
+            match = memo.lookup(query)
+            return match is not None and match["plan"]["project_title"] == stored
+
+        hits = sum(reused(stored, query) for stored, query in SAME_APP)
+        wrong = [(stored, query) for stored, query in DIFFERENT_APP if memo.lookup(query)]
+        print(f"similar requests reusing their plan: {hits}/{len(SAME_APP)}")
+        print(f"different requests given a plan:     {len(wrong)}/{len(DIFFERENT_APP)}")
+        for stored, query in wrong:
+            print(f"  wrongly matched: {query!r}")
+
+        # 2 LLM calls (planner + architect) per planned request
+        stream = [rng.choice(SAME_APP)[rng.randint(0, 1)] for _ in range(200)]
+        fresh = PlanMemo(os.path.join(root, "stream.sqlite"), args.threshold)
+        calls = 0
+        for query in stream:
+            if fresh.lookup(query) is None:
+                calls += 2
+                fresh.remember(query, PLAN)
+        print(f"\n--- {len(stream)} requests for {len(SAME_APP)} apps ---")
+        print(f"planner/architect calls: {2 * len(stream)} without reuse, {calls} with reuse")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,145 @@
+"""
+Benchmark: token budgeting of correction prompts (core/prompt_budget.py).
+
+For every recorded critique loop (draft -> critique -> corrected file) it
+builds the correction prompt as sent before (whole plan and draft) and
+after `compact_correction_input`, for full rewrites and for patches, and
+reports the input tokens of each (counted locally with `count_tokens`).
+"edits shown" checks that every draft line the recorded correction
+changes, or inserts next to, is still in the prompt, i.e. the model can
+still make the fix from what it sees. "restores" checks, for full
+rewrites, that copying the trimmed draft as shown (marker lines
+included) gives back the whole draft with `restore_omitted_lines`.
+
+The recorded files are small (1-2 KB). `--grow 20` adds 20 KB of code
+the critique is not about to every draft (and its correction), to see
+how the prompts grow with the file. `--max-tokens` lowers the budget
+(CORRECTION_PROMPT_MAX_TOKENS) to see what happens when a file no
+longer fits.
+
+Run from the `src` folder:
+    python -m bench.prompt_budget [loops.jsonl] [--grow 0] [--max-tokens 6000]
+"""
+
+import os
+import difflib
+import argparse
+
+from bench.correction import DEFAULT_LOOPS, load_loops
+from core.prompt_budget import OMITTED_PATTERN, compact_correction_input, restore_omitted_lines
+from core.prompts import OMITTED_LINES_NOTE_FULL, OMITTED_LINES_NOTE_PATCH
+
+
+def filler(filename: str, size: int) -> str:
+    """About 'size' characters of code for a file type, in blank-line separated blocks."""
+    if filename.endswith(".css"):
+        block = ".extra-{i} {{\n  margin: {i}px;\n  padding: {i}px;\n}}\n"
+    elif filename.endswith(".js"):
+        block = "function extra{i}(value) {{\n  return value + {i};\n}}\n"
+    else:
+        block = "<section class=\"extra-{i}\">\n  <p>Extra paragraph {i}</p>\n</section>\n"
+    blocks = []
+    i = 0
+    while sum(len(b) + 1 for b in blocks) < size:
+        blocks.append(block.format(i=i))
+        i += 1
+    return "\n".join(blocks)
+
+
+def visible_lines(shown_draft: str, draft: str) -> set:
+    """Indexes of the draft lines a (possibly trimmed) prompt draft shows."""
+    for note in (OMITTED_LINES_NOTE_FULL, OMITTED_LINES_NOTE_PATCH):
+        if shown_draft.startswith(note):
+            shown_draft = shown_draft[len(note) + 1 :]
+            break
+    else:
+        return set(range(len(draft.split("\n"))))
+
+    visible = set()
+    index = 0
+    for line in shown_draft.split("\n"):
+        match = OMITTED_PATTERN.search(line)
+        if match:
+            index = int(match.group(2))
+            continue
+        visible.add(index)
+        index += 1
+    return visible
+
+
+def restores(shown_draft: str, draft: str) -> bool:
+    """Whether a rewrite that copies the shown draft as is gives back the whole draft."""
+    copied = shown_draft.split(OMITTED_LINES_NOTE_FULL, 1)[-1].lstrip("\n")
+    return restore_omitted_lines(copied, draft, shown_draft) == draft
+
+
+def edits_shown(draft: str, corrected: str, visible: set) -> bool:
+    """Whether every line the correction changes, or inserts next to, is visible."""
+    old_lines, new_lines = draft.split("\n"), corrected.split("\n")
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines)
+    for tag, i1, i2, _, _ in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if i1 < i2 and not all(i in visible for i in range(i1, i2)):
+            return False
+        if i1 == i2:
+            # Code is inserted after the nearest non-blank line, or before line i1
+            before = i1 - 1
+            while before > 0 and not old_lines[before].strip():
+                before -= 1
+            if before not in visible and i1 not in visible:
+                return False
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("loops", nargs="?", default=DEFAULT_LOOPS)
+    parser.add_argument("--grow", type=float, default=0, help="KB of unrelated code added per draft")
+    parser.add_argument("--max-tokens", type=int, help="correction prompt budget")
+    args = parser.parse_args()
+    if args.max_tokens:
+        os.environ["CORRECTION_PROMPT_MAX_TOKENS"] = str(args.max_tokens)
+
+    loops = load_loops(args.loops)
+    if args.grow:
+        for loop in loops:
+            extra = filler(loop["file"], int(args.grow * 1024))
+            loop["draft"] = f"{loop['draft']}\n\n{extra}"
+            loop["corrected"] = f"{loop['corrected']}\n\n{extra}"
+    print(
+        f"--- Correction prompt input tokens, before -> after budgeting ({len(loops)} loops"
+        f"{f', +{args.grow:g} KB per draft' if args.grow else ''}) ---"
+    )
+    print(
+        f"{'file':<12} {'mode':<6} {'before':>7} {'after':>7} {'saved':>7}"
+        f" {'plan cut':>9} {'draft cut':>10} {'edits shown':>12} {'restores':>9}"
+    )
+
+    totals = {"full": [0, 0], "patch": [0, 0]}
+    for loop in loops:
+        prompt_input = {
+            "current_file": loop["file"],
+            "file_plan": loop["plan"],
+            "critique": loop["critique"],
+            "current_code_draft": loop["draft"],
+        }
+        for mode in ("full", "patch"):
+            compacted, report = compact_correction_input(prompt_input, mode, "gemini-2.0-flash")
+            shown = compacted["current_code_draft"]
+            visible = visible_lines(shown, loop["draft"])
+            before, after = report["tokens_before"], report["tokens_after"]
+            totals[mode][0] += before
+            totals[mode][1] += after
+            print(
+                f"{loop['file']:<12} {mode:<6} {before:>7} {after:>7} {1 - after / before:>7.0%}"
+                f" {str(report['plan_compacted']):>9} {str(report['draft_elided']):>10}"
+                f" {str(edits_shown(loop['draft'], loop['corrected'], visible)):>12}"
+                f" {str(restores(shown, loop['draft'])) if mode == 'full' else '-':>9}"
+            )
+
+    for mode, (before, after) in totals.items():
+        print(
+            f"\n    > {mode}: {before - after} of {before} input tokens saved"
+            f" ({1 - after / before:.0%}), {(before - after) / len(loops):.0f} per call."
+        )
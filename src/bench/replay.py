@@ -0,0 +1,432 @@
+"""
+Fake LLMs for end-to-end benchmarks: they serve recorded (or synthetic)
+responses with a simulated latency and token rate, and count every call.
+
+- `Responder` decides what each call answers. Responses come from a
+  recordings file when one is given, otherwise they are generated from the
+  query's corpus entry (file sizes, critic verdicts).
+- `ReplayLLM` plays a response back like a real chat model would: a fixed
+  time to first token, then output tokens at `tokens_per_second`.
+- `RecordingLLM` wraps a real LLM and writes its responses in the
+  recordings format, so live runs can be replayed offline later.
+"""
+
+import json
+import time
+import asyncio
+import threading
+from collections import defaultdict
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.runnables import Runnable
+
+from core.metrics import approx_tokens, record_llm_call
+from core.prompts import OMITTED_LINES_NOTE_FULL, OMITTED_LINES_NOTE_PATCH
+
+# Prompt text of the speculative critic, which runs inside the coder node
+PARTIAL_CRITIC_MARKER = "is still being written"
+
+# Prompt text that identifies a node when the call has no graph metadata
+NODE_MARKERS = [
+    ("fused_planner", "plan the whole project"),
+    ("file_architect", "senior software architect"),
+    ("critic", "code reviewer"),
+    ("project_planner", "software project manager"),
+]
+
+# Characters per streamed chunk (~4 tokens)
+CHUNK_CHARS = 16
+
+
+def detect_node(prompt_text: str, config: dict = None) -> str:
+    """The graph node making an LLM call ("partial_critic" for speculative reviews)."""
+    if PARTIAL_CRITIC_MARKER in prompt_text:
+        return "partial_critic"
+    node = ((config or {}).get("metadata") or {}).get("langgraph_node")
+    if node in ("fused_planner", "project_planner", "file_architect", "coder", "critic"):
+        return node
+    for name, marker in NODE_MARKERS:
+        if marker in prompt_text:
+            return name
+    return "coder"
+
+
+def detect_file(prompt_text: str, files: list) -> str:
+    """The file a coder/critic prompt is about: the first one it mentions."""
+    positions = [
+        (prompt_text.find(name), name) for name in files if name in prompt_text
+    ]
+    return min(positions)[1] if positions else None
+
+
+def load_recordings(path: str) -> dict:
+    """
+    Reads a recordings file (one LLM call per line:
+    {"query", "node", "file", "response"}) into
+    {query: {(node, file): [responses in call order]}}.
+    """
+    recordings = defaultdict(lambda: defaultdict(list))
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                call = json.loads(line)
+                key = (call["node"], call.get("file"))
+                recordings[call["query"]][key].append(call["response"])
+    return recordings
+
+
+# -- Synthetic responses --
+
+
+def synthetic_code(filename: str, size: int) -> str:
+    """Valid filler code of roughly `size` characters for a file type."""
+    head, tail = "", ""
+    if filename.endswith(".html"):
+        line = "  <p class='row-{i}'>Generated row {i}</p>\n"
+        head, tail = "<!DOCTYPE html>\n<html>\n<body>\n", "</body>\n</html>"
+    elif filename.endswith(".css"):
+        line = ".row-{i} {{ margin: {i}px; }}\n"
+    elif filename.endswith(".js"):
+        line = "const row{i} = document.querySelector('.row-{i}');\n"
+    elif filename.endswith(".json"):
+        return json.dumps({f"key_{i}": i for i in range(max(1, size // 12))})
+    else:
+        line = "Generated line {i}.\n"
+
+    lines = []
+    length = len(head) + len(tail)
+    i = 0
+    while length < size:
+        lines.append(line.format(i=i))
+        length += len(lines[-1])
+        i += 1
+    return head + "".join(lines) + tail
+
+
+def synthetic_patch(prompt_text: str) -> str:
+    """A small SEARCH/REPLACE answer that applies to the draft in the prompt."""
+    draft = prompt_text.split("Your Previous Draft:", 1)[-1]
+    # A trimmed draft starts with a note about its omitted lines
+    draft = draft.split(OMITTED_LINES_NOTE_PATCH, 1)[-1]
+    first_line = next((line for line in draft.split("\n") if line.strip()), "")
+    return f"<<<<<<< SEARCH\n{first_line}\n=======\n{first_line}\n>>>>>>> REPLACE"
+
+
+def synthetic_rewrite(prompt_text: str) -> str:
+    """A full rewrite of a trimmed draft: the lines it shows, every marker line copied."""
+    shown = prompt_text.split(OMITTED_LINES_NOTE_FULL, 1)[-1]
+    return shown.split("Critique from Reviewer:", 1)[0].strip("\n")
+
+
+class Responder:
+    """
+    Decides the answer to every LLM call of one query.
+
+    Recorded responses are served in call order per (node, file), and the
+    last one is repeated when a run makes more calls than were recorded.
+    Anything without a recording is generated from the corpus entry:
+      {"query", "files": {name: size in chars}, "reviews": {name: [verdicts]},
+       "partial_reviews": {name: [verdicts of the speculative critic]}}
+    """
+
+    def __init__(self, entry: dict, recordings: dict = None):
+        self.entry = entry
+        self.query = entry["query"]
+        self.recorded = (recordings or {}).get(self.query, {})
+        self._served = defaultdict(int)
+        self._lock = threading.Lock()
+
+        planned = self.recorded.get(("project_planner", None))
+        if planned:
+            self.files = list(planned[0]["file_structure"])
+        else:
+            self.files = list(entry.get("files") or {"index.html": 2000})
+
+    def _next(self, key, responses: list):
+        with self._lock:
+            index = self._served[key]
+            self._served[key] += 1
+        return responses[min(index, len(responses) - 1)]
+
+    def respond(self, node: str, prompt_text: str):
+        """Returns (file, response); structured responses are dicts."""
+        file = (
+            detect_file(prompt_text, self.files)
+            if node in ("coder", "critic", "partial_critic")
+            else None
+        )
+
+        recorded = self.recorded.get((node, file))
+        if recorded:
+            return file, self._next((node, file), recorded)
+
+        if node == "project_planner":
+            return file, {
+                "project_title": self.entry.get("title", "Benchmark App"),
+                "project_description": self.query,
+                "tech_stack": ["HTML", "CSS", "JavaScript"],
+                "file_structure": self.files,
+            }
+        plans = self.entry.get("plans") or {}
+        if node == "file_architect":
+            return file, json.dumps(
+                {name: plans.get(name, f"1. Write {name}.") for name in self.files}
+            )
+        if node == "fused_planner":
+            return file, {
+                "project_title": self.entry.get("title", "Benchmark App"),
+                "project_description": self.query,
+                "tech_stack": ["HTML", "CSS", "JavaScript"],
+                "file_structure": self.files,
+                "file_plans": [
+                    {"filename": name, "plan": plans.get(name, f"1. Write {name}.")}
+                    for name in self.files
+                ],
+            }
+        if node == "critic":
+            reviews = (self.entry.get("reviews") or {}).get(file) or [
+                {"passed": True, "severity": "none", "issues": []}
+            ]
+            return file, self._next((node, file), reviews)
+
+        if node == "partial_critic":
+            reviews = (self.entry.get("partial_reviews") or {}).get(file) or [
+                {"passed": True, "severity": "none", "issues": []}
+            ]
+            return file, self._next((node, file), reviews)
+
+        if "SEARCH/REPLACE" in prompt_text:
+            return file, synthetic_patch(prompt_text)
+        if OMITTED_LINES_NOTE_FULL in prompt_text:
+            return file, synthetic_rewrite(prompt_text)
+        sizes = self.entry.get("files") or {}
+        return file, synthetic_code(file or "index.html", sizes.get(file, 2000))
+
+
+# -- Call statistics --
+
+
+class LLMStats:
+    """Thread-safe counters of LLM calls and (approximate) tokens per node."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = defaultdict(int)
+        self.input_tokens = defaultdict(int)
+        self.output_tokens = defaultdict(int)
+        self.files_coded = defaultdict(int)  # file -> coder calls
+
+    def record(self, node: str, file: str, prompt_text: str, output_text: str):
+        with self._lock:
+            self.calls[node] += 1
+            self.input_tokens[node] += approx_tokens(prompt_text)
+            self.output_tokens[node] += approx_tokens(output_text)
+            if node == "coder":
+                self.files_coded[file] += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "llm_calls": sum(self.calls.values()),
+                "input_tokens": sum(self.input_tokens.values()),
+                "output_tokens": sum(self.output_tokens.values()),
+                # Every coder call after a file's first draft is a retry
+                "retries": sum(n - 1 for n in self.files_coded.values()),
+                "calls_by_node": dict(self.calls),
+            }
+
+
+# -- Fake and recording chat models --
+
+
+def _prompt_text(input) -> str:
+    return input.to_string() if hasattr(input, "to_string") else str(input)
+
+
+def _response_text(response) -> str:
+    return response if isinstance(response, str) else json.dumps(response)
+
+
+class ReplayLLM(Runnable):
+    """
+    Plays back the Responder's answers with a simulated latency:
+    `latency` seconds to the first token, then `tokens_per_second`
+    (0 means instant). Text is streamed in small chunks.
+    """
+
+    def __init__(
+        self,
+        responder: Responder,
+        stats: LLMStats,
+        parser_schema=None,
+        latency: float = 0.0,
+        tokens_per_second: float = 0.0,
+    ):
+        self.responder = responder
+        self.stats = stats
+        self.parser_schema = parser_schema
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+
+    def _answer(self, input, config):
+        prompt_text = _prompt_text(input)
+        node = detect_node(prompt_text, config)
+        file, response = self.responder.respond(node, prompt_text)
+        text = _response_text(response)
+        self.stats.record(node, file, prompt_text, text)
+
+        if self.parser_schema is not None:
+            return self.parser_schema.model_validate(response), text
+        return AIMessage(content=text), text
+
+    def _record(self, input, text: str, started: float):
+        # Report the call to the node metrics, like the real LLM wrapper does
+        record_llm_call(
+            time.perf_counter() - started,
+            approx_tokens(_prompt_text(input)),
+            approx_tokens(text),
+        )
+
+    def _generation_time(self, text: str) -> float:
+        if not self.tokens_per_second:
+            return 0.0
+        return approx_tokens(text) / self.tokens_per_second
+
+    def _chunks(self, text: str):
+        for start in range(0, len(text), CHUNK_CHARS):
+            chunk = text[start : start + CHUNK_CHARS]
+            yield chunk, self._generation_time(chunk)
+
+    def invoke(self, input, config=None, **kwargs):
+        started = time.perf_counter()
+        result, text = self._answer(input, config)
+        time.sleep(self.latency + self._generation_time(text))
+        self._record(input, text, started)
+        return result
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        started = time.perf_counter()
+        result, text = self._answer(input, config)
+        await asyncio.sleep(self.latency + self._generation_time(text))
+        self._record(input, text, started)
+        return result
+
+    def stream(self, input, config=None, **kwargs):
+        if self.parser_schema is not None:
+            yield self.invoke(input, config, **kwargs)
+            return
+        started = time.perf_counter()
+        result, text = self._answer(input, config)
+        time.sleep(self.latency)
+        for chunk, delay in self._chunks(text):
+            time.sleep(delay)
+            yield AIMessageChunk(content=chunk)
+        self._record(input, text, started)
+
+    async def astream(self, input, config=None, **kwargs):
+        if self.parser_schema is not None:
+            yield await self.ainvoke(input, config, **kwargs)
+            return
+        started = time.perf_counter()
+        result, text = self._answer(input, config)
+        await asyncio.sleep(self.latency)
+        for chunk, delay in self._chunks(text):
+            await asyncio.sleep(delay)
+            yield AIMessageChunk(content=chunk)
+        self._record(input, text, started)
+
+
+class RecordingLLM(Runnable):
+    """
+    Wraps a real LLM and appends each response to a recordings file
+    (see `load_recordings`).
+    """
+
+    def __init__(self, llm: Runnable, recorder: "Recorder"):
+        self.llm = llm
+        self.recorder = recorder
+
+    def invoke(self, input, config=None, **kwargs):
+        result = self.llm.invoke(input, config, **kwargs)
+        self.recorder.write(_prompt_text(input), config, result)
+        return result
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        result = await self.llm.ainvoke(input, config, **kwargs)
+        self.recorder.write(_prompt_text(input), config, result)
+        return result
+
+    async def astream(self, input, config=None, **kwargs):
+        full = None
+        async for chunk in self.llm.astream(input, config, **kwargs):
+            full = chunk if full is None else full + chunk
+            yield chunk
+        self.recorder.write(_prompt_text(input), config, full)
+
+
+class Recorder:
+    """Writes the LLM calls of one query to a recordings file."""
+
+    def __init__(self, path: str, query: str):
+        self.path = path
+        self.query = query
+        self.files = []
+        self._lock = threading.Lock()
+
+    def write(self, prompt_text: str, config, result):
+        node = detect_node(prompt_text, config)
+        if hasattr(result, "model_dump"):
+            response = result.model_dump()
+        else:
+            response = result.content if result is not None else ""
+
+        with self._lock:
+            if node == "project_planner" and isinstance(response, dict):
+                self.files = list(response.get("file_structure") or [])
+            file = (
+                detect_file(prompt_text, self.files)
+                if node in ("coder", "critic", "partial_critic")
+                else None
+            )
+            call = {"query": self.query, "node": node, "file": file, "response": response}
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(call) + "\n")
+
+
+# -- Installing the fakes --
+
+
+def install_replay_llms(
+    responder: Responder,
+    stats: LLMStats,
+    latency: float = 0.0,
+    tokens_per_second: float = 0.0,
+):
+    """Replaces `agent.llm.get_llm` so every node gets a ReplayLLM."""
+    import agent.llm as llm_module
+
+    def fake_get_llm(model_name=None, temperature=0.0, parser_schema=None):
+        return ReplayLLM(
+            responder,
+            stats,
+            parser_schema=parser_schema,
+            latency=latency,
+            tokens_per_second=tokens_per_second,
+        )
+
+    llm_module.get_llm = fake_get_llm
+
+
+def install_recording_llms(recorder: Recorder):
+    """Wraps the real `agent.llm.get_llm` so every response is recorded."""
+    import agent.llm as llm_module
+
+    real_get_llm = getattr(llm_module, "_real_get_llm", llm_module.get_llm)
+    llm_module._real_get_llm = real_get_llm
+
+    def recording_get_llm(model_name="gemini-2.0-flash", temperature=0.0, parser_schema=None):
+        return RecordingLLM(
+            real_get_llm(model_name, temperature=temperature, parser_schema=parser_schema),
+            recorder,
+        )
+
+    llm_module.get_llm = recording_get_llm
@@ -0,0 +1,141 @@
+"""
+Benchmark: run scheduling and LLM rate limiting (agent/scheduler.py,
+core/retry.py).
+
+  - Scheduler: N runs submitted at once, each making a number of
+    simulated LLM calls. Reports total time, p50/p95 time spent waiting
+    in the queue and how many runs were refused, per pool size.
+  - Rate limiting: concurrent calls against a fake provider that answers
+    429 above its quota. Compares no protection, jittered retries only,
+    and the shared token bucket + retries (calls that failed, retries,
+    wall time).
+
+Run from the `src` folder:
+    python -m bench.scheduler [--runs 12] [--calls 20] [--latency 0.05] [--quota 20]
+"""
+
+import os
+import time
+import asyncio
+import argparse
+from collections import deque
+
+# Every throttled call would log a retry warning
+os.environ.setdefault("AGENT_LOG_LEVEL", "ERROR")
+
+from langchain_core.exceptions import ModelRateLimitError
+from langchain_core.rate_limiters import InMemoryRateLimiter
+
+from agent.scheduler import RunScheduler, SchedulerBusy
+from core.metrics import percentile
+from core.retry import acall_with_retries, is_throttling_error
+
+
+async def fake_run(calls: int, latency: float):
+    """An agent run: one event per (sequential) LLM call."""
+    for step in range(calls):
+        await asyncio.sleep(latency)
+        yield {"step": step}
+
+
+async def bench_scheduler(runs: int, calls: int, latency: float, max_running: int, max_queued: int):
+    scheduler = RunScheduler(max_running=max_running, max_queued=max_queued)
+    waits, refused = [], 0
+
+    async def one_run():
+        nonlocal refused
+        submitted = time.perf_counter()
+        started = None
+        try:
+            async for event in scheduler.astream(lambda: fake_run(calls, latency)):
+                if started is None and "queue" not in event:
+                    started = time.perf_counter()
+                    waits.append(started - submitted)
+        except SchedulerBusy:
+            refused += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_run() for _ in range(runs)))
+    return time.perf_counter() - start, waits, refused
+
+
+class FakeProvider:
+    """Answers 429 when more than 'quota' requests arrived in the last second."""
+
+    def __init__(self, quota: int, latency: float):
+        self.quota = quota
+        self.latency = latency
+        self.recent = deque()
+        self.requests = 0
+        self.throttled = 0
+
+    async def call(self):
+        self.requests += 1
+        now = time.monotonic()
+        while self.recent and now - self.recent[0] > 1.0:
+            self.recent.popleft()
+        if len(self.recent) >= self.quota:
+            self.throttled += 1
+            raise ModelRateLimitError("429 RESOURCE_EXHAUSTED")
+        self.recent.append(now)
+        await asyncio.sleep(self.latency)
+        return "ok"
+
+
+async def bench_rate_limit(calls: int, quota: int, latency: float, mode: str):
+    provider = FakeProvider(quota, latency)
+    limiter = InMemoryRateLimiter(requests_per_second=quota, check_every_n_seconds=0.05, max_bucket_size=quota / 2)
+    failed = 0
+
+    async def one_call():
+        nonlocal failed
+
+        async def attempt():
+            if mode == "bucket + retries":
+                await limiter.aacquire()
+            return await provider.call()
+
+        try:
+            if mode == "none":
+                await attempt()
+            else:
+                await acall_with_retries(attempt)
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            failed += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_call() for _ in range(calls)))
+    return time.perf_counter() - start, failed, provider.throttled
+
+
+async def main(args):
+    print(f"--- Scheduler: {args.runs} runs x {args.calls} calls of {args.latency * 1000:.0f} ms ---")
+    print(f"{'max running':>11} {'total':>7} {'wait p50':>9} {'wait p95':>9} {'refused':>8}")
+    for max_running in (1, 2, 4, 8, args.runs):
+        total, waits, refused = await bench_scheduler(
+            args.runs, args.calls, args.latency, max_running, args.max_queued
+        )
+        print(
+            f"{max_running:>11} {total:>6.2f}s {percentile(waits, 0.5):>8.2f}s "
+            f"{percentile(waits, 0.95):>8.2f}s {refused:>8}"
+        )
+
+    calls = args.quota * 3
+    print(f"\n--- Rate limiting: {calls} concurrent calls, provider quota {args.quota}/s ---")
+    print(f"{'protection':<17} {'failed':>7} {'429s':>6} {'wall':>7}")
+    for mode in ("none", "retries", "bucket + retries"):
+        wall, failed, throttled = await bench_rate_limit(calls, args.quota, args.latency, mode)
+        print(f"{mode:<17} {failed:>7} {throttled:>6} {wall:>6.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=12)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--max-queued", type=int, default=8)
+    parser.add_argument("--quota", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args))
@@ -0,0 +1,124 @@
+"""
+Benchmark: the speculative critic (SpeculativeReviewer in nodes/coder_loop.py).
+
+One project with a long file whose first draft takes the wrong approach
+from its first lines, which the critic rejects. Without the speculative
+critic the coder writes that draft to the end before the critic sees it.
+With it, the part written so far is reviewed while the coder streams,
+and the draft is cut short once the blocking problem is found. Every LLM
+call is answered by a ReplayLLM (see bench/replay.py). Reports wall time,
+LLM calls and the characters the coder generated.
+
+Run from the `src` folder:
+    python -m bench.speculative [--size 8000] [--latency 0.3] [--tokens-per-second 200]
+"""
+
+import io
+import os
+import time
+import argparse
+import tempfile
+from collections import defaultdict
+from contextlib import redirect_stdout
+
+os.environ.setdefault(
+    "AGENT_CHECKPOINT_PATH", os.path.join(tempfile.gettempdir(), "bench_checkpoints.sqlite")
+)
+os.environ.setdefault("PLAN_CACHE_DISABLED", "1")
+
+from bench.replay import LLMStats, Responder, install_replay_llms
+
+# First line of a draft on the wrong track, the critics look for it
+WRONG_TRACK = "<!-- WRONG-TRACK: canvas drawing instead of the planned markup -->\n"
+
+PASS = {"passed": True, "severity": "none", "issues": []}
+BLOCKING = {
+    "passed": False,
+    "severity": "blocking",
+    "issues": ["The page is drawn on a canvas, the plan asks for semantic HTML."],
+}
+
+
+class WrongTrackResponder(Responder):
+    """The first draft of `wrong_file` is on the wrong track, every review notices."""
+
+    def __init__(self, entry: dict, wrong_file: str):
+        super().__init__(entry)
+        self.wrong_file = wrong_file
+        self.drafts = defaultdict(int)
+
+    def respond(self, node: str, prompt_text: str):
+        if node in ("critic", "partial_critic"):
+            file, _ = super().respond(node, prompt_text)
+            return file, BLOCKING if "WRONG-TRACK" in prompt_text else PASS
+        file, response = super().respond(node, prompt_text)
+        if node == "coder":
+            with self._lock:
+                self.drafts[file] += 1
+                first = self.drafts[file] == 1
+            if first and file == self.wrong_file:
+                return file, WRONG_TRACK + response
+            # A rewrite of a trimmed draft copies what it was shown: the fix drops the wrong track
+            return file, response.replace(WRONG_TRACK, "")
+        return file, response
+
+
+def run_once(entry: dict, speculative: bool, latency: float, tokens_per_second: float) -> dict:
+    stats = LLMStats()
+    responder = WrongTrackResponder(entry, wrong_file="index.html")
+    install_replay_llms(responder, stats, latency, tokens_per_second)
+
+    generated = 0
+    with redirect_stdout(io.StringIO()):
+        from agent.graph import run_agent
+
+        start = time.perf_counter()
+        for event in run_agent(
+            entry["query"], stream_tokens=True, speculative_critic=speculative
+        ):
+            draft = event.get("coder_draft")
+            if draft:
+                generated += len(draft["delta"])
+        wall = time.perf_counter() - start
+
+    summary = stats.summary()
+    return {
+        "wall_s": wall,
+        "llm_calls": summary["llm_calls"],
+        "partial_reviews": summary["calls_by_node"].get("partial_critic", 0),
+        "generated": generated,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=8000, help="characters of the long file")
+    parser.add_argument("--latency", type=float, default=0.3, help="seconds to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    args = parser.parse_args()
+
+    entry = {
+        "title": "Long Landing Page",
+        "query": "Build a long landing page with a feature grid and a contact form",
+        "files": {"index.html": args.size, "style.css": 1200, "app.js": 1500},
+    }
+
+    print(
+        f"--- A {args.size}-char file whose first draft is rejected"
+        f" ({args.latency:.2f}s to first token, {args.tokens_per_second:.0f} tokens/s) ---"
+    )
+    print(f"{'speculative':<12} {'wall s':>7} {'calls':>6} {'partial':>8} {'chars written':>14}")
+    results = {}
+    for speculative in (False, True):
+        r = run_once(entry, speculative, args.latency, args.tokens_per_second)
+        results[speculative] = r
+        print(
+            f"{'on' if speculative else 'off':<12} {r['wall_s']:>7.2f} {r['llm_calls']:>6}"
+            f" {r['partial_reviews']:>8} {r['generated']:>14}"
+        )
+
+    off, on = results[False], results[True]
+    print(
+        f"\n    > {off['generated'] - on['generated']} fewer characters generated and"
+        f" {off['wall_s'] - on['wall_s']:.2f} s saved, for {on['partial_reviews']} partial reviews."
+    )
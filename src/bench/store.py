@@ -0,0 +1,95 @@
+"""
+Benchmark: saving a generated workspace to disk.
+
+Compares, for projects of growing size:
+  - "serial":    the previous writer (one open/write per file, in place)
+  - "atomic":    `save_workspace_to_disk` into a fresh directory
+                 (temp dir + rename, manifest; a thread pool only for
+                 big workspaces, see PARALLEL_MIN_FILES)
+  - "unchanged": saving the same workspace again (hashes match the
+                 manifest, files are hard-linked instead of written)
+  - "streamed":  `WorkspaceStore.save_file` per file, as the commit
+                 node does with an output directory (one line appended
+                 to the manifest log per file)
+
+Run from the `src` folder:
+    python -m bench.store [--files 10 50 200] [--size 4000] [--repeat 5]
+"""
+
+import os
+import time
+import shutil
+import argparse
+import tempfile
+
+from bench.replay import synthetic_code
+from core.store import WorkspaceStore, save_workspace_to_disk
+
+EXTENSIONS = [".html", ".css", ".js", ".json", ".md"]
+
+
+def make_workspace(files: int, size: int) -> dict:
+    return {
+        f"src/module_{i}{EXTENSIONS[i % len(EXTENSIONS)]}": synthetic_code(
+            f"f{EXTENSIONS[i % len(EXTENSIONS)]}", size
+        )
+        for i in range(files)
+    }
+
+
+def save_serial(workspace: dict, base_dir: str):
+    """The writer before the atomic store, without its prints."""
+    os.makedirs(base_dir, exist_ok=True)
+    for filename, code in workspace.items():
+        path = os.path.join(base_dir, filename)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(code)
+
+
+def timed(func, repeat: int) -> float:
+    """Median seconds of 'repeat' calls of func(run_index)."""
+    times = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        func(i)
+        times.append(time.perf_counter() - start)
+    return sorted(times)[len(times) // 2]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--size", type=int, default=4000, help="characters per file")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_store_")
+    print(f"--- Saving a workspace ({args.size} chars per file, median of {args.repeat}) ---")
+    print(f"{'files':>6} {'serial ms':>10} {'atomic ms':>10} {'unchanged ms':>13} {'streamed ms':>12}")
+    try:
+        for files in args.files:
+            workspace = make_workspace(files, args.size)
+            run = f"{root}/{files}"
+
+            serial = timed(lambda i: save_serial(workspace, f"{run}/serial_{i}"), args.repeat)
+            atomic = timed(
+                lambda i: save_workspace_to_disk(workspace, f"{run}/atomic_{i}"), args.repeat
+            )
+            unchanged = timed(
+                lambda i: save_workspace_to_disk(workspace, f"{run}/atomic_0"), args.repeat
+            )
+
+            def stream(i):
+                store = WorkspaceStore(f"{run}/streamed_{i}")
+                for filename, code in workspace.items():
+                    store.save_file(filename, code)
+
+            streamed = timed(stream, args.repeat)
+            print(
+                f"{files:>6} {serial * 1000:>10.1f} {atomic * 1000:>10.1f}"
+                f" {unchanged * 1000:>13.1f} {streamed * 1000:>12.1f}"
+            )
+            shutil.rmtree(run, ignore_errors=True)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
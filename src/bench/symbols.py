@@ -0,0 +1,187 @@
+"""
+Benchmark: critic retries with and without the cross-file symbol index.
+
+Simulates projects where index.html defines element IDs in its own
+naming style (`add-btn`, `addBtn`, `add_btn`, ...), and style.css and
+app.js, coded afterwards, have to refer to them. The simulated coder
+reads the real coder prompt (CODER_PROMPT with `format_project_context`):
+  - a name listed under "Already written files" is used as is, except
+    that with probability `--ignore-rate` the coder overlooks the list
+    for that name, as real models sometimes do
+  - otherwise it guesses, and matches the HTML's spelling with
+    probability `--guess-rate`
+A draft referring to an ID that index.html does not define is sent back
+(as the critic would), until it resolves or the file's iteration budget
+from DEFAULT_CRITIQUE_POLICY runs out. References are checked with the
+same extractors (core/symbols.py) that build the index, which are also
+timed.
+
+The index only helps as much as the coder follows it: each ignore rate
+gets its own row, and an ignore rate of 1 is the same as no index. No
+recorded runs with cross-file references exist yet to replay instead.
+
+Run from the `src` folder:
+    python -m bench.symbols [--projects 200] [--guess-rate 0.7] [--ignore-rate 0 0.25 0.5] [--seed 0]
+"""
+
+import re
+import time
+import random
+import argparse
+
+from agent.policy import DEFAULT_CRITIQUE_POLICY
+from core.metrics import approx_tokens
+from core.prompts import CODER_PROMPT
+from core.symbols import NO_CONTEXT, extract_symbols, format_project_context
+
+# (word, role) pairs a small web app is made of
+COMPONENTS = [
+    ("add", "btn"), ("delete", "btn"), ("reset", "btn"), ("submit", "btn"),
+    ("task", "list"), ("result", "list"), ("search", "input"), ("name", "input"),
+    ("count", "display"), ("score", "display"), ("timer", "display"),
+    ("filter", "menu"), ("theme", "toggle"), ("settings", "modal"),
+]
+
+LONG_ROLES = {"btn": "button", "list": "items", "input": "field"}
+
+# The ways a model may spell the ID of one component
+SPELLINGS = [
+    lambda word, role: f"{word}-{role}",
+    lambda word, role: f"{word}{role.title()}",
+    lambda word, role: f"{word}_{role}",
+    lambda word, role: f"{word}-{LONG_ROLES.get(role, role)}",
+]
+
+DEPENDENT_FILES = ["style.css", "app.js"]
+
+
+def make_project(rng: random.Random) -> dict:
+    components = rng.sample(COMPONENTS, rng.randint(3, 8))
+    style = rng.randrange(len(SPELLINGS))
+    ids = [SPELLINGS[style](word, role) for word, role in components]
+    html = "<!DOCTYPE html>\n<html>\n<body>\n" + "".join(
+        f"  <div id=\"{name}\" class=\"panel\"></div>\n" for name in ids
+    ) + "</body>\n</html>"
+    return {"components": components, "style": style, "html": html}
+
+
+def write_file(filename: str, names: list) -> str:
+    if filename.endswith(".css"):
+        return "".join(f"#{name} {{ margin: 4px; }}\n" for name in names)
+    return "".join(
+        f"const el{i} = document.getElementById('{name}');\n" for i, name in enumerate(names)
+    )
+
+
+def referenced_ids(filename: str, code: str) -> set:
+    symbols = extract_symbols(filename, code)
+    if filename.endswith(".css"):
+        return {name[1:] for name in symbols.get("selectors", []) if name.startswith("#")}
+    return set(symbols.get("ids", []))
+
+
+def simulated_coder(
+    prompt: str, project: dict, guess_rate: float, ignore_rate: float, rng: random.Random
+) -> list:
+    """The ID this coder uses for every component, given its prompt."""
+    context = prompt.split("Already written files and the names they define:", 1)[1]
+    known = set(re.findall(r"[\w-]+", context))
+
+    names = []
+    for word, role in project["components"]:
+        spellings = [spell(word, role) for spell in SPELLINGS]
+        listed = [name for name in spellings if name in known]
+        if listed and rng.random() >= ignore_rate:
+            names.append(listed[0])
+        elif rng.random() < guess_rate:
+            names.append(spellings[project["style"]])
+        else:
+            names.append(rng.choice(spellings[: project["style"]] + spellings[project["style"] + 1 :]))
+    return names
+
+
+def run_project(
+    project: dict, use_index: bool, guess_rate: float, ignore_rate: float, rng: random.Random
+) -> dict:
+    """Codes the dependent files of one project, returns retries and prompt size."""
+    defined = set(extract_symbols("index.html", project["html"]).get("ids", []))
+    symbol_index = {"index.html": extract_symbols("index.html", project["html"])}
+
+    result = {"retries": 0, "broken": 0, "prompt_tokens": 0, "files": 0}
+    for filename in DEPENDENT_FILES:
+        context = format_project_context(symbol_index, filename) if use_index else NO_CONTEXT
+        prompt = CODER_PROMPT.format(
+            current_file=filename, file_plan=f"1. Write {filename}.", project_context=context
+        )
+        result["prompt_tokens"] += approx_tokens(prompt)
+        result["files"] += 1
+
+        iteration = 0
+        while True:
+            iteration += 1
+            names = simulated_coder(prompt, project, guess_rate, ignore_rate, rng)
+            code = write_file(filename, names)
+            unresolved = referenced_ids(filename, code) - defined
+            if not unresolved:
+                break
+            if iteration >= DEFAULT_CRITIQUE_POLICY.max_iterations(filename, code):
+                result["broken"] += 1
+                break
+            result["retries"] += 1
+
+        symbol_index[filename] = extract_symbols(filename, code)
+    return result
+
+
+def time_extraction(projects: list, repeat: int = 20) -> float:
+    """Mean microseconds to extract the symbols of one file."""
+    files = []
+    for project in projects:
+        ids = [SPELLINGS[project["style"]](w, r) for w, r in project["components"]]
+        files.append(("index.html", project["html"]))
+        files.extend((name, write_file(name, ids)) for name in DEPENDENT_FILES)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for filename, code in files:
+            extract_symbols(filename, code)
+    return (time.perf_counter() - start) / (repeat * len(files)) * 1e6
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--projects", type=int, default=200)
+    parser.add_argument("--guess-rate", type=float, default=0.7)
+    parser.add_argument(
+        "--ignore-rate", type=float, nargs="+", default=[0.0, 0.25, 0.5],
+        help="chance the coder overlooks a listed name, one row each",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    projects = [make_project(random.Random(args.seed + i)) for i in range(args.projects)]
+
+    print(
+        f"--- Cross-file references ({args.projects} projects,"
+        f" guess rate {args.guess_rate:.2f}) ---"
+    )
+    print(
+        f"{'mode':<10} {'ignored':>8} {'retries/project':>16} {'broken files':>13}"
+        f" {'prompt tok/file':>16}"
+    )
+    for use_index, ignore_rate in [(False, None)] + [(True, rate) for rate in args.ignore_rate]:
+        rng = random.Random(args.seed)
+        totals = {"retries": 0, "broken": 0, "prompt_tokens": 0, "files": 0}
+        for project in projects:
+            result = run_project(project, use_index, args.guess_rate, ignore_rate or 0.0, rng)
+            for key, value in result.items():
+                totals[key] += value
+        print(
+            f"{'index' if use_index else 'no index':<10}"
+            f" {f'{ignore_rate:.0%}' if use_index else '-':>8}"
+            f" {totals['retries'] / len(projects):>16.2f}"
+            f" {totals['broken']:>13}"
+            f" {totals['prompt_tokens'] / totals['files']:>16.0f}"
+        )
+
+    print(f"\nSymbol extraction: {time_extraction(projects):.0f} µs per file")
@@ -0,0 +1,89 @@
+import io
+import os
+import json
+import hashlib
+import zipfile
+from typing import Dict
+
+DEFAULT_COMPRESSION_LEVEL = 6
+
+
+def get_compression_level() -> int:
+    """Deflate level for project downloads, from AGENT_ZIP_COMPRESSION_LEVEL (0-9, default 6)."""
+    level = int(os.getenv("AGENT_ZIP_COMPRESSION_LEVEL", DEFAULT_COMPRESSION_LEVEL))
+    return min(9, max(0, level))
+
+
+def file_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _hash_of(digests: Dict[str, str]) -> str:
+    return hashlib.sha256(json.dumps(sorted(digests.items())).encode("utf-8")).hexdigest()
+
+
+def workspace_hash(workspace: Dict[str, str]) -> str:
+    """Content hash of a whole workspace (file names and contents)."""
+    return _hash_of({name: file_hash(code) for name, code in workspace.items()})
+
+
+def build_zip(workspace: Dict[str, str], level: int = DEFAULT_COMPRESSION_LEVEL) -> bytes:
+    """The workspace as a ZIP archive."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED, compresslevel=level) as archive:
+        for filename, code in workspace.items():
+            archive.writestr(filename, code)
+    return buffer.getvalue()
+
+
+class IncrementalZip:
+    """
+    A ZIP archive that grows as files are committed: each new file is
+    compressed once and appended, the files before it are not touched.
+    A file that changes after it was added makes the next `getvalue()`
+    rebuild the archive (ZIP members cannot be replaced in place).
+    """
+
+    def __init__(self, level: int = DEFAULT_COMPRESSION_LEVEL):
+        self.level = level
+        self.files: Dict[str, str] = {}
+        self.digests: Dict[str, str] = {}
+        self._buffer = io.BytesIO()
+        self._archive = None  # open while files are being added
+        self._stale = False
+
+    def add(self, filename: str, code: str):
+        digest = file_hash(code)
+        if self.digests.get(filename) == digest:
+            return
+        if filename in self.digests:
+            self._stale = True
+        self.files[filename] = code
+        self.digests[filename] = digest
+        if not self._stale:
+            if self._archive is None:
+                # Reopening reads the central directory once, then appends
+                self._archive = zipfile.ZipFile(
+                    self._buffer, "a", zipfile.ZIP_DEFLATED, compresslevel=self.level
+                )
+            self._archive.writestr(filename, code)
+
+    def update(self, workspace: Dict[str, str]):
+        for filename, code in workspace.items():
+            self.add(filename, code)
+
+    def workspace_hash(self) -> str:
+        """Same as `workspace_hash` of the files added so far, without rehashing them."""
+        return _hash_of(self.digests)
+
+    def getvalue(self) -> bytes:
+        if self._archive is not None:
+            # Closing writes the central directory
+            self._archive.close()
+            self._archive = None
+        if self._stale:
+            self._buffer = io.BytesIO(build_zip(self.files, self.level))
+            self._stale = False
+        if not self.files:
+            return build_zip({}, self.level)
+        return self._buffer.getvalue()
@@ -0,0 +1,294 @@
+import os
+import queue
+import atexit
+import sqlite3
+import hashlib
+import threading
+import contextvars
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+from core.checkpoint import is_checkpointing_enabled
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# Refs look like "sha256:<hex digest of the UTF-8 text>"
+REF_PREFIX = "sha256:"
+
+# The run (thread id) whose texts are being stored from the current context
+_run_owner: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "artifact_run_owner", default=None
+)
+
+
+def is_ref(value) -> bool:
+    return isinstance(value, str) and value.startswith(REF_PREFIX) and len(value) == len(REF_PREFIX) + 64
+
+
+def make_ref(text: str) -> str:
+    return REF_PREFIX + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def set_artifact_owner(thread_id: Optional[str]) -> contextvars.Token:
+    """Texts stored from the current context (and the node tasks it starts) belong to this run."""
+    return _run_owner.set(thread_id)
+
+
+class ArtifactStore:
+    """
+    Content-addressed store for the large texts of a run (drafts,
+    committed files, file plans). The graph state keeps only their refs,
+    so a step's state (and every checkpoint of it) does not grow with the
+    size of the files, and identical texts are stored once.
+
+    Every blob records the runs that stored it. `release(thread_id)`
+    drops a run's claim, and blobs no run claims anymore are deleted.
+
+    Blobs live in memory. With a 'path' they are also written to SQLite
+    by a background thread (the event loop never waits for the disk), so
+    resumed runs (even in a new process) find them, and memory only keeps
+    the most recently used 'max_memory_bytes' of them.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_memory_bytes: int = 64 * 1024 * 1024):
+        self.path = path
+        self.max_memory_bytes = max_memory_bytes
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._owners: Dict[str, Set[str]] = {}  # ref -> runs that stored it
+        self._pending: Dict[str, str] = {}  # ref -> text not written to SQLite yet
+        self._lock = threading.Lock()
+        self._conn = None
+        self._writes: "queue.Queue" = queue.Queue()
+        self._writer = None
+
+        if path:
+            store_dir = os.path.dirname(path)
+            if store_dir:
+                os.makedirs(store_dir, exist_ok=True)
+            self._conn = self._connect()
+            # Reads only, writes go through the writer thread's own connection
+            self._writer = threading.Thread(target=self._write_loop, name="artifact-writer", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS blobs (ref TEXT PRIMARY KEY, data TEXT NOT NULL)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS owners (ref TEXT NOT NULL, thread_id TEXT NOT NULL,"
+            " PRIMARY KEY (ref, thread_id))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS owners_thread ON owners (thread_id)")
+        conn.commit()
+        return conn
+
+    # -- SQLite writer thread --
+
+    def _write_loop(self):
+        conn = self._connect()
+        while True:
+            batch = [self._writes.get()]
+            # Everything queued meanwhile goes into the same transaction
+            while True:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._apply(conn, batch)
+            except sqlite3.Error as e:
+                logger.error("Could not save %d artifact writes: %s", len(batch), e)
+            finally:
+                with self._lock:
+                    for op in batch:
+                        if op[0] == "put":
+                            self._pending.pop(op[1], None)
+                for _ in batch:
+                    self._writes.task_done()
+
+    @staticmethod
+    def _apply(conn: sqlite3.Connection, batch: list):
+        for op in batch:
+            if op[0] == "put":
+                _, ref, text, owner = op
+                conn.execute("INSERT OR IGNORE INTO blobs (ref, data) VALUES (?, ?)", (ref, text))
+                if owner is not None:
+                    conn.execute(
+                        "INSERT OR IGNORE INTO owners (ref, thread_id) VALUES (?, ?)", (ref, owner)
+                    )
+            elif op[0] == "release":
+                thread_id = op[1]
+                conn.execute(
+                    "DELETE FROM blobs WHERE ref IN (SELECT ref FROM owners WHERE thread_id = ?)"
+                    " AND ref NOT IN (SELECT ref FROM owners WHERE thread_id != ?)",
+                    (thread_id, thread_id),
+                )
+                conn.execute("DELETE FROM owners WHERE thread_id = ?", (thread_id,))
+        conn.commit()
+
+    def flush(self):
+        """Waits until every queued write is in SQLite."""
+        if self._writer is not None:
+            self._writes.join()
+
+    # -- Memory layer --
+
+    def _remember(self, ref: str, text: str):
+        """Adds a blob to the memory layer (caller holds the lock)."""
+        if ref in self._memory:
+            self._memory.move_to_end(ref)
+            return
+        self._memory[ref] = text
+        self._memory_bytes += len(text)
+        if self._conn is None:
+            # Memory is the only copy: blobs go when their runs release them
+            return
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, dropped = self._memory.popitem(last=False)
+            self._memory_bytes -= len(dropped)
+
+    def _forget(self, ref: str):
+        """Drops a blob from the memory layer (caller holds the lock)."""
+        text = self._memory.pop(ref, None)
+        if text is not None:
+            self._memory_bytes -= len(text)
+
+    # -- Public API --
+
+    def put(self, text: str, owner: Optional[str] = None) -> str:
+        """
+        Stores a text for the run 'owner' (the current one by default, see
+        `set_artifact_owner`) and returns its ref. The same text always
+        gets the same ref.
+        """
+        ref = make_ref(text)
+        owner = owner if owner is not None else _run_owner.get()
+        with self._lock:
+            owners = self._owners.setdefault(ref, set())
+            is_new_owner = owner is not None and owner not in owners
+            if owner is not None:
+                owners.add(owner)
+            known = ref in self._memory or ref in self._pending
+            self._remember(ref, text)
+            if self._conn is not None and (not known or is_new_owner):
+                if not known:
+                    self._pending[ref] = text
+                self._writes.put(("put", ref, text, owner))
+        return ref
+
+    def get(self, ref: str) -> str:
+        """The text of a ref. Raises KeyError if it was never stored (or was released)."""
+        with self._lock:
+            text = self._memory.get(ref)
+            if text is not None:
+                self._memory.move_to_end(ref)
+                return text
+            text = self._pending.get(ref)
+            if text is not None:
+                return text
+            row = None
+            if self._conn is not None:
+                row = self._conn.execute("SELECT data FROM blobs WHERE ref = ?", (ref,)).fetchone()
+            if row is None:
+                raise KeyError(f"Unknown artifact {ref}")
+            self._remember(ref, row[0])
+            return row[0]
+
+    def release(self, thread_id: str):
+        """
+        Drops the claim of a run on its blobs. Blobs no other run stored
+        are deleted from memory (at once) and from SQLite (by the writer).
+        Call it when a run has finished, or when its checkpoints are deleted.
+        """
+        with self._lock:
+            for ref in [ref for ref, owners in self._owners.items() if thread_id in owners]:
+                owners = self._owners[ref]
+                owners.discard(thread_id)
+                if not owners:
+                    del self._owners[ref]
+                    self._forget(ref)
+            if self._conn is not None:
+                self._writes.put(("release", thread_id))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "memory_blobs": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "pending_writes": len(self._pending),
+            }
+            if self._conn is not None:
+                stats["stored_blobs"] = self._conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+            return stats
+
+
+# -- Shared instance, configured from environment variables --
+
+_artifact_store: Optional[ArtifactStore] = None
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> ArtifactStore:
+    """
+    The process-wide store. Blobs are saved to AGENT_ARTIFACT_PATH
+    (default .cache/artifacts.sqlite) next to the checkpoints, or kept in
+    memory only when checkpointing is disabled. AGENT_ARTIFACT_MEMORY_MB
+    (default 64) bounds the memory layer of a saved store.
+    """
+    global _artifact_store
+    if _artifact_store is None:
+        with _artifact_store_lock:
+            if _artifact_store is None:
+                path = None
+                if is_checkpointing_enabled():
+                    path = os.getenv("AGENT_ARTIFACT_PATH", ".cache/artifacts.sqlite")
+                _artifact_store = ArtifactStore(
+                    path=path,
+                    max_memory_bytes=int(float(os.getenv("AGENT_ARTIFACT_MEMORY_MB", "64")) * 1024 * 1024),
+                )
+    return _artifact_store
+
+
+# -- Helpers for nodes: state values are refs, read them lazily --
+
+
+def put_text(text: Optional[str]) -> Optional[str]:
+    """The ref of a text (None stays None)."""
+    if text is None:
+        return None
+    return get_artifact_store().put(text)
+
+
+def get_text(value: Optional[str]) -> Optional[str]:
+    """The text behind a ref. Plain text (e.g. from older checkpoints) is returned as is."""
+    if is_ref(value):
+        return get_artifact_store().get(value)
+    return value
+
+
+def put_texts(texts: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+    """{name: text} -> {name: ref}"""
+    if texts is None:
+        return None
+    return {name: put_text(text) for name, text in texts.items()}
+
+
+def get_texts(refs: Optional[Dict[str, str]], missing_ok: bool = False) -> Optional[Dict[str, str]]:
+    """{name: ref} -> {name: text}. With 'missing_ok', released texts are left out."""
+    if refs is None:
+        return None
+    texts = {}
+    for name, ref in refs.items():
+        try:
+            texts[name] = get_text(ref)
+        except KeyError:
+            if not missing_ok:
+                raise
+    return texts
+
+
+def release_run(thread_id: str):
+    """Frees the texts of a run that no other run shares (see `ArtifactStore.release`)."""
+    get_artifact_store().release(thread_id)
@@ -0,0 +1,94 @@
+import asyncio
+import contextvars
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+# One event loop per process, running in a daemon thread.
+# Every sync entry point submits its work here, so all runs
+# (e.g. one per Streamlit session) multiplex on the same loop.
+_loop: asyncio.AbstractEventLoop = None
+_loop_lock = threading.Lock()
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """Returns the shared background event loop, starting it on first use."""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=loop.run_forever, name="agent-event-loop", daemon=True
+                )
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+async def _run_in_context(coro: Awaitable[T], context: contextvars.Context) -> T:
+    # Run the coroutine with the caller's context variables
+    # (LangGraph keeps the current run config in them)
+    return await asyncio.get_running_loop().create_task(coro, context=context)
+
+
+def _submit(coro: Awaitable[T], context: contextvars.Context) -> T:
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError(
+            "Cannot block on the agent event loop from inside it. "
+            "Await the async version instead."
+        )
+
+    future = asyncio.run_coroutine_threadsafe(_run_in_context(coro, context), loop)
+    return future.result()
+
+
+def run_sync(coro: Awaitable[T]) -> T:
+    """
+    Runs a coroutine on the shared event loop and waits for its result.
+    Used to keep the sync API as a thin wrapper around the async one.
+    """
+    return _submit(coro, contextvars.copy_context())
+
+
+def run_on_loop(func: Callable[[], T]) -> T:
+    """
+    Calls a sync function from inside the shared event loop, for objects
+    that bind to the running loop when created. Calls it directly if we
+    are already on the loop.
+    """
+    loop = get_event_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        return func()
+
+    async def call() -> T:
+        return func()
+
+    return run_sync(call())
+
+
+def iter_sync(agen: AsyncIterator[T]) -> Iterator[T]:
+    """
+    Turns an async generator into a sync one, running it on the shared loop.
+    """
+    context = contextvars.copy_context()
+    try:
+        while True:
+            try:
+                item = _submit(agen.__anext__(), context)
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        # Runs if the caller stops iterating early
+        _submit(agen.aclose(), context)
@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from typing import Optional
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# Hits only update their access time in memory, and these updates are
+# written in one transaction every so many hits or seconds (or before an
+# eviction needs them), instead of a commit per hit.
+TOUCH_FLUSH_EVERY = 64
+TOUCH_FLUSH_SECONDS = 5.0
+
+
+def make_cache_key(
+    prompt_text: str, model_name: str, temperature: float, schema_name: str = ""
+) -> str:
+    """
+    Content-addressed key for one LLM call.
+    The rendered prompt already contains both the template and its inputs.
+    """
+    payload = json.dumps([prompt_text, model_name, temperature, schema_name])
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    A persistent LLM response cache backed by a local SQLite file.
+
+    - Entries expire after `ttl_seconds`.
+    - When there are more than `max_entries` entries, or more than
+      `max_bytes` of stored text, the least recently used entries are evicted.
+    - Hit/miss counters are kept in memory, see `stats()`.
+    - Access times of hits are batched in memory (see TOUCH_FLUSH_EVERY),
+      so a hit is a single read.
+
+    Every method touches the disk, async callers should run them in a
+    thread (see `CachedLLM` in agent/llm.py).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 2000,
+        max_bytes: int = 50 * 1024 * 1024,
+        ttl_seconds: float = 7 * 24 * 3600,
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._touched = {}  # key -> last access time not written yet
+        self._touched_since = time.monotonic()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "expired": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+        cache_dir = os.path.dirname(path)
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+        # One connection shared by all threads, guarded by our own lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_responses_accessed"
+            " ON responses (accessed_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Returns the cached value, or None on a miss or an expired entry."""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+
+                if row is None:
+                    self._counters["misses"] += 1
+                    return None
+
+                value, created_at = row
+                if now - created_at > self.ttl_seconds:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                    self._counters["expired"] += 1
+                    self._counters["misses"] += 1
+                    return None
+
+                self._touched[key] = now
+                if (
+                    len(self._touched) >= TOUCH_FLUSH_EVERY
+                    or time.monotonic() - self._touched_since >= TOUCH_FLUSH_SECONDS
+                ):
+                    self._flush_touches()
+                    self._conn.commit()
+                self._counters["hits"] += 1
+                return value
+
+            except sqlite3.Error as e:
+                # The cache must never break a run, treat errors as misses
+                logger.warning("LLM cache read failed: %s", e)
+                self._counters["errors"] += 1
+                self._counters["misses"] += 1
+                return None
+
+    def put(self, key: str, value: str):
+        """Stores a value and evicts least recently used entries if needed."""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO responses"
+                    " (key, value, size, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, value, size, now, now),
+                )
+                self._touched.pop(key, None)
+                # Eviction goes by access time, so it needs the recent hits
+                self._flush_touches()
+                self._evict()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("LLM cache write failed: %s", e)
+                self._counters["errors"] += 1
+
+    def _flush_touches(self):
+        """Writes the batched access times (caller holds the lock and commits)."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()],
+            )
+            self._touched = {}
+        self._touched_since = time.monotonic()
+
+    def flush(self):
+        """Writes the batched access times now."""
+        with self._lock:
+            try:
+                self._flush_touches()
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("LLM cache write failed: %s", e)
+                self._counters["errors"] += 1
+
+    def _evict(self):
+        """Drops the oldest-accessed entries until both size bounds hold."""
+        count, total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+        while count > self.max_entries or total_bytes > self.max_bytes:
+            key, size = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed_at LIMIT 1"
+            ).fetchone()
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._counters["evictions"] += 1
+            count -= 1
+            total_bytes -= size
+
+    def record_bypass(self):
+        """Counts a call that skipped the cache on purpose."""
+        with self._lock:
+            self._counters["bypassed"] += 1
+
+    def stats(self) -> dict:
+        """Returns the hit/miss counters plus the current cache size."""
+        with self._lock:
+            stats = dict(self._counters)
+            try:
+                entries, total_bytes = self._conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+                ).fetchone()
+            except sqlite3.Error:
+                entries, total_bytes = None, None
+
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["entries"] = entries
+        stats["bytes"] = total_bytes
+        return stats
+
+    def clear(self):
+        """Removes every entry (counters are kept)."""
+        with self._lock:
+            self._touched = {}
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+# -- Shared instance, configured from environment variables --
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def is_cache_enabled() -> bool:
+    """The whole cache can be switched off with LLM_CACHE_DISABLED=1."""
+    return os.getenv("LLM_CACHE_DISABLED", "0").lower() not in ("1", "true", "yes")
+
+
+def get_response_cache() -> ResponseCache:
+    """Returns the process-wide response cache, creating it on first use."""
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = ResponseCache(
+                    path=os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite"),
+                    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2000")),
+                    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024))),
+                    ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+                )
+    return _response_cache
+
+
+def get_cache_stats() -> dict:
+    """Hit/miss counters for dashboards."""
+    return get_response_cache().stats()
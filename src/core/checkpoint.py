@@ -0,0 +1,65 @@
+import os
+import threading
+from typing import Optional
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from core.async_utils import run_on_loop
+
+
+class SqliteCheckpointer(AsyncSqliteSaver):
+    """
+    The SQLite saver with `synchronous=NORMAL`: in WAL mode, commits then
+    skip the fsync and stay safe against crashes of the app (only an OS
+    crash or power loss can drop the last checkpoints, which async
+    durability already allows). The background writer then keeps up with
+    the graph instead of building a backlog that the end of a run waits for.
+    """
+
+    async def setup(self) -> None:
+        first = not self.is_setup
+        await super().setup()
+        if first:
+            await self.conn.execute("PRAGMA synchronous=NORMAL")
+
+
+# -- Shared checkpointer, configured from environment variables --
+
+_checkpointer: Optional[AsyncSqliteSaver] = None
+_checkpointer_lock = threading.Lock()
+
+
+def is_checkpointing_enabled() -> bool:
+    """Checkpointing can be switched off with AGENT_CHECKPOINTS_DISABLED=1."""
+    return os.getenv("AGENT_CHECKPOINTS_DISABLED", "0").lower() not in ("1", "true", "yes")
+
+
+def get_checkpoint_path() -> str:
+    return os.getenv("AGENT_CHECKPOINT_PATH", ".cache/checkpoints.sqlite")
+
+
+def get_checkpointer() -> Optional[AsyncSqliteSaver]:
+    """
+    Returns the process-wide SQLite checkpointer, creating it on first use,
+    or None if checkpointing is disabled.
+
+    The saver is bound to the shared event loop, so every run (sync or
+    async) writes through the same connection.
+    """
+    global _checkpointer
+    if not is_checkpointing_enabled():
+        return None
+    if _checkpointer is None:
+        with _checkpointer_lock:
+            if _checkpointer is None:
+                path = get_checkpoint_path()
+                checkpoint_dir = os.path.dirname(path)
+                if checkpoint_dir:
+                    os.makedirs(checkpoint_dir, exist_ok=True)
+
+                # The connection is opened lazily by the saver's first query
+                _checkpointer = run_on_loop(
+                    lambda: SqliteCheckpointer(aiosqlite.connect(path))
+                )
+    return _checkpointer
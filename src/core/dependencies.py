@@ -0,0 +1,127 @@
+import os
+import re
+from typing import Dict, List, Iterable
+
+# Files that define the page structure. Stylesheets and scripts refer to
+# their IDs and classes, so they are coded after them.
+MARKUP_EXTENSIONS = {".html", ".htm"}
+DEPENDS_ON_MARKUP_EXTENSIONS = {".css", ".js", ".mjs", ".ts", ".jsx", ".tsx"}
+
+# A file -> the files it has to be coded after
+Dependencies = Dict[str, List[str]]
+
+
+def _extension(filename: str) -> str:
+    return os.path.splitext(filename)[1].lower()
+
+
+def _mentions(plan: str, filename: str) -> bool:
+    """True if a plan refers to a file by name, or imports it as a Python module."""
+    if re.search(rf"(?<![\w.-]){re.escape(filename)}(?![\w-])", plan, re.IGNORECASE):
+        return True
+    if _extension(filename) == ".py":
+        module = re.escape(os.path.splitext(os.path.basename(filename))[0])
+        return re.search(rf"\b(?:from|import)\s+{module}\b", plan) is not None
+    return False
+
+
+def infer_file_dependencies(file_plans: Dict[str, str], file_structure: List[str]) -> Dependencies:
+    """
+    Derives which files have to be coded before which, from the plans alone:
+    - stylesheets and scripts depend on every HTML page
+    - any other file depends on the non-HTML files its plan mentions
+      (e.g. "import helpers from utils.js")
+    HTML pages depend on nothing, although their plans name the CSS/JS
+    they link. Edges that would close a cycle are dropped, keeping the
+    planner's order.
+    """
+    markup = [f for f in file_structure if _extension(f) in MARKUP_EXTENSIONS]
+    dependencies: Dependencies = {}
+
+    for filename in file_structure:
+        extension = _extension(filename)
+        if extension in MARKUP_EXTENSIONS:
+            dependencies[filename] = []
+            continue
+
+        wanted = list(markup) if extension in DEPENDS_ON_MARKUP_EXTENSIONS else []
+        plan = (file_plans or {}).get(filename) or ""
+        wanted += [
+            other
+            for other in file_structure
+            if other != filename
+            and other not in wanted
+            and _extension(other) not in MARKUP_EXTENSIONS
+            and _mentions(plan, other)
+        ]
+
+        # Only keep edges that do not lead back to this file
+        dependencies[filename] = [
+            other for other in wanted if not _reaches(dependencies, other, filename)
+        ]
+
+    return dependencies
+
+
+def _reaches(dependencies: Dependencies, start: str, target: str) -> bool:
+    """True if 'start' (transitively) depends on 'target'."""
+    stack, seen = [start], set()
+    while stack:
+        current = stack.pop()
+        if current == target:
+            return True
+        if current not in seen:
+            seen.add(current)
+            stack.extend(dependencies.get(current, []))
+    return False
+
+
+def ready_files(queue: Iterable[str], dependencies: Dependencies, done: Iterable[str]) -> List[str]:
+    """
+    The queued files whose dependencies are all done, in queue order.
+    Dependencies outside the queue and the done files are ignored.
+    """
+    queue = list(queue)
+    done = set(done)
+    pending = set(queue)
+    ready = [
+        filename
+        for filename in queue
+        if all(d in done or d not in pending for d in dependencies.get(filename, []))
+    ]
+    # Never stall: fall back to the planner's order
+    return ready or queue[:1]
+
+
+def topological_waves(file_structure: List[str], dependencies: Dependencies) -> List[List[str]]:
+    """
+    Groups the files into waves: every file only depends on files of
+    earlier waves, so all files of a wave can be coded at the same time.
+    """
+    waves, done, queue = [], [], list(file_structure)
+    while queue:
+        wave = ready_files(queue, dependencies, done)
+        waves.append(wave)
+        done.extend(wave)
+        queue = [f for f in queue if f not in wave]
+    return waves
+
+
+def plan_file_order(file_plans: Dict[str, str], file_structure: List[str]):
+    """The dependencies of the planned files and their coding waves."""
+    dependencies = infer_file_dependencies(file_plans, file_structure)
+    return dependencies, topological_waves(file_structure, dependencies)
+
+
+def format_waves(waves: List[List[str]]) -> str:
+    """e.g. "[index.html] → [style.css, app.js]"."""
+    return " → ".join(f"[{', '.join(wave)}]" for wave in waves)
+
+
+def can_start_early(filename: str, plan: str, file_structure: List[str]) -> bool:
+    """
+    True if a file depends on nothing, judged from its own plan alone, so
+    it can be coded before the other plans exist (edges are only ever
+    dropped once all plans are known, never added).
+    """
+    return not infer_file_dependencies({filename: plan}, file_structure).get(filename)
@@ -0,0 +1,168 @@
+import re
+import json
+from typing import List, Tuple
+
+# Inside a string, only these characters change the parser's state
+_STRING_SPECIAL = re.compile(r'["\\]')
+# A comma right before a closing bracket (outside strings, see _load_value)
+_TRAILING_COMMA = re.compile(r'("(?:[^"\\]|\\.)*")|,(\s*[}\]])', re.DOTALL)
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _load_value(text: str):
+    """
+    A JSON value, allowing raw newlines/tabs in strings and trailing
+    commas in nested objects and lists (common in LLM output).
+    """
+    try:
+        return json.loads(text, strict=False)
+    except ValueError:
+        pass
+    # Drop commas before a closing bracket, leaving strings as they are
+    cleaned = _TRAILING_COMMA.sub(lambda m: m.group(1) or m.group(2), text)
+    try:
+        return json.loads(cleaned, strict=False)
+    except ValueError:
+        return text.strip().strip('"')
+
+
+class JSONObjectStream:
+    """
+    Parses a JSON object while it streams in, and returns each top-level
+    key/value pair as soon as it is complete.
+
+    Tolerates what LLMs add around JSON: text or ``` fences before the
+    first '{', anything after the closing '}', trailing or missing commas
+    and raw newlines in strings. `finish()` repairs a truncated response by
+    closing the last value, and lists what it repaired in `repairs`.
+    """
+
+    def __init__(self):
+        self.repairs: List[str] = []
+        self._buffer = ""
+        self._pos = 0
+        self._state = "seek"  # seek, key, colon, value, done
+        self._key = None
+        self._value_start = None
+        self._stack = []  # open brackets of a nested value
+        self._in_string = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        """Consumes a chunk, returns the pairs it completed."""
+        self._buffer += chunk
+        return self._scan()
+
+    def _scan(self) -> List[Tuple[str, object]]:
+        pairs = []
+        buffer = self._buffer
+        while self._pos < len(buffer) and self._state != "done":
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buffer, self._pos)
+                if match is None:
+                    self._pos = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() == len(buffer):
+                        # The escaped character has not arrived yet
+                        self._pos = match.start()
+                        break
+                    self._pos = match.end() + 1
+                    continue
+                self._pos = match.end()
+                self._in_string = False
+                if self._state == "key":
+                    self._key = _load_value(buffer[self._value_start : self._pos])
+                    self._state = "colon"
+                elif self._state == "value" and not self._stack:
+                    pairs.append(self._complete(self._pos))
+                continue
+
+            char = buffer[self._pos]
+            self._pos += 1
+
+            if self._state == "seek":
+                if char == "{":
+                    self._state = "key"
+            elif self._state == "key":
+                if char == '"':
+                    self._value_start = self._pos - 1
+                    self._in_string = True
+                elif char == "}":
+                    self._state = "done"
+                # Whitespace and stray commas are skipped
+            elif self._state == "colon":
+                if char == ":":
+                    self._state = "value"
+                    self._value_start = None
+            elif self._state == "value":
+                pairs.extend(self._value_char(char))
+        return pairs
+
+    def _value_char(self, char: str) -> List[Tuple[str, object]]:
+        if self._value_start is None:
+            if char.isspace():
+                return []
+            self._value_start = self._pos - 1
+            if char == '"':
+                self._in_string = True
+            elif char in _CLOSERS:
+                self._stack.append(char)
+            return []
+
+        if char == '"':
+            self._in_string = True
+        elif char in _CLOSERS:
+            self._stack.append(char)
+        elif self._stack and char == _CLOSERS[self._stack[-1]]:
+            self._stack.pop()
+            if not self._stack:
+                return [self._complete(self._pos)]
+        elif not self._stack and char in ",}":
+            # The end of a number or literal (true/false/null)
+            pair = self._complete(self._pos - 1)
+            if char == "}":
+                self._state = "done"
+            return [pair]
+        return []
+
+    def _complete(self, end: int) -> Tuple[str, object]:
+        """Finishes the current value at 'end', ready for the next key."""
+        pair = (self._key, _load_value(self._buffer[self._value_start : end]))
+        self._state = "key"
+        self._key = None
+        self._value_start = None
+        return pair
+
+    def finish(self) -> List[Tuple[str, object]]:
+        """
+        Called once the response is complete. Returns the last pair if the
+        response was cut off inside its value (closing open strings and
+        brackets), otherwise nothing.
+        """
+        if self._state in ("seek", "done"):
+            if self._state == "seek":
+                self.repairs.append("no JSON object found")
+            return []
+
+        self.repairs.append("truncated response")
+        if self._state != "value" or self._value_start is None:
+            # Cut off in a key, or before its value started
+            return []
+
+        text = self._buffer[self._value_start :]
+        if self._in_string:
+            if text.endswith("\\"):
+                text = text[:-1]
+            text += '"'
+        text += "".join(_CLOSERS[bracket] for bracket in reversed(self._stack))
+        self.repairs.append(f"closed the value of '{self._key}'")
+        pair = (self._key, _load_value(text))
+        self._state = "done"
+        return [pair]
+
+
+def parse_json_object(text: str) -> dict:
+    """Tolerant `json.loads` for a complete LLM response that should be an object."""
+    stream = JSONObjectStream()
+    return dict(stream.feed(text) + stream.finish())
@@ -0,0 +1,77 @@
+import os
+import sys
+import queue
+import atexit
+import logging
+import threading
+import contextvars
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+# All agent loggers live under this name ("code_buddy.agent.graph", ...)
+ROOT_LOGGER = "code_buddy"
+LOG_FORMAT = "%(asctime)s %(levelname)-7s [%(run_id)s] %(name)s: %(message)s"
+DEFAULT_LEVEL = "WARNING"
+
+# The run (thread id) the current context works for, added to every record
+_run_id: contextvars.ContextVar[str] = contextvars.ContextVar("log_run_id", default="-")
+
+_listener: Optional[QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+class RunIdFilter(logging.Filter):
+    """Adds the current run id to the record (runs in the caller's context)."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.run_id = _run_id.get()
+        return True
+
+
+def set_run_id(run_id: str) -> contextvars.Token:
+    """Tags every record logged from the current context with `run_id`."""
+    return _run_id.set(run_id)
+
+
+def get_log_level() -> str:
+    """The level from AGENT_LOG_LEVEL (DEBUG, INFO, WARNING, ...), WARNING by default."""
+    return (os.getenv("AGENT_LOG_LEVEL") or DEFAULT_LEVEL).upper()
+
+
+def configure_logging(level: str = None, stream=None):
+    """
+    Sets up the agent loggers. Nodes only put records on a queue, a
+    background thread formats them and writes them to stderr, so logging
+    never blocks the event loop. Calling it again only changes the level.
+    """
+    global _listener
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    logger.setLevel(level or get_log_level())
+
+    with _configure_lock:
+        if _listener is not None:
+            return
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = QueueHandler(log_queue)
+        queue_handler.addFilter(RunIdFilter())
+        logger.addHandler(queue_handler)
+        logger.propagate = False
+
+        stream_handler = logging.StreamHandler(stream or sys.stderr)
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        _listener = QueueListener(log_queue, stream_handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """
+    Returns the logger for a module (`get_logger(__name__)`).
+    Use lazy arguments, `logger.debug("draft for %s", file)`, so messages
+    below the level are never formatted.
+    """
+    if _listener is None:
+        configure_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
@@ -0,0 +1,266 @@
+import os
+import json
+import time
+import inspect
+import threading
+import contextvars
+from dataclasses import dataclass, asdict
+from typing import Callable, List, Optional
+
+# Nodes that only wrap other nodes (the per-file subgraph in parallel mode).
+# Their records are kept, but not counted again in the per-file breakdown.
+WRAPPER_NODES = {"code_file"}
+
+
+@dataclass
+class NodeRecord:
+    """Timing and LLM usage of one node execution."""
+
+    run_id: str
+    node: str
+    file: Optional[str]
+    iteration: Optional[int]
+    started_at: float  # time.time()
+    ended_at: float = 0.0
+    llm_calls: int = 0
+    llm_latency_s: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_hits: int = 0
+    error: Optional[str] = None
+
+    @property
+    def duration_s(self) -> float:
+        return self.ended_at - self.started_at
+
+    def to_dict(self) -> dict:
+        record = asdict(self)
+        record["duration_s"] = self.duration_s
+        return record
+
+
+def approx_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token) when the model reports none."""
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, round(q * (len(ordered) - 1)))]
+
+
+class RunMetrics:
+    """
+    Collects the NodeRecords of one agent run (thread-safe, since parallel
+    file branches finish nodes at the same time).
+    """
+
+    def __init__(self, run_id: str):
+        self.run_id = run_id
+        self.records: List[NodeRecord] = []
+        self._lock = threading.Lock()
+
+    def add(self, record: NodeRecord):
+        with self._lock:
+            self.records.append(record)
+
+    def snapshot(self) -> List[NodeRecord]:
+        with self._lock:
+            return list(self.records)
+
+    def by_node(self) -> dict:
+        """{node: {"count", "p50_s", "p95_s", "total_s", "llm_latency_s"}}"""
+        durations, llm_latency = {}, {}
+        for record in self.snapshot():
+            durations.setdefault(record.node, []).append(record.duration_s)
+            llm_latency[record.node] = llm_latency.get(record.node, 0.0) + record.llm_latency_s
+
+        return {
+            node: {
+                "count": len(times),
+                "p50_s": percentile(times, 0.5),
+                "p95_s": percentile(times, 0.95),
+                "total_s": sum(times),
+                "llm_latency_s": llm_latency[node],
+            }
+            for node, times in durations.items()
+        }
+
+    def by_file(self) -> dict:
+        """
+        Per-file breakdown: {file: {"wall_s", "iterations", "coder_s",
+        "static_check_s", "critic_s", "llm_latency_s", "input_tokens", "output_tokens"}}
+        """
+        files = {}
+        for record in self.snapshot():
+            if not record.file or record.node in WRAPPER_NODES:
+                continue
+            entry = files.setdefault(
+                record.file,
+                {
+                    "started_at": record.started_at,
+                    "ended_at": record.ended_at,
+                    "iterations": 0,
+                    "coder_s": 0.0,
+                    "static_check_s": 0.0,
+                    "critic_s": 0.0,
+                    "llm_latency_s": 0.0,
+                    "input_tokens": 0,
+                    "output_tokens": 0,
+                },
+            )
+            entry["started_at"] = min(entry["started_at"], record.started_at)
+            entry["ended_at"] = max(entry["ended_at"], record.ended_at)
+            if record.node == "coder":
+                entry["iterations"] = max(entry["iterations"], record.iteration or 0)
+            if f"{record.node}_s" in entry:
+                entry[f"{record.node}_s"] += record.duration_s
+            entry["llm_latency_s"] += record.llm_latency_s
+            entry["input_tokens"] += record.input_tokens
+            entry["output_tokens"] += record.output_tokens
+
+        for entry in files.values():
+            entry["wall_s"] = entry.pop("ended_at") - entry.pop("started_at")
+        return files
+
+    def summary(self) -> dict:
+        """Totals plus the per-node and per-file breakdowns."""
+        records = [r for r in self.snapshot() if r.node not in WRAPPER_NODES]
+        started = min((r.started_at for r in records), default=0.0)
+        ended = max((r.ended_at for r in records), default=0.0)
+        return {
+            "run_id": self.run_id,
+            "wall_s": ended - started,
+            "llm_calls": sum(r.llm_calls for r in records),
+            "llm_latency_s": sum(r.llm_latency_s for r in records),
+            "input_tokens": sum(r.input_tokens for r in records),
+            "output_tokens": sum(r.output_tokens for r in records),
+            "cache_hits": sum(r.cache_hits for r in records),
+            "nodes": self.by_node(),
+            "files": self.by_file(),
+        }
+
+    def write_jsonl(self, path: str):
+        """Appends every record as one JSON line."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "a", encoding="utf-8") as f:
+            for record in self.snapshot():
+                f.write(json.dumps(record.to_dict()) + "\n")
+
+
+# -- Recording --
+
+# The record of the node running in the current context, LLM calls add to it
+_current_record: contextvars.ContextVar[Optional[NodeRecord]] = contextvars.ContextVar(
+    "current_node_record", default=None
+)
+
+
+def record_llm_call(
+    latency_s: float, input_tokens: int, output_tokens: int, cached: bool = False
+):
+    """Adds one LLM call to the node that is running (if it is instrumented)."""
+    record = _current_record.get()
+    if record is None:
+        return
+    record.llm_calls += 1
+    record.llm_latency_s += latency_s
+    if cached:
+        record.cache_hits += 1
+    else:
+        record.input_tokens += input_tokens
+        record.output_tokens += output_tokens
+
+
+def get_run_metrics(config) -> Optional[RunMetrics]:
+    """The RunMetrics passed as {"configurable": {"metrics": ...}}, if any."""
+    return ((config or {}).get("configurable") or {}).get("metrics")
+
+
+def _start_record(name: str, state: dict, config) -> Optional[NodeRecord]:
+    metrics = get_run_metrics(config)
+    if metrics is None:
+        return None
+    return NodeRecord(
+        run_id=metrics.run_id,
+        node=name,
+        file=state.get("current_file"),
+        iteration=state.get("coder_iterations"),
+        started_at=time.time(),
+    )
+
+
+def _finish_record(record: NodeRecord, result, error: Exception, config):
+    record.ended_at = time.time()
+    if isinstance(result, dict):
+        # e.g. prepare_next_file picks the file, the coder bumps the iteration
+        record.file = result.get("current_file") or record.file
+        if "coder_iterations" in result and result["coder_iterations"]:
+            record.iteration = result["coder_iterations"]
+    if error is not None:
+        record.error = repr(error)
+    get_run_metrics(config).add(record)
+
+
+def _call(func: Callable, state: dict, config):
+    if "config" in inspect.signature(func).parameters:
+        return func(state, config=config)
+    return func(state)
+
+
+def instrument(name: str, func: Callable, afunc: Callable = None):
+    """
+    Wraps a node (sync and async versions) so every execution is recorded
+    in the run's RunMetrics: start/end time, the file and iteration it
+    worked on, and the LLM calls made while it ran.
+    Nodes run unchanged when the run has no metrics.
+    """
+
+    def wrapped(state, config):
+        record = _start_record(name, state, config)
+        if record is None:
+            return _call(func, state, config)
+
+        token = _current_record.set(record)
+        result, error = None, None
+        try:
+            result = _call(func, state, config)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current_record.reset(token)
+            _finish_record(record, result, error, config)
+
+    if afunc is None:
+        return wrapped, None
+
+    async def awrapped(state, config):
+        record = _start_record(name, state, config)
+        if record is None:
+            return await _call(afunc, state, config)
+
+        token = _current_record.set(record)
+        result, error = None, None
+        try:
+            result = await _call(afunc, state, config)
+            return result
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            _current_record.reset(token)
+            _finish_record(record, result, error, config)
+
+    return wrapped, awrapped
+
+
+# -- Export --
+
+
+def get_metrics_path() -> Optional[str]:
+    """Runs append their records to AGENT_METRICS_PATH (JSON lines) when it is set."""
+    return os.getenv("AGENT_METRICS_PATH") or None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Literal
 
 
 class ProjectPlan(BaseModel):
@@ -30,3 +30,43 @@ class FilePlans(BaseModel):
         description="A dictionary where each key is a filename (from the file_structure) "
         "and the value is a detailed, step-by-step plan for coding that specific file."
     )
+
+
+class FilePlan(BaseModel):
+    """The plan for one file (a list item, since dict schemas are poorly supported)."""
+
+    filename: str = Field(description="A filename from the file_structure.")
+    plan: str = Field(
+        description="A detailed, step-by-step plan for coding this file, as one block of text."
+    )
+
+
+class ProjectBlueprint(ProjectPlan):
+    """
+    The structured output for the fused planner node: the ProjectPlan
+    and the plan of every file, from a single LLM call.
+    """
+
+    file_plans: List[FilePlan] = Field(
+        description="One entry per filename in file_structure, in the same order."
+    )
+
+
+class CriticVerdict(BaseModel):
+    """
+    The structured output for Node 4 (critic).
+    The severity decides whether a flawed draft is worth another round.
+    """
+
+    passed: bool = Field(
+        description="True only if the code perfectly and completely implements the plan."
+    )
+    severity: Literal["none", "minor", "major", "blocking"] = Field(
+        description="Severity of the worst issue: 'none' if passed, 'minor' for "
+        "cosmetic or nice-to-have fixes, 'major' for missing or wrong features, "
+        "'blocking' if the file is broken or unusable."
+    )
+    issues: List[str] = Field(
+        default_factory=list,
+        description="Concise, actionable descriptions of what is wrong or missing.",
+    )
@@ -0,0 +1,96 @@
+import re
+from typing import List, Tuple
+
+# A search/replace block, as asked for by CODER_PATCH_PROMPT:
+#
+# <<<<<<< SEARCH
+# lines copied exactly from the current draft
+# =======
+# the lines that replace them
+# >>>>>>> REPLACE
+BLOCK_PATTERN = re.compile(
+    r"^<{5,} ?SEARCH[^\n]*\n(.*?)^={5,}[ \t]*\n(.*?)^>{5,} ?REPLACE[^\n]*$",
+    re.DOTALL | re.MULTILINE,
+)
+
+
+class PatchError(ValueError):
+    """Raised when a patch cannot be applied to the draft."""
+
+
+def parse_search_replace_blocks(patch_text: str) -> List[Tuple[str, str]]:
+    """
+    Extracts (search, replace) pairs from the LLM's patch response.
+    """
+    blocks = [
+        (search, replace) for search, replace in BLOCK_PATTERN.findall(patch_text)
+    ]
+    if not blocks:
+        raise PatchError("No SEARCH/REPLACE blocks found in the patch.")
+    return blocks
+
+
+def _find_unique(text: str, search: str) -> int:
+    """Index of `search` in `text`, it must appear exactly once."""
+    index = text.find(search)
+    if index == -1:
+        return -1
+    if text.find(search, index + 1) != -1:
+        raise PatchError(f"SEARCH block is ambiguous:\n{search[:200]}")
+    return index
+
+
+def _find_loose(text: str, search: str) -> Tuple[int, int]:
+    """
+    Finds `search` ignoring leading/trailing whitespace on each line.
+    Returns the (start, end) character span in `text`, or (-1, -1).
+    """
+    search_lines = [line.strip() for line in search.strip("\n").split("\n")]
+    lines = text.split("\n")
+    offsets = []
+    position = 0
+    for line in lines:
+        offsets.append(position)
+        position += len(line) + 1
+
+    matches = []
+    for i in range(len(lines) - len(search_lines) + 1):
+        window = [line.strip() for line in lines[i : i + len(search_lines)]]
+        if window == search_lines:
+            matches.append(i)
+
+    if not matches:
+        return -1, -1
+    if len(matches) > 1:
+        raise PatchError(f"SEARCH block is ambiguous:\n{search[:200]}")
+
+    first = matches[0]
+    last = first + len(search_lines) - 1
+    return offsets[first], offsets[last] + len(lines[last])
+
+
+def apply_search_replace(draft: str, patch_text: str) -> str:
+    """
+    Applies every SEARCH/REPLACE block of the patch to the draft, in order.
+
+    Each SEARCH block must match exactly one place in the draft (an exact
+    match is tried first, then one that ignores indentation differences).
+    Raises PatchError if any block does not apply, so the caller can fall
+    back to regenerating the full file.
+    """
+    result = draft
+    for search, replace in parse_search_replace_blocks(patch_text):
+        if not search.strip():
+            raise PatchError("Empty SEARCH block.")
+
+        index = _find_unique(result, search)
+        if index != -1:
+            result = result[:index] + replace + result[index + len(search) :]
+            continue
+
+        start, end = _find_loose(result, search)
+        if start == -1:
+            raise PatchError(f"SEARCH block not found in the draft:\n{search[:200]}")
+        result = result[:start] + replace.strip("\n") + result[end:]
+
+    return result
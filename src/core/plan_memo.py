@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import time
+import zlib
+import sqlite3
+import threading
+import numpy as np
+from typing import Dict, List, Optional
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# Hashed features per query vector
+EMBEDDING_DIM = 256
+
+# Char 3-grams (of the joined words) count less than whole words
+NGRAM_WEIGHT = 0.25
+
+# MinHash LSH: an entry is only scored if one of its BANDS bands of ROWS
+# min-hashes equals the query's. Feature sets with a Jaccard similarity of
+# 0.7 still share a band 97% of the time, unrelated ones (0.2) 0.6%.
+LSH_BANDS = 20
+LSH_ROWS = 5
+MAX_CANDIDATES = 256
+
+# Words that say nothing about *which* app is wanted ("list", "page" or
+# "tool" do: a to-do list is not a to-do page)
+QUERY_STOP_WORDS = {
+    "a", "an", "the", "me", "my", "i", "we", "us", "you", "please", "want", "need",
+    "build", "make", "create", "write", "simple", "basic", "small", "little", "tiny",
+    "app", "apps", "application", "website", "web", "site",
+    "that", "which", "with", "for", "to", "of", "and", "in", "on", "using", "use",
+    "where", "can", "it", "its", "is", "should", "just", "some",
+}
+
+# Fixed seeds, so stored band keys stay comparable across processes
+_rng = np.random.default_rng(0)
+_HASH_A = _rng.integers(1, 2**63, LSH_BANDS * LSH_ROWS, dtype=np.uint64) | np.uint64(1)
+_HASH_B = _rng.integers(0, 2**63, LSH_BANDS * LSH_ROWS, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 2**63, (1, LSH_ROWS), dtype=np.uint64) | np.uint64(1)
+_BAND_SALT = _rng.integers(0, 2**63, LSH_BANDS, dtype=np.uint64)
+
+
+def query_tokens(query: str) -> List[str]:
+    """Lowercase words without stop words; "to-do" becomes "todo"."""
+    text = re.sub(r"(?<=\w)[-'](?=\w)", "", query.lower())
+    return [word for word in re.findall(r"[a-z0-9]+", text) if word not in QUERY_STOP_WORDS]
+
+
+def query_features(query: str) -> Dict[int, float]:
+    """crc32 of every word and char 3-gram feature -> its weight."""
+    words = query_tokens(query)
+    joined = "".join(words)
+    features = {}
+    for feature, weight in [(f"w:{word}", 1.0) for word in words] + [
+        (f"g:{joined[i:i + 3]}", NGRAM_WEIGHT) for i in range(len(joined) - 2)
+    ]:
+        h = zlib.crc32(feature.encode("utf-8"))
+        features[h] = features.get(h, 0.0) + weight
+    return features
+
+
+def embed_query(query: str, features: Dict[int, float] = None) -> np.ndarray:
+    """
+    A unit-length vector of hashed word and char 3-gram counts (the
+    "hashing trick", with crc32 so vectors are stable across processes).
+    The dot product of two vectors is their cosine similarity.
+    """
+    if features is None:
+        features = query_features(query)
+    vector = np.zeros(EMBEDDING_DIM, dtype=np.float32)
+    for h, weight in features.items():
+        vector[h % EMBEDDING_DIM] += weight if h & 0x80000000 else -weight
+
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def band_keys(features: Dict[int, float]) -> np.ndarray:
+    """The LSH_BANDS MinHash band keys of a feature set (uint64)."""
+    if not features:
+        return np.zeros(0, dtype=np.uint64)
+    x = np.fromiter(features, dtype=np.uint64, count=len(features))
+    # Multiply-shift hashing, overflow wraps around on purpose
+    hashes = (_HASH_A[:, None] * x[None, :] + _HASH_B[:, None]) >> np.uint64(32)
+    signature = hashes.min(axis=1).reshape(LSH_BANDS, LSH_ROWS)
+    return (signature * _BAND_MIX).sum(axis=1) ^ _BAND_SALT
+
+
+class PlanMemo:
+    """
+    Remembers the plan (ProjectPlan fields + file plans) of every query and
+    finds the plan of a similar earlier query.
+
+    Plans are stored in SQLite, the query vectors and MinHash band keys
+    are kept in NumPy arrays. A lookup checks exact matches (same words)
+    first, then binary-searches the sorted band keys for candidates and
+    scores only those. Hits need a cosine similarity of at least
+    `threshold`, and the earlier query must contain every word of the new
+    one: a request that adds a feature ("... and a reset button", "7-day"
+    instead of "5-day") is planned again, however similar it is.
+    """
+
+    def __init__(self, path: str, threshold: float = 0.9, max_entries: int = 20000):
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS plans ("
+            " id INTEGER PRIMARY KEY,"
+            " query TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " bands BLOB NOT NULL,"
+            " plan TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._load()
+
+    def _load(self):
+        """Reads every stored vector and band key into memory."""
+        rows = self._conn.execute("SELECT id, query, vector, bands FROM plans ORDER BY id").fetchall()
+        capacity = max(1024, len(rows))
+        self._vectors = np.zeros((capacity, EMBEDDING_DIM), dtype=np.float32)
+        self._ids: List[int] = [plan_id for plan_id, _, _, _ in rows]
+        self._words: List[frozenset] = [frozenset(query_tokens(query)) for _, query, _, _ in rows]
+        self._exact: Dict[str, int] = {  # words -> row
+            " ".join(query_tokens(query)): row for row, (_, query, _, _) in enumerate(rows)
+        }
+        if rows:
+            vectors = b"".join(vector for _, _, vector, _ in rows)
+            self._vectors[: len(rows)] = np.frombuffer(vectors, dtype=np.float32).reshape(len(rows), -1)
+
+        # All band keys sorted, and the row each one belongs to
+        all_keys = np.frombuffer(b"".join(bands for _, _, _, bands in rows), dtype=np.uint64)
+        key_rows = np.repeat(np.arange(len(rows), dtype=np.int32), LSH_BANDS)
+        order = np.argsort(all_keys, kind="stable")
+        self._keys, self._key_rows = all_keys[order], key_rows[order]
+
+    def _append(self, plan_id: int, query: str, vector: np.ndarray, keys: np.ndarray):
+        row = len(self._ids)
+        if row == len(self._vectors):
+            self._vectors = np.concatenate([self._vectors, np.zeros_like(self._vectors)])
+        self._vectors[row] = vector
+        self._ids.append(plan_id)
+        self._words.append(frozenset(query_tokens(query)))
+        self._exact[" ".join(query_tokens(query))] = row
+
+        positions = np.searchsorted(self._keys, keys)
+        self._keys = np.insert(self._keys, positions, keys)
+        self._key_rows = np.insert(self._key_rows, positions, row)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _best_row(self, query: str):
+        """(row, similarity) of the most similar entry with every word of the query, or None."""
+        row = self._exact.get(" ".join(query_tokens(query)))
+        if row is not None:
+            return row, 1.0
+
+        features = query_features(query)
+        if not self._ids or not features:
+            return None
+
+        keys = band_keys(features)
+        starts = np.searchsorted(self._keys, keys, side="left")
+        ends = np.searchsorted(self._keys, keys, side="right")
+        matches = [self._key_rows[s:e] for s, e in zip(starts, ends) if e > s]
+        if not matches:
+            return None
+        candidates, shared = np.unique(np.concatenate(matches), return_counts=True)
+        if len(candidates) > MAX_CANDIDATES:
+            # The entries sharing the most bands are the most similar ones
+            candidates = candidates[np.argpartition(shared, -MAX_CANDIDATES)[-MAX_CANDIDATES:]]
+
+        similarities = self._vectors[candidates] @ embed_query(query, features)
+        words = set(query_tokens(query))
+        for best in np.argsort(-similarities):
+            if similarities[best] < self.threshold:
+                break
+            row = int(candidates[best])
+            # An extra word may be an extra requirement the stored plan lacks
+            if words <= self._words[row]:
+                return row, float(similarities[best])
+        return None
+
+    def lookup(self, query: str) -> Optional[dict]:
+        """
+        Returns {"query", "similarity", "plan"} of the most similar earlier
+        query, or None if none is similar enough.
+        """
+        with self._lock:
+            best = self._best_row(query)
+            if best is None or best[1] < self.threshold:
+                return None
+            row, similarity = best
+            try:
+                stored_query, plan = self._conn.execute(
+                    "SELECT query, plan FROM plans WHERE id = ?", (self._ids[row],)
+                ).fetchone()
+            except sqlite3.Error as e:
+                # Like the LLM cache, the memo must never break a run
+                logger.warning("Plan memo read failed: %s", e)
+                return None
+        return {"query": stored_query, "similarity": similarity, "plan": json.loads(plan)}
+
+    def remember(self, query: str, plan: dict):
+        """Stores the plan of a query (a query with the same words replaces it)."""
+        features = query_features(query)
+        if not features:
+            return
+        vector, keys = embed_query(query, features), band_keys(features)
+        with self._lock:
+            try:
+                row = self._exact.get(" ".join(query_tokens(query)))
+                if row is not None:
+                    self._conn.execute("DELETE FROM plans WHERE id = ?", (self._ids[row],))
+                cursor = self._conn.execute(
+                    "INSERT INTO plans (query, vector, bands, plan, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (query, vector.tobytes(), keys.tobytes(), json.dumps(plan), time.time()),
+                )
+                self._conn.commit()
+            except sqlite3.Error as e:
+                logger.warning("Plan memo write failed: %s", e)
+                return
+
+            if row is not None or len(self._ids) >= self.max_entries:
+                self._evict()
+                self._load()
+            else:
+                self._append(cursor.lastrowid, query, vector, keys)
+
+    def _evict(self):
+        """Drops the oldest entries (a tenth at a time) once over 'max_entries'."""
+        count = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - self.max_entries + self.max_entries // 10
+        self._conn.execute(
+            "DELETE FROM plans WHERE id IN (SELECT id FROM plans ORDER BY id LIMIT ?)", (excess,)
+        )
+        self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM plans")
+            self._conn.commit()
+            self._load()
+
+
+# -- Shared instance, configured from environment variables --
+
+_plan_memo: Optional[PlanMemo] = None
+_plan_memo_lock = threading.Lock()
+
+
+def is_plan_memo_enabled() -> bool:
+    """Plan reuse can be switched off with PLAN_CACHE_DISABLED=1."""
+    return os.getenv("PLAN_CACHE_DISABLED", "0").lower() not in ("1", "true", "yes")
+
+
+def get_plan_memo() -> PlanMemo:
+    """Returns the process-wide plan memo, creating it on first use."""
+    global _plan_memo
+    if _plan_memo is None:
+        with _plan_memo_lock:
+            if _plan_memo is None:
+                _plan_memo = PlanMemo(
+                    path=os.getenv("PLAN_CACHE_PATH", ".cache/plans.sqlite"),
+                    threshold=float(os.getenv("PLAN_CACHE_THRESHOLD", "0.9")),
+                    max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", "20000")),
+                )
+    return _plan_memo
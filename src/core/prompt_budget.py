@@ -0,0 +1,359 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+from core.prompts import (
+    CODER_CORRECTION_PROMPT,
+    CODER_PATCH_PROMPT,
+    OMITTED_LINES_NOTE_FULL,
+    OMITTED_LINES_NOTE_PATCH,
+)
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# (context window, max output) in tokens per model
+MODEL_TOKEN_LIMITS = {
+    "gemini-2.0-flash": (1_048_576, 8_192),
+    "gemini-2.0-flash-lite": (1_048_576, 8_192),
+    "gemini-1.5-flash": (1_048_576, 8_192),
+    "gemini-1.5-pro": (2_097_152, 8_192),
+    "gemini-2.5-flash": (1_048_576, 65_536),
+    "gemini-2.5-pro": (1_048_576, 65_536),
+}
+# Models we know nothing about get a small, safe window
+DEFAULT_TOKEN_LIMITS = (32_768, 8_192)
+
+DEFAULT_MAX_PROMPT_TOKENS = 6000
+
+# A plan longer than this is summarized in correction prompts
+PLAN_MAX_TOKENS = 400
+# Lines kept around each line the critique refers to, widened up to
+# BLOCK_LINES more to reach the blank lines around its block
+CONTEXT_LINES = 3
+BLOCK_LINES = 12
+# First and last lines of a draft, always kept so its structure stays visible
+EDGE_LINES = 3
+# A draft that fits is only trimmed if the excerpt is at least this much smaller
+MIN_EXCERPT_SAVING = 0.2
+
+OMITTED_MARKER = "... [lines {start}-{end} omitted] ..."
+OMITTED_PATTERN = re.compile(r"\.\.\. \[lines (\d+)-(\d+) omitted\] \.\.\.")
+# Anything that still looks like a marker, e.g. one the model copied wrong
+LOOSE_OMITTED_PATTERN = re.compile(r"lines\s*\d+\s*-\s*\d+\s*omitted", re.IGNORECASE)
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+STOP_WORDS = {
+    "about", "after", "also", "before", "code", "does", "draft", "file", "from",
+    "have", "into", "is", "it", "line", "lines", "make", "missing", "must", "needs",
+    "never", "only", "plan", "should", "that", "their", "then", "there", "this",
+    "when", "where", "which", "while", "with", "without", "would",
+}
+
+
+def count_tokens(text: str) -> int:
+    """
+    Local token estimate, no tokenizer download or API call: words count
+    one token per ~4 characters, every symbol counts as one. Close to
+    what BPE tokenizers report for code, where symbols are frequent.
+    """
+    return sum((len(piece) + 3) // 4 for piece in TOKEN_PATTERN.findall(text or ""))
+
+
+def get_max_prompt_tokens(model_name: Optional[str] = None) -> int:
+    """
+    Token budget of a correction prompt: CORRECTION_PROMPT_MAX_TOKENS
+    (default 6000), and never more than the model's context window minus
+    room for its longest answer.
+    """
+    context, max_output = MODEL_TOKEN_LIMITS.get(model_name, DEFAULT_TOKEN_LIMITS)
+    configured = int(os.getenv("CORRECTION_PROMPT_MAX_TOKENS", DEFAULT_MAX_PROMPT_TOKENS))
+    return max(1, min(configured, context - max_output))
+
+
+# -- What the critique refers to --
+
+
+def critique_terms(critique: str) -> Dict[str, int]:
+    """
+    Terms of a critique with a weight: quoted text (e.g. an ID or a
+    message) 3, identifiers such as 'add-btn', '.todo-item' or
+    'itemsLeft' 2, other meaningful words 1. Terms are lowercase.
+    """
+    terms: Dict[str, int] = {}
+
+    def add(term: str, weight: int):
+        term = term.strip().lower()
+        if len(term) >= 2 and term not in STOP_WORDS:
+            terms[term] = max(terms.get(term, 0), weight)
+
+    for quoted in re.findall(r"['\"`]([^'\"`\n]{2,60})['\"`]", critique or ""):
+        add(quoted, 3)
+    for word in re.findall(r"[#.]?[A-Za-z_][\w-]*", critique or ""):
+        if re.search(r"[-_#.]|[a-z][A-Z]", word):
+            add(word.lstrip("#."), 2)
+        elif len(word) >= 4:
+            # "items" should find "item"
+            add(word[:-1] if word.endswith("s") and len(word) > 4 else word, 1)
+    return terms
+
+
+def _line_scores(lines: List[str], terms: Dict[str, int]) -> List[int]:
+    lowered = [line.lower() for line in lines]
+    return [sum(weight for term, weight in terms.items() if term in line) for line in lowered]
+
+
+# -- Compaction of each prompt part --
+
+
+def compact_critique(critique: str) -> str:
+    """The critique without blank and repeated lines."""
+    seen = set()
+    kept = []
+    for line in (critique or "").split("\n"):
+        key = line.strip().lower()
+        if key and key not in seen:
+            seen.add(key)
+            kept.append(line.rstrip())
+    return "\n".join(kept)
+
+
+def compact_plan(plan: str, critique: str = "", max_tokens: int = PLAN_MAX_TOKENS) -> str:
+    """
+    A plan that fits 'max_tokens'. Each step is cut to its first sentence,
+    and if that is still too long, the steps the critique refers to are
+    kept before the others (in the plan's order).
+    """
+    if count_tokens(plan) <= max_tokens:
+        return plan
+
+    steps = [s.strip() for s in re.split(r"(?:^|\s)(?=\d+[.)]\s)|\n+", plan) if s and s.strip()]
+    short = []
+    for step in steps:
+        number, body = re.match(r"(\d+[.)]\s+)?(.*)", step, re.DOTALL).groups()
+        short.append((number or "") + re.split(r"(?<=[.!?])\s+", body, maxsplit=1)[0])
+    if count_tokens(" ".join(short)) <= max_tokens:
+        return " ".join(short)
+
+    scores = _line_scores(short, critique_terms(critique))
+    order = sorted(range(len(short)), key=lambda i: (-scores[i], i))
+    kept, used = set(), 0
+    for i in order:
+        cost = count_tokens(short[i]) + 1
+        if used + cost > max_tokens:
+            continue
+        kept.add(i)
+        used += cost
+    omitted = len(short) - len(kept)
+    text = " ".join(short[i] for i in sorted(kept))
+    return f"{text} ({omitted} other steps omitted)" if omitted else text
+
+
+def _render(lines: List[str], kept: set) -> str:
+    """The kept lines, with one marker line per gap (line numbers are 1-based)."""
+    out = []
+    i = 0
+    while i < len(lines):
+        if i in kept:
+            out.append(lines[i])
+            i += 1
+            continue
+        start = i
+        while i < len(lines) and i not in kept:
+            i += 1
+        out.append(OMITTED_MARKER.format(start=start + 1, end=i))
+    return "\n".join(out)
+
+
+def critique_issues(critique: str) -> List[str]:
+    """The separate issues of a critique: its lines, split into sentences."""
+    issues = []
+    for line in (critique or "").split("\n"):
+        issues.extend(s for s in re.split(r"(?<=[.!?])\s+(?=[A-Z0-9])", line) if s.strip())
+    return issues
+
+
+def find_anchors(lines: List[str], critique: str, per_issue: int = 4) -> List[int]:
+    """
+    The draft lines the critique refers to, most relevant first: for
+    each issue, the lines that match most of its terms, where a term
+    found on many lines counts less than a rare one. At most 'per_issue'
+    lines per issue, so a vague issue does not pull in the whole file.
+    """
+    lowered = [line.lower() for line in lines]
+    ranked: Dict[int, float] = {}
+    for issue in critique_issues(critique):
+        terms = critique_terms(issue)
+        found = {term: [i for i, line in enumerate(lowered) if term in line] for term in terms}
+        scores: Dict[int, float] = {}
+        for term, hits in found.items():
+            for i in hits:
+                scores[i] = scores.get(i, 0.0) + terms[term] / len(hits)
+        if not scores:
+            continue
+        best = max(scores.values())
+        close = [i for i, score in scores.items() if score >= best / 2]
+        for i in sorted(close, key=lambda i: (-scores[i], i))[:per_issue]:
+            ranked[i] = max(ranked.get(i, 0.0), scores[i])
+    return sorted(ranked, key=lambda i: (-ranked[i], i))
+
+
+def _block_around(lines: List[str], i: int) -> Tuple[int, int]:
+    """
+    The lines around line 'i' (as a range start, end): CONTEXT_LINES on
+    each side, widened to the nearest blank lines within BLOCK_LINES.
+    """
+    start = max(0, i - CONTEXT_LINES)
+    limit = max(0, start - BLOCK_LINES)
+    while start > limit and lines[start - 1].strip():
+        start -= 1
+    end = min(len(lines), i + CONTEXT_LINES + 1)
+    limit = min(len(lines), end + BLOCK_LINES)
+    while end < limit and lines[end - 1].strip():
+        end += 1
+    return start, end
+
+
+def elide_draft(draft: str, critique: str, max_tokens: int) -> Optional[str]:
+    """
+    An excerpt of the draft that fits 'max_tokens': the lines the critique
+    refers to (see `find_anchors`) with the block around them, the
+    first and last lines, and a marker line for every gap. None if the
+    critique refers to no line of the draft and the draft already fits.
+    """
+    lines = draft.split("\n")
+    anchors = find_anchors(lines, critique)
+    if not anchors and count_tokens(draft) <= max_tokens:
+        return None
+
+    line_tokens = [count_tokens(line) + 1 for line in lines]
+    marker_tokens = count_tokens(OMITTED_MARKER.format(start=len(lines), end=len(lines))) + 1
+
+    kept = set()
+    used = 0
+
+    def try_keep(indices) -> bool:
+        nonlocal used
+        new = [i for i in indices if i not in kept]
+        # Every new block may open one more gap
+        cost = sum(line_tokens[i] for i in new) + marker_tokens
+        if used + cost > max_tokens:
+            return False
+        kept.update(new)
+        used += cost
+        return True
+
+    try_keep(range(min(EDGE_LINES, len(lines))))
+    try_keep(range(max(0, len(lines) - EDGE_LINES), len(lines)))
+    for i in anchors:
+        start, end = _block_around(lines, i)
+        # The whole block (rule, function, element) if it fits, else a few lines
+        if not try_keep(range(start, end)):
+            try_keep(range(max(0, i - CONTEXT_LINES), min(len(lines), i + CONTEXT_LINES + 1)))
+    if not anchors:
+        # Nothing to go by: show the draft from the top, as far as it fits
+        for i in range(len(lines)):
+            if not try_keep([i]):
+                break
+
+    return _render(lines, kept)
+
+
+def expand_omitted_lines(code: str, draft: str) -> str:
+    """
+    Puts the draft's omitted lines back where the model copied their
+    marker lines (see OMITTED_LINES_NOTE_FULL). Lines without a marker
+    are returned unchanged.
+    """
+    if "omitted] ..." not in code:
+        return code
+    draft_lines = draft.split("\n")
+    out = []
+    for line in code.split("\n"):
+        match = OMITTED_PATTERN.search(line)
+        if match is None:
+            out.append(line)
+            continue
+        start, end = int(match.group(1)), int(match.group(2))
+        out.extend(draft_lines[start - 1 : end])
+    return "\n".join(out)
+
+
+def restore_omitted_lines(code: str, draft: str, shown_draft: str) -> Optional[str]:
+    """
+    The complete file from a full rewrite of a trimmed draft
+    ('shown_draft' is what the prompt showed). None if the model did not
+    copy every marker line of it exactly once, since the lines of a
+    missing marker would be lost, or if a marker is left that cannot be
+    filled in. The rewrite must then be asked for with the whole draft.
+    """
+    shown = sorted(m.group(0) for m in OMITTED_PATTERN.finditer(shown_draft))
+    copied = sorted(m.group(0) for m in OMITTED_PATTERN.finditer(code))
+    if copied != shown:
+        return None
+    restored = expand_omitted_lines(code, draft)
+    if LOOSE_OMITTED_PATTERN.search(restored) and not LOOSE_OMITTED_PATTERN.search(draft):
+        return None
+    return restored
+
+
+# -- The correction prompt as a whole --
+
+
+def compact_correction_input(
+    prompt_input: dict, mode: str = "full", model_name: Optional[str] = None
+) -> Tuple[dict, dict]:
+    """
+    Fits the input of CODER_CORRECTION_PROMPT ('full') or
+    CODER_PATCH_PROMPT ('patch') into the model's budget (see
+    `get_max_prompt_tokens`):
+      - repeated critique lines are dropped,
+      - a long plan is summarized (`compact_plan`),
+      - only the draft regions the critique refers to are shown, when
+        that saves at least MIN_EXCERPT_SAVING of the draft or the whole
+        draft does not fit. Full rewrites copy the marker lines, which
+        `restore_omitted_lines` fills back in.
+
+    Returns the new input and a report:
+    {"tokens_before", "tokens_after", "budget", "plan_compacted", "draft_elided"}.
+    """
+    prompt = CODER_PATCH_PROMPT if mode == "patch" else CODER_CORRECTION_PROMPT
+    note = OMITTED_LINES_NOTE_PATCH if mode == "patch" else OMITTED_LINES_NOTE_FULL
+    budget = get_max_prompt_tokens(model_name)
+    tokens_before = count_tokens(prompt.format(**prompt_input))
+
+    critique = compact_critique(prompt_input["critique"])
+    plan = compact_plan(prompt_input["file_plan"], critique)
+    compacted = {**prompt_input, "critique": critique, "file_plan": plan}
+
+    draft = prompt_input["current_code_draft"] or ""
+    fixed = count_tokens(prompt.format(**{**compacted, "current_code_draft": note}))
+    draft_budget = max(0, budget - fixed)
+
+    excerpt = elide_draft(draft, critique, draft_budget)
+    if (
+        excerpt is not None
+        and count_tokens(draft) <= draft_budget
+        and count_tokens(f"{note}\n{excerpt}") > (1 - MIN_EXCERPT_SAVING) * count_tokens(draft)
+    ):
+        # Not worth hiding parts of the draft for so little
+        excerpt = None
+    if excerpt is not None:
+        compacted["current_code_draft"] = f"{note}\n{excerpt}"
+
+    tokens_after = count_tokens(prompt.format(**compacted))
+    report = {
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "budget": budget,
+        "plan_compacted": plan != prompt_input["file_plan"],
+        "draft_elided": excerpt is not None,
+    }
+    if tokens_after > budget:
+        logger.warning(
+            "Correction prompt for %s is %d tokens, over its budget of %d.",
+            prompt_input.get("current_file"),
+            tokens_after,
+            budget,
+        )
+    return compacted, report
@@ -55,11 +55,36 @@ ARCHITECT_PROMPT = PromptTemplate(
     input_variables=["project_description", "tech_stack", "file_structure"],
 )
 
+# --- 1+2. Fused Planner Prompt ---
+# Plans the project *and* every file in one call (replaces 1 and 2).
+# Input: {query}
+# Output: ProjectBlueprint (JSON)
+
+FUSED_PLANNER_TEMPLATE = """
+You are an expert software project manager and senior software architect.
+Your job is to plan the whole project for a user's request in one go.
+
+Analyze the user's request:
+"{query}"
+
+1. Generate a project title, a single-sentence project description, a list
+   of the required tech stack (e.g., HTML, CSS, JS), and a complete list of
+   all necessary filenames (file_structure).
+2. For *every* filename in file_structure, write a detailed, step-by-step
+   implementation plan as a SINGLE block of text (not a list of steps).
+   Name the element IDs, classes and functions other files rely on, so all
+   files agree on them.
+"""
+
+FUSED_PLANNER_PROMPT = PromptTemplate(template=FUSED_PLANNER_TEMPLATE, input_variables=["query"])
+
 # --- 3. Coder Prompts (First Draft & Correction) ---
 
 # 3a. First Draft
 # Takes a file plan and writes the first version of the code.
-# Input: {current_file}, {file_plan}
+# {project_context} lists the IDs, classes, selectors and functions of the
+# files written before (see core/symbols.py), so references match them.
+# Input: {current_file}, {file_plan}, {project_context}
 # Output: Raw Code (string)
 
 CODER_TEMPLATE = """
@@ -69,13 +94,20 @@ File to write: {current_file}
 Plan:
 {file_plan}
 
+Already written files and the names they define:
+{project_context}
+
+When this file refers to an element ID, class, selector or function from
+another file, use *exactly* the name listed above.
+
 Important: Respond *only* with the raw code for this file.
 Do not add *any* other text, explanations, or markdown formatting (like ```)
 around the code.
 """
 
 CODER_PROMPT = PromptTemplate(
-    template=CODER_TEMPLATE, input_variables=["current_file", "file_plan"]
+    template=CODER_TEMPLATE,
+    input_variables=["current_file", "file_plan", "project_context"],
 )
 
 
@@ -109,10 +141,51 @@ CODER_CORRECTION_PROMPT = PromptTemplate(
     input_variables=["current_file", "file_plan", "critique", "current_code_draft"],
 )
 
+# 3c. Patch Correction
+# Same as 3b, but asks only for the changed parts as SEARCH/REPLACE blocks,
+# which are applied locally (see core/patching.py).
+# Input: {current_file}, {file_plan}, {critique}, {current_code_draft}
+# Output: SEARCH/REPLACE blocks (string)
+
+CODER_PATCH_TEMPLATE = """
+You are an expert web developer. Your previous code draft for {current_file} 
+was flawed. You must fix it.
+
+Original Plan:
+{file_plan}
+
+Your Previous Draft:
+{current_code_draft}
+
+Critique from Reviewer:
+{critique}
+
+Do *NOT* rewrite the whole file. Respond *only* with the edits needed to fix
+the critique, as one or more SEARCH/REPLACE blocks in this *EXACT* format:
+
+<<<<<<< SEARCH
+lines copied *exactly* from the previous draft
+=======
+the new lines that replace them
+>>>>>>> REPLACE
+
+Rules:
+- Each SEARCH part must match the previous draft character for character
+  and must be unique in it. Include a few surrounding lines if needed.
+- To add new code, SEARCH for the lines next to where it goes and repeat
+  them in the REPLACE part together with the new code.
+- Do not add any other text, explanations, or markdown formatting.
+"""
+
+CODER_PATCH_PROMPT = PromptTemplate(
+    template=CODER_PATCH_TEMPLATE,
+    input_variables=["current_file", "file_plan", "critique", "current_code_draft"],
+)
+
 # --- 4. Critic Prompt ---
-# Reviews the code against the plan and either says "PERFECT" or gives a critique.
+# Reviews the code against the plan and gives a structured verdict.
 # Input: {current_file}, {file_plan}, {current_code_draft}
-# Output: "PERFECT" or Critique (string)
+# Output: CriticVerdict (JSON)
 
 CRITIC_TEMPLATE = """
 You are an expert code reviewer and quality assurance specialist. 
@@ -128,12 +201,78 @@ Code Draft:
 
 Review the draft. Does it *perfectly and completely* implement the plan?
 
-- If YES: Respond with only the single word: PERFECT
-- If NO: Provide a concise, actionable critique of what is wrong or 
-  missing. Do not say 'PERFECT' if even a small part is missing.
+- If YES: set passed to true, severity to "none" and leave issues empty.
+- If NO: set passed to false and list concise, actionable issues describing 
+  what is wrong or missing. Do not pass the draft if even a small part is missing.
+  Set severity to the worst issue:
+  - "minor": cosmetic details or nice-to-haves, the file works as planned
+  - "major": a planned feature is missing or wrong
+  - "blocking": the file is broken (syntax errors, unusable output)
 """
 
 CRITIC_PROMPT = PromptTemplate(
     template=CRITIC_TEMPLATE,
     input_variables=["current_file", "file_plan", "current_code_draft"],
 )
+
+# The same review for a draft whose beginning a speculative review found
+# blocking issues in only after the draft was finished.
+# Input: {current_file}, {file_plan}, {current_code_draft}, {partial_critique}
+
+CRITIC_NOTED_TEMPLATE = CRITIC_TEMPLATE + """
+A review of the beginning of this draft, done while it was being written,
+reported these blocking issues. Check whether they are still present:
+{partial_critique}
+"""
+
+CRITIC_NOTED_PROMPT = PromptTemplate(
+    template=CRITIC_NOTED_TEMPLATE,
+    input_variables=["current_file", "file_plan", "current_code_draft", "partial_critique"],
+)
+
+# --- 5. Partial Critic Prompt ---
+# Speculative review of a draft that is still being written.
+# Input: {current_file}, {file_plan}, {current_code_draft}
+# Output: CriticVerdict (JSON)
+
+CRITIC_PARTIAL_TEMPLATE = """
+You are an expert code reviewer. The code draft below is still being written:
+you only see its beginning, and it stops mid-file.
+
+File: {current_file}
+
+Plan:
+{file_plan}
+
+Beginning of the Code Draft:
+{current_code_draft}
+
+Check only whether the part written so far is on the wrong track, so that
+finishing it would be a waste. Do NOT report anything that is simply not written
+yet, unclosed tags or brackets at the end, or style details.
+
+- If the beginning is fine: set passed to true, severity to "none" and leave issues empty.
+- If it is on the wrong track: set passed to false, severity to "blocking" and list
+  concise, actionable issues (e.g. the wrong language or framework, a structure that
+  contradicts the plan, element IDs or names the plan does not use).
+"""
+
+CRITIC_PARTIAL_PROMPT = PromptTemplate(
+    template=CRITIC_PARTIAL_TEMPLATE,
+    input_variables=["current_file", "file_plan", "current_code_draft"],
+)
+
+# --- 6. Notes for Compacted Correction Drafts ---
+# Put in front of a draft whose unrelated lines were left out
+# (see core/prompt_budget.py). Each gap is one marker line such as
+# "... [lines 12-40 omitted] ...".
+
+OMITTED_LINES_NOTE_FULL = """(Only the parts of the draft that the critique is about are shown.
+Copy every "... [lines A-B omitted] ..." line *exactly* as it is, at the
+same place in your answer: those lines are put back automatically.)
+"""
+
+OMITTED_LINES_NOTE_PATCH = """(Only the parts of the draft that the critique is about are shown.
+Lines marked "... [lines A-B omitted] ..." are not shown: SEARCH only
+for lines you can see, and never include a marker line in a SEARCH part.)
+"""
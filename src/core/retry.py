@@ -0,0 +1,106 @@
+import os
+import time
+import random
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Iterator, TypeVar
+from langchain_core.exceptions import ModelRateLimitError
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_MAX_RETRIES = 4
+BASE_DELAY_SECONDS = 1.0
+MAX_DELAY_SECONDS = 30.0
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """True for "slow down" answers from a provider (HTTP 429 / RESOURCE_EXHAUSTED)."""
+    if isinstance(error, ModelRateLimitError):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == 429:
+        return True
+    message = str(error)
+    return "RESOURCE_EXHAUSTED" in message or "Too Many Requests" in message
+
+
+def get_max_retries() -> int:
+    """Retries per LLM call after throttling, from LLM_MAX_RETRIES (default 4)."""
+    return max(0, int(os.getenv("LLM_MAX_RETRIES", DEFAULT_MAX_RETRIES)))
+
+
+def backoff_delays(retries: int = None) -> Iterator[float]:
+    """
+    Seconds to wait before each retry: exponential with "full jitter"
+    (uniform between 0 and the exponential step), so clients that were
+    throttled together do not all come back at the same moment.
+    """
+    retries = get_max_retries() if retries is None else retries
+    for attempt in range(retries):
+        yield random.uniform(0, min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * 2**attempt))
+
+
+def call_with_retries(func: Callable[[], T]) -> T:
+    """Calls func(), retrying throttling errors with jittered backoff."""
+    for delay in backoff_delays():
+        try:
+            return func()
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            logger.warning("Throttled by the LLM provider, retrying in %.1fs: %s", delay, e)
+            time.sleep(delay)
+    return func()
+
+
+async def acall_with_retries(func: Callable[[], Awaitable[T]]) -> T:
+    """Async version of `call_with_retries`, func() returns a new awaitable each call."""
+    for delay in backoff_delays():
+        try:
+            return await func()
+        except Exception as e:
+            if not is_throttling_error(e):
+                raise
+            logger.warning("Throttled by the LLM provider, retrying in %.1fs: %s", delay, e)
+            await asyncio.sleep(delay)
+    return await func()
+
+
+def stream_with_retries(func: Callable[[], Iterator[T]]) -> Iterator[T]:
+    """
+    Yields from the stream func() returns, starting a new one after a
+    throttling error. Once a chunk was yielded, errors are raised.
+    """
+    for delay in backoff_delays():
+        streamed = False
+        try:
+            for chunk in func():
+                streamed = True
+                yield chunk
+            return
+        except Exception as e:
+            if streamed or not is_throttling_error(e):
+                raise
+            logger.warning("Throttled by the LLM provider, retrying in %.1fs: %s", delay, e)
+            time.sleep(delay)
+    yield from func()
+
+
+async def astream_with_retries(func: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+    """Async version of `stream_with_retries`."""
+    for delay in backoff_delays():
+        streamed = False
+        try:
+            async for chunk in func():
+                streamed = True
+                yield chunk
+            return
+        except Exception as e:
+            if streamed or not is_throttling_error(e):
+                raise
+            logger.warning("Throttled by the LLM provider, retrying in %.1fs: %s", delay, e)
+            await asyncio.sleep(delay)
+    async for chunk in func():
+        yield chunk
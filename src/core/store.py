@@ -1,30 +1,276 @@
 import os
+import json
+import shutil
+import hashlib
+import uuid
+import threading
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from core.log import get_logger
 
+logger = get_logger(__name__)
 
-def save_workspace_to_disk(workspace: dict, base_dir: str = "src/output"):
+# Saved next to the files: {filename: {"size": bytes, "sha256": hex}}
+MANIFEST_NAME = ".manifest.json"
+
+# Streaming mode appends one JSON line per saved file instead of
+# rewriting the manifest: {"file": name, "size": bytes, "sha256": hex}
+MANIFEST_LOG_NAME = ".manifest.log"
+
+DEFAULT_MAX_WORKERS = 8
+
+# Below this many files and bytes (and on one CPU), the thread pool is
+# slower than writing the files one by one (see bench/store.py)
+PARALLEL_MIN_FILES = 256
+PARALLEL_MIN_BYTES = 16 * 1024 * 1024
+
+
+@dataclass
+class SaveResult:
+    """What `save_workspace_to_disk` did."""
+
+    path: str
+    manifest: Dict[str, dict]  # filename -> {"size", "sha256"}
+    written: List[str] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)  # same hash, not rewritten
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _safe_path(base_dir: str, filename: str) -> str:
+    """The path of a workspace file, refusing names that leave 'base_dir'."""
+    path = os.path.normpath(os.path.join(base_dir, filename))
+    if os.path.isabs(filename) or not path.startswith(os.path.join(base_dir, "")):
+        raise ValueError(f"Refusing to write '{filename}' outside of the output directory.")
+    return path
+
+
+def load_manifest(base_dir: str) -> Dict[str, dict]:
+    """
+    The manifest of a saved workspace (with the files streamed since the
+    last full save), or {} if there is none.
+    """
+    try:
+        with open(os.path.join(base_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        manifest = {}
+    try:
+        with open(os.path.join(base_dir, MANIFEST_LOG_NAME), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    manifest[entry["file"]] = {"size": entry["size"], "sha256": entry["sha256"]}
+                except (ValueError, KeyError, TypeError):
+                    continue  # e.g. a line cut short by a crash
+    except OSError:
+        pass
+    return manifest
+
+
+def _sibling(path: str, kind: str) -> str:
+    """A free hidden name next to 'path' (created with the normal permissions, unlike mkstemp)."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f".{name}.{kind}-{uuid.uuid4().hex[:12]}")
+
+
+def _write_atomic(path: str, data: bytes):
+    """Writes to a temp file next to 'path' and renames it into place."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = _sibling(path, "tmp")
+    try:
+        with open(temp_path, "xb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+        raise
+
+
+def _is_unchanged(manifest: Dict[str, dict], filename: str, digest: str, path: str) -> bool:
+    return (manifest.get(filename) or {}).get("sha256") == digest and os.path.isfile(path)
+
+
+def _carry_over(base_dir: str, staging: str, generated: set):
+    """
+    Links every file of 'base_dir' that was not generated by us (e.g. a
+    .git folder, a .env or the user's own files) into 'staging', so the
+    swap keeps it. Files from an earlier save are in 'generated'.
+    """
+    if not os.path.isdir(base_dir):
+        return
+    for root, dirs, files in os.walk(base_dir):
+        rel_root = os.path.relpath(root, base_dir)
+        for name in dirs:
+            path = os.path.join(root, name)
+            if os.path.islink(path):
+                # os.walk does not enter linked directories, keep the link itself
+                files.append(name)
+            else:
+                os.makedirs(os.path.join(staging, rel_root, name), exist_ok=True)
+        for name in files:
+            rel = os.path.normpath(os.path.join(rel_root, name))
+            if rel.replace(os.sep, "/") in generated:
+                continue
+            source, target = os.path.join(root, name), os.path.join(staging, rel)
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+                continue
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copy2(source, target)
+
+
+def _swap_dirs(staging: str, base_dir: str):
+    """Moves the staged directory into place, the old version is removed."""
+    if not os.path.exists(base_dir):
+        os.rename(staging, base_dir)
+        return
+
+    backup = _sibling(base_dir, "old")
+    os.rename(base_dir, backup)
+    try:
+        os.rename(staging, base_dir)
+    except OSError:
+        os.rename(backup, base_dir)
+        raise
+    shutil.rmtree(backup, ignore_errors=True)
+
+
+def save_workspace_to_disk(
+    workspace: dict, base_dir: str = "src/output", max_workers: int = DEFAULT_MAX_WORKERS
+) -> SaveResult:
     """
     Saves the generated workspace files to a specified directory.
+
+    The files are written to a temp directory next to 'base_dir' (by a
+    thread pool for big workspaces, see PARALLEL_MIN_FILES), which then
+    replaces 'base_dir' with two renames, so a
+    crash never leaves a half-written project. Files of an earlier save
+    that are not in the workspace anymore are dropped, every other file
+    already in 'base_dir' is kept. Files whose hash matches the previous
+    manifest are hard-linked instead of written again. Errors are raised.
     """
-    print(f"\n--- 💾 SAVING PROJECT TO FOLDER: {base_dir} ---")
+    base_dir = os.path.abspath(base_dir)
+    parent = os.path.dirname(base_dir)
+    os.makedirs(parent, exist_ok=True)
+
+    previous = load_manifest(base_dir)
+    staging = _sibling(base_dir, "tmp")
+    os.mkdir(staging)
+
+    def stage(item):
+        filename, content = item
+        data = content.encode("utf-8")
+        digest = content_hash(data)
+        target = _safe_path(staging, filename)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        current = _safe_path(base_dir, filename)
+        if _is_unchanged(previous, filename, digest, current):
+            try:
+                os.link(current, target)
+                return filename, len(data), digest, False
+            except OSError:
+                pass  # e.g. no hard links on this file system
+
+        with open(target, "wb") as f:
+            f.write(data)
+        return filename, len(data), digest, True
 
-    # 1. Create the base directory if it doesn't exist
-    os.makedirs(base_dir, exist_ok=True)
+    try:
+        total_size = sum(len(content) for content in workspace.values())
+        if max_workers > 1 and (os.cpu_count() or 1) > 1 and (
+            len(workspace) >= PARALLEL_MIN_FILES or total_size >= PARALLEL_MIN_BYTES
+        ):
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                staged = list(pool.map(stage, workspace.items()))
+        else:
+            staged = [stage(item) for item in workspace.items()]
 
-    # 2. Loop through each file in the workspace
-    for filename, code_content in workspace.items():
-        file_path = os.path.join(base_dir, filename)
+        result = SaveResult(path=base_dir, manifest={})
+        for filename, size, digest, written in staged:
+            result.manifest[filename] = {"size": size, "sha256": digest}
+            (result.written if written else result.unchanged).append(filename)
 
-        # This line gets the directory part of the path (e.g., "project_output/src" or creates if needed)
-        file_dir = os.path.dirname(file_path)
-        if file_dir:
-            os.makedirs(file_dir, exist_ok=True)
+        with open(os.path.join(staging, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(result.manifest, f, indent=2)
 
-        # 4. Write the code to the file
-        try:
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(code_content)
-            print(f"    > Created file: {file_path}")
-        except Exception as e:
-            print(f"    > ERROR saving {filename}: {e}")
+        generated = {
+            os.path.normpath(name).replace(os.sep, "/")
+            for name in [*previous, *workspace, MANIFEST_NAME, MANIFEST_LOG_NAME]
+        }
+        _carry_over(base_dir, staging, generated)
 
-    print("--- ✅ PROJECT SAVED ---")
+        _swap_dirs(staging, base_dir)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    logger.info(
+        "Saved %d files to %s (%d unchanged).", len(staged), base_dir, len(result.unchanged)
+    )
+    return result
+
+
+# -- Streaming mode --
+
+
+class WorkspaceStore:
+    """
+    Persists files one at a time, as soon as they are committed.
+    Every file is replaced atomically and gets one line in the manifest
+    log (the manifest itself is only rewritten by a full save), and files
+    with the same hash as in the manifest are skipped. Thread-safe.
+    """
+
+    def __init__(self, base_dir: str):
+        self.base_dir = os.path.abspath(base_dir)
+        self.manifest = load_manifest(self.base_dir)
+        self._lock = threading.Lock()
+
+    def save_file(self, filename: str, content: str) -> bool:
+        """Writes one file, returns False if it was unchanged."""
+        data = content.encode("utf-8")
+        digest = content_hash(data)
+        path = _safe_path(self.base_dir, filename)
+
+        with self._lock:
+            if _is_unchanged(self.manifest, filename, digest, path):
+                return False
+
+        _write_atomic(path, data)
+
+        entry = {"file": filename, "size": len(data), "sha256": digest}
+        with self._lock:
+            self.manifest[filename] = {"size": len(data), "sha256": digest}
+            with open(os.path.join(self.base_dir, MANIFEST_LOG_NAME), "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry) + "\n")
+        return True
+
+
+_stores: Dict[str, WorkspaceStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_workspace_store(base_dir: str) -> WorkspaceStore:
+    """The shared store for a directory (one per path, so writes share a lock)."""
+    base_dir = os.path.abspath(base_dir)
+    with _stores_lock:
+        if base_dir not in _stores:
+            _stores[base_dir] = WorkspaceStore(base_dir)
+        return _stores[base_dir]
+
+
+def get_output_dir(config) -> Optional[str]:
+    """
+    The directory committed files are streamed to: {"configurable":
+    {"output_dir": ...}} or AGENT_OUTPUT_DIR. None turns streaming off.
+    """
+    configured = ((config or {}).get("configurable") or {}).get("output_dir")
+    return configured or os.getenv("AGENT_OUTPUT_DIR") or None
@@ -0,0 +1,190 @@
+import os
+import re
+import ast
+from html.parser import HTMLParser
+from typing import Callable, Dict, List
+
+# The names a file defines or relies on, by kind:
+# {"ids": [...], "classes": [...], "selectors": [...], "functions": [...]}
+Symbols = Dict[str, List[str]]
+
+# An extractor takes the code of one file and returns its symbols.
+# It must be cheap (it runs on every commit) and never call an LLM.
+Extractor = Callable[[str], Symbols]
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+# Keep the index compact: names per kind, and characters in the prompt
+MAX_NAMES_PER_KIND = 40
+MAX_CONTEXT_CHARS = 2500
+
+NO_CONTEXT = "No other files have been written yet."
+
+
+def register_extractor(extension: str, extractor: Extractor):
+    """Registers (or replaces) the symbol extractor used for an extension like '.js'."""
+    EXTRACTORS[extension.lower()] = extractor
+
+
+def _unique(names) -> List[str]:
+    """Names in first-seen order, without duplicates, capped per kind."""
+    return list(dict.fromkeys(names))[:MAX_NAMES_PER_KIND]
+
+
+def extract_symbols(filename: str, code: str) -> Symbols:
+    """
+    Returns the symbols of a committed file (empty kinds are left out).
+    Files without an extractor, or that cannot be parsed, have none.
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None or not code:
+        return {}
+    try:
+        symbols = extractor(code)
+    except (SyntaxError, ValueError):
+        return {}
+    return {kind: _unique(names) for kind, names in symbols.items() if names}
+
+
+# --- HTML ---
+
+
+class _SymbolParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.ids = []
+        self.classes = []
+
+    def handle_starttag(self, tag, attrs):
+        for name, value in attrs:
+            if not value:
+                continue
+            if name == "id":
+                self.ids.append(value.strip())
+            elif name == "class":
+                self.classes.extend(value.split())
+
+
+def extract_html(code: str) -> Symbols:
+    """Element IDs and class names."""
+    parser = _SymbolParser()
+    parser.feed(code)
+    parser.close()
+    return {"ids": parser.ids, "classes": parser.classes}
+
+
+# --- CSS ---
+
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+# The selector list in front of each "{"
+_CSS_RULE = re.compile(r"([^{};]+)\{")
+# "#id" and ".class" inside a selector
+_SELECTOR_NAME = re.compile(r"([#.]-?[A-Za-z_][\w-]*)")
+
+
+def extract_css(code: str) -> Symbols:
+    """The ID and class selectors the stylesheet styles (e.g. "#app", ".btn")."""
+    code = _CSS_COMMENT.sub("", code)
+    selectors = []
+    for match in _CSS_RULE.finditer(code):
+        selector = match.group(1).strip()
+        if selector.startswith("@"):
+            continue  # @media, @keyframes, ...: the rules inside are matched on their own
+        selectors.extend(_SELECTOR_NAME.findall(selector))
+    return {"selectors": selectors}
+
+
+# --- JavaScript ---
+
+_JS_FUNCTIONS = [
+    # function name(...), async function name(...), export default function name(...)
+    re.compile(r"^\s*(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)", re.M),
+    # class Name
+    re.compile(r"^\s*(?:export\s+(?:default\s+)?)?class\s+([A-Za-z_$][\w$]*)", re.M),
+    # const name = (...) => / function (...) at the top level
+    re.compile(
+        r"^(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*"
+        r"(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)",
+        re.M,
+    ),
+    # export { a, b as c }
+    re.compile(r"^\s*export\s*\{([^}]*)\}", re.M),
+]
+_JS_IDS = re.compile(r"getElementById\(\s*['\"]([^'\"]+)['\"]")
+_JS_SELECTORS = re.compile(r"querySelector(?:All)?\(\s*['\"]([^'\"]+)['\"]")
+_JS_CLASS_LIST = re.compile(
+    r"classList\.(?:add|remove|toggle|contains)\(\s*['\"]([^'\"]+)['\"]"
+)
+
+
+def extract_javascript(code: str) -> Symbols:
+    """
+    Top-level and exported functions/classes, and the element IDs and
+    classes the script looks up (getElementById, querySelector, classList).
+    """
+    functions = []
+    for pattern in _JS_FUNCTIONS:
+        for match in pattern.findall(code):
+            # "a, b as c" from an export list
+            for name in match.split(","):
+                name = name.split(" as ")[-1].strip()
+                if name:
+                    functions.append(name)
+
+    ids = _JS_IDS.findall(code)
+    classes = _JS_CLASS_LIST.findall(code)
+    for selector in _JS_SELECTORS.findall(code):
+        for name in _SELECTOR_NAME.findall(selector):
+            (ids if name.startswith("#") else classes).append(name[1:])
+
+    return {"ids": ids, "classes": classes, "functions": functions}
+
+
+# --- Python ---
+
+
+def extract_python(code: str) -> Symbols:
+    """Top-level functions and classes."""
+    tree = ast.parse(code)
+    functions = [
+        node.name
+        for node in tree.body
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef))
+    ]
+    return {"functions": functions}
+
+
+register_extractor(".html", extract_html)
+register_extractor(".htm", extract_html)
+register_extractor(".css", extract_css)
+register_extractor(".js", extract_javascript)
+register_extractor(".mjs", extract_javascript)
+register_extractor(".py", extract_python)
+
+
+# --- Prompt context ---
+
+
+def format_project_context(symbol_index: Dict[str, Symbols], current_file: str = None) -> str:
+    """
+    Renders the symbols of the files written so far as a few compact
+    lines for the coder prompt, e.g.
+        index.html: ids: app, count | classes: btn
+        style.css: selectors: #app, .btn
+    The file being written is left out. Truncated at MAX_CONTEXT_CHARS.
+    """
+    lines = []
+    for filename, symbols in (symbol_index or {}).items():
+        if filename == current_file or not symbols:
+            continue
+        parts = [f"{kind}: {', '.join(names)}" for kind, names in symbols.items()]
+        lines.append(f"{filename}: {' | '.join(parts)}")
+
+    if not lines:
+        return NO_CONTEXT
+
+    context = "\n".join(lines)
+    if len(context) > MAX_CONTEXT_CHARS:
+        context = context[:MAX_CONTEXT_CHARS].rsplit("\n", 1)[0] + "\n..."
+    return context
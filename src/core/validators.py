@@ -0,0 +1,277 @@
+import os
+import ast
+import json
+from html.parser import HTMLParser
+from typing import Callable, Dict, List
+
+# A validator takes the code of one file and returns a list of *hard* errors
+# (the file is certainly broken). An empty list means "no obvious problems",
+# it does not mean the file implements its plan.
+Validator = Callable[[str], List[str]]
+
+VALIDATORS: Dict[str, Validator] = {}
+
+
+def register_validator(extension: str, validator: Validator):
+    """Registers (or replaces) the validator used for an extension like '.js'."""
+    VALIDATORS[extension.lower()] = validator
+
+
+def validate_code(filename: str, code: str) -> List[str]:
+    """
+    Runs the local checks for a file and returns its hard errors.
+    Files without a registered validator only get the empty-file check.
+    """
+    if not code or not code.strip():
+        return ["The file is empty."]
+
+    extension = os.path.splitext(filename)[1].lower()
+    validator = VALIDATORS.get(extension)
+    if validator is None:
+        return []
+    return validator(code)
+
+
+# --- HTML ---
+
+# Elements that never have a closing tag
+VOID_ELEMENTS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "source", "track", "wbr",
+}
+
+# Elements whose closing tag may be left out
+OPTIONAL_END_ELEMENTS = {
+    "html", "head", "body", "p", "li", "dt", "dd", "option", "optgroup",
+    "tr", "td", "th", "thead", "tbody", "tfoot", "colgroup", "caption",
+    "rb", "rt", "rp",
+}
+
+
+class _TagBalanceParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack = []
+        self.errors = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in VOID_ELEMENTS:
+            self.stack.append((tag, self.getpos()[0]))
+
+    def handle_endtag(self, tag):
+        if tag in VOID_ELEMENTS:
+            return
+        line = self.getpos()[0]
+
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            self.errors.append(f"Line {line}: closing </{tag}> has no matching <{tag}>.")
+            return
+
+        # Close everything opened after the matching tag
+        while True:
+            open_tag, open_line = self.stack.pop()
+            if open_tag == tag:
+                break
+            if open_tag not in OPTIONAL_END_ELEMENTS:
+                self.errors.append(
+                    f"Line {open_line}: <{open_tag}> is not closed before </{tag}> on line {line}."
+                )
+
+
+def validate_html(code: str) -> List[str]:
+    """Checks that every non-void element is closed in the right order."""
+    parser = _TagBalanceParser()
+    parser.feed(code)
+    parser.close()
+
+    errors = parser.errors
+    for tag, line in parser.stack:
+        if tag not in OPTIONAL_END_ELEMENTS:
+            errors.append(f"Line {line}: <{tag}> is never closed.")
+    return errors
+
+
+# --- JavaScript / CSS tokenizers ---
+
+BRACKET_PAIRS = {")": "(", "]": "[", "}": "{"}
+
+# After these, a "/" starts a regular expression rather than a division
+_REGEX_PREFIX_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_PREFIX_WORDS = {"return", "typeof", "case", "do", "else", "in", "of", "void", "yield", "await"}
+
+
+def _scan_brackets(code: str, javascript: bool) -> List[str]:
+    """
+    Walks the code once, skipping strings, comments, template literals and
+    (for JavaScript) regular expressions, and checks that (), [] and {}
+    are balanced. Returns the errors found.
+    """
+    errors = []
+    stack = []  # (bracket, line); "${" marks a template substitution
+    line = 1
+    i = 0
+    n = len(code)
+    last_significant = ""  # last non-space token, to tell regex from division
+    last_word = ""
+
+    def unterminated(what, start_line):
+        errors.append(f"Line {start_line}: unterminated {what}.")
+
+    while i < n:
+        ch = code[i]
+
+        if ch == "\n":
+            line += 1
+            i += 1
+            continue
+        if ch in " \t\r":
+            i += 1
+            continue
+
+        # Comments
+        if code.startswith("/*", i):
+            end = code.find("*/", i + 2)
+            if end == -1:
+                unterminated("comment", line)
+                return errors
+            line += code.count("\n", i, end)
+            i = end + 2
+            continue
+        if javascript and code.startswith("//", i):
+            end = code.find("\n", i)
+            i = n if end == -1 else end
+            continue
+
+        # Strings
+        if ch in "\"'":
+            start_line = line
+            i += 1
+            while i < n and code[i] != ch:
+                if code[i] == "\\":
+                    i += 1
+                elif code[i] == "\n":
+                    break
+                i += 1
+            if i >= n or code[i] != ch:
+                unterminated("string", start_line)
+                return errors
+            i += 1
+            last_significant, last_word = "a", ""
+            continue
+
+        # Template literals, resumed after each ${...}
+        if javascript and (ch == "`" or (ch == "}" and stack and stack[-1][0] == "${")):
+            start_line = line
+            if ch == "}":
+                stack.pop()
+            i += 1
+            while i < n and code[i] != "`" and not code.startswith("${", i):
+                if code[i] == "\\":
+                    i += 1
+                elif code[i] == "\n":
+                    line += 1
+                i += 1
+            if i >= n:
+                unterminated("template literal", start_line)
+                return errors
+            if code[i] == "`":
+                i += 1
+                last_significant, last_word = "a", ""
+            else:
+                stack.append(("${", line))
+                i += 2
+                last_significant, last_word = "{", ""
+            continue
+
+        # Regular expression literals
+        if javascript and ch == "/" and (
+            last_significant == "" or last_significant in _REGEX_PREFIX_CHARS
+            or last_word in _REGEX_PREFIX_WORDS
+        ):
+            start_line = line
+            i += 1
+            in_class = False
+            while i < n and (code[i] != "/" or in_class):
+                if code[i] == "\\":
+                    i += 1
+                elif code[i] == "[":
+                    in_class = True
+                elif code[i] == "]":
+                    in_class = False
+                elif code[i] == "\n":
+                    break
+                i += 1
+            if i >= n or code[i] != "/":
+                unterminated("regular expression", start_line)
+                return errors
+            i += 1
+            last_significant, last_word = "a", ""
+            continue
+
+        # A postfix ++/-- ends its operand, so a "/" after it is a division
+        if javascript and code.startswith(("++", "--"), i) and last_significant in ("a", ")", "]"):
+            i += 2
+            continue
+
+        # Brackets
+        if ch in "([{":
+            stack.append((ch, line))
+        elif ch in ")]}":
+            if not stack or stack[-1][0] != BRACKET_PAIRS[ch]:
+                errors.append(f"Line {line}: unexpected '{ch}'.")
+                return errors
+            stack.pop()
+
+        if ch.isalnum() or ch in "_$":
+            start = i
+            while i < n and (code[i].isalnum() or code[i] in "_$"):
+                i += 1
+            last_word = code[start:i]
+            last_significant = "a"
+            continue
+
+        last_significant, last_word = ch, ""
+        i += 1
+
+    for bracket, open_line in stack:
+        name = "template substitution '${'" if bracket == "${" else f"'{bracket}'"
+        errors.append(f"Line {open_line}: {name} is never closed.")
+    return errors
+
+
+def validate_javascript(code: str) -> List[str]:
+    """Checks strings, comments, regexes and brackets are all closed."""
+    return _scan_brackets(code, javascript=True)
+
+
+def validate_css(code: str) -> List[str]:
+    """Checks strings, comments, braces and parentheses are all closed."""
+    return _scan_brackets(code, javascript=False)
+
+
+# --- Python / JSON ---
+
+
+def validate_python(code: str) -> List[str]:
+    try:
+        ast.parse(code)
+    except SyntaxError as e:
+        return [f"Line {e.lineno}: {e.msg}."]
+    return []
+
+
+def validate_json(code: str) -> List[str]:
+    try:
+        json.loads(code)
+    except json.JSONDecodeError as e:
+        return [f"Line {e.lineno}: {e.msg}."]
+    return []
+
+
+register_validator(".html", validate_html)
+register_validator(".htm", validate_html)
+register_validator(".js", validate_javascript)
+register_validator(".mjs", validate_javascript)
+register_validator(".css", validate_css)
+register_validator(".py", validate_python)
+register_validator(".json", validate_json)
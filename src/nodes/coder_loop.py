@@ -1,33 +1,297 @@
-from langchain_core.runnables import Runnable
+import asyncio
+from contextlib import aclosing
+from typing import List, Optional, Tuple
+from langchain_core.runnables import Runnable, RunnableConfig
 from langchain_core.messages import HumanMessage
+from langgraph.config import get_stream_writer
 from agent.state import AgentState
 from agent.llm import get_coder_llm, get_critic_llm
-from core.prompts import CODER_PROMPT, CODER_CORRECTION_PROMPT, CRITIC_PROMPT
+from core.prompts import (
+    CODER_PROMPT,
+    CODER_CORRECTION_PROMPT,
+    CODER_PATCH_PROMPT,
+    CRITIC_PROMPT,
+    CRITIC_NOTED_PROMPT,
+    CRITIC_PARTIAL_PROMPT,
+)
+from core.patching import apply_search_replace, PatchError
+from core.prompt_budget import (
+    compact_correction_input,
+    expand_omitted_lines,
+    restore_omitted_lines,
+)
+from core.parsers import CriticVerdict
+from core.symbols import format_project_context
+from core.artifacts import get_text, put_text
+from core.async_utils import run_sync
+from agent.policy import get_critique_policy
+from core.log import get_logger
+from core.retry import is_throttling_error
 
+logger = get_logger(__name__)
 
-def run_code(state: AgentState) -> dict:
+# Speculative critic: draft sizes (in characters) at which the part
+# written so far is reviewed while the coder keeps writing
+SPECULATIVE_REVIEW_CHARS = (1500, 6000)
+
+
+class CodeFenceStripper:
+    """
+    Removes the Markdown code fences (```) that LLMs like to wrap code in,
+    working on a stream of chunks.
+
+    `feed()` returns only text that is guaranteed to be part of the final
+    code: the opening fence line is dropped once it is complete, and the
+    last line with content is held back in case it is the closing fence.
+    `finish()` returns whatever is left. The joined output is the same as
+    stripping the complete text in one go.
+    """
+
+    def __init__(self):
+        self._head = ""  # text seen before we know if there is an opening fence
+        self._pending = ""  # text that could still be the closing fence
+        self._in_body = False
+        self._fenced = False
+
+    def feed(self, chunk: str) -> str:
+        if not self._in_body:
+            self._head += chunk
+            head = self._head.lstrip()
+
+            if head.startswith("```"):
+                if "\n" not in head:
+                    return ""  # The fence line is not complete yet
+                self._fenced = True
+                body = head.split("\n", 1)[1]
+            elif len(head) >= 3 or (head and not "```".startswith(head)):
+                body = head
+            else:
+                return ""  # Could still turn out to be a fence
+
+            self._in_body = True
+            self._head = ""
+            chunk = body
+
+        self._pending += chunk
+
+        # Hold back the last line that has content, it may be the closing fence
+        last_content = len(self._pending.rstrip())
+        cut = self._pending.rfind("\n", 0, last_content)
+        if cut <= 0:
+            return ""
+
+        ready, self._pending = self._pending[:cut], self._pending[cut:]
+        return ready
+
+    def finish(self) -> str:
+        if not self._in_body:
+            # The whole response was shorter than a fence line
+            head = self._head.strip()
+            if head.startswith("```"):
+                return ""
+            return head
+
+        tail = self._pending.rstrip()
+        if self._fenced and tail.endswith("```") and "\n" in tail:
+            tail = tail.rsplit("\n", 1)[0]
+        return tail
+
+
+def strip_code_fences(text: str) -> str:
+    """Removes Markdown code fences from a complete LLM response."""
+    stripper = CodeFenceStripper()
+    return stripper.feed(text) + stripper.finish()
+
+
+def _emit_draft_delta(current_file: str, iteration: int, delta: str):
+    """
+    Sends a piece of the draft to whoever streams the graph with
+    stream_mode="custom". Does nothing outside of a graph run.
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        return
+    writer(
+        {
+            "coder_draft": {
+                "current_file": current_file,
+                "iteration": iteration,
+                "delta": delta,
+            }
+        }
+    )
+
+
+class SpeculativeReviewer:
+    """
+    Reviews a draft while it is still being written. Each time the draft
+    passes one of the 'thresholds' (in characters), the critic looks at
+    the part written so far in a background task. If it finds a blocking
+    problem (e.g. the wrong approach), `blocking_verdict()` returns it and
+    the coder stops generating, instead of finishing a draft that would
+    be thrown away. Everything else is left to the full critic.
+    """
+
+    def __init__(self, current_file: str, file_plan: str, thresholds=SPECULATIVE_REVIEW_CHARS):
+        self.current_file = current_file
+        self.file_plan = file_plan
+        self.thresholds = list(thresholds)
+        self.tasks: List[asyncio.Task] = []
+
+    def feed(self, parts: List[str], size: int):
+        """Called with the draft so far, starts a review when a threshold is passed."""
+        if not self.thresholds or size < self.thresholds[0]:
+            return
+        while self.thresholds and size >= self.thresholds[0]:
+            self.thresholds.pop(0)
+        self.tasks.append(asyncio.create_task(self._review("".join(parts))))
+
+    async def _review(self, partial_draft: str) -> Optional[CriticVerdict]:
+        chain = CRITIC_PARTIAL_PROMPT | get_critic_llm()
+        try:
+            return await chain.ainvoke(
+                {
+                    "current_file": self.current_file,
+                    "file_plan": self.file_plan,
+                    "current_code_draft": partial_draft,
+                }
+            )
+        except Exception as e:
+            # Only a shortcut: the full critic still reviews the finished draft
+            logger.warning("Speculative review of %s failed: %s", self.current_file, e)
+            return None
+
+    def blocking_verdict(self) -> Optional[CriticVerdict]:
+        """The first finished review that found a blocking problem, if any."""
+        for task in self.tasks:
+            if not task.done() or task.cancelled():
+                continue
+            verdict = task.result()
+            if verdict is not None and not verdict.passed and verdict.severity == "blocking":
+                return verdict
+        return None
+
+    def cancel(self):
+        """Drops the reviews still running (the draft is done or abandoned)."""
+        for task in self.tasks:
+            task.cancel()
+
+
+async def _stream_draft(
+    chain: Runnable,
+    prompt_input: dict,
+    current_file: str,
+    iteration: int,
+    reviewer: SpeculativeReviewer = None,
+    emit: bool = True,
+) -> Tuple[str, bool]:
+    """
+    Streams a complete draft from the chain so it can be shown while it is
+    written (unless 'emit' is False). Markdown fences are removed chunk
+    by chunk.
+    With a 'reviewer', generation stops as soon as one of its reviews
+    finds a blocking problem, and the partial draft is returned.
+    Returns the draft and whether it was stopped before the end.
+    """
+    stripper = CodeFenceStripper()
+    parts = []
+    size = 0
+
+    async with aclosing(chain.astream(prompt_input)) as stream:
+        async for chunk in stream:
+            delta = stripper.feed(chunk.content)
+            if delta:
+                parts.append(delta)
+                size += len(delta)
+                if emit:
+                    _emit_draft_delta(current_file, iteration, delta)
+                if reviewer is not None:
+                    reviewer.feed(parts, size)
+            if reviewer is not None and reviewer.blocking_verdict() is not None:
+                # Closing the stream stops the generation
+                return "".join(parts), True
+
+    delta = stripper.finish()
+    if delta:
+        parts.append(delta)
+        if emit:
+            _emit_draft_delta(current_file, iteration, delta)
+
+    return "".join(parts), False
+
+
+async def _patch_draft(code_llm: Runnable, prompt_input: dict, draft: str) -> str:
+    """
+    Asks the LLM only for SEARCH/REPLACE edits and applies them locally to
+    the current (full) draft. Raises PatchError if the edits do not apply.
+    """
+    chain = CODER_PATCH_PROMPT | code_llm
+    response = await chain.ainvoke(prompt_input)
+    return apply_search_replace(draft, response.content)
+
+
+def _compact_input(prompt_input: dict, mode: str, model_name: str) -> Tuple[dict, bool]:
+    """
+    The correction prompt's input, fitted into the model's token budget,
+    and whether parts of the draft were left out.
+    """
+    compacted, report = compact_correction_input(prompt_input, mode, model_name)
+    if report["tokens_after"] < report["tokens_before"]:
+        logger.info(
+            "Correction prompt (%s) for %s: %d -> %d tokens%s%s.",
+            mode,
+            prompt_input["current_file"],
+            report["tokens_before"],
+            report["tokens_after"],
+            ", plan summarized" if report["plan_compacted"] else "",
+            ", draft trimmed to the critiqued parts" if report["draft_elided"] else "",
+        )
+    return compacted, report["draft_elided"]
+
+
+async def arun_code(state: AgentState, config: RunnableConfig = None) -> dict:
     """
     Runs the coder node.
 
     This node writes code for the 'current_file' based on its plan.
     It will either write a first draft or correct a previous,
     critiqued draft.
+
+    With {"configurable": {"correction_mode": "patch"}} corrections are
+    asked for as SEARCH/REPLACE edits instead of a whole new file, falling
+    back to a full rewrite if the edits do not apply.
+
+    Correction prompts are fitted into a token budget first (see
+    core/prompt_budget.py): long plans are summarized, and only the parts
+    of the draft the critique refers to are sent when they are enough.
+
+    With {"configurable": {"speculative_critic": True}} long drafts are
+    reviewed while they stream (see `SpeculativeReviewer`). A draft with
+    a blocking problem is cut short and returned with that critique, and
+    the graph sends it straight back to the coder. A draft that was
+    finished before such a review came back goes through the normal
+    checks, and the critic is shown the partial critique. The last
+    iteration of a file's budget is always written to the end.
     """
-    logs = state.get("logs", [])
+    logs = []
 
     # Get the state components
     current_file = state["current_file"]
-    file_plan = state["file_plans"][current_file]
+    # Plans and drafts are artifact refs in the state
+    file_plan = get_text(state["file_plans"][current_file])
     critique = state.get("critique")
-    current_code_draft = state.get("current_code_draft")
-    current_code_draft = state["current_code_draft"]
+    current_code_draft = get_text(state.get("current_code_draft"))
 
     # Get teh LLM and prompt
     code_llm: Runnable = get_coder_llm()
 
     if critique:
         # We are in a correction loop
-        print(f"    > Correcting code for {current_file} based on critique...")
+        logger.info("Correcting code for %s based on critique...", current_file)
+        logs.append(
+            f"🔁 Revisions needed for **{current_file}**. Sending back to coder."
+        )
         logs.append(f"✍️ Fixing code for **{current_file}** based on critique...")
         prompt = CODER_CORRECTION_PROMPT
         prompt_input = {
@@ -38,61 +302,170 @@ def run_code(state: AgentState) -> dict:
         }
     else:
         # This is the first draft
-        print(f"    > Writing first draft for {current_file}...")
+        logger.info("Writing first draft for %s...", current_file)
         logs.append(f"🆕 Writing first draft for **{current_file}**...")
         prompt = CODER_PROMPT
-        prompt_input = {"current_file": current_file, "file_plan": file_plan}
+        prompt_input = {
+            "current_file": current_file,
+            "file_plan": file_plan,
+            "project_context": format_project_context(
+                state.get("symbol_index"), current_file
+            ),
+        }
 
     # Create the chain for this node
     chain = prompt | code_llm
 
+    iteration = state["coder_iterations"] + 1
+    configurable = (config or {}).get("configurable", {})
+    correction_mode = configurable.get("correction_mode", "full")
+    model_name = getattr(code_llm, "model_name", None)
+
+    reviewer = None
+    budget = get_critique_policy(config).max_iterations(current_file, current_code_draft)
+    if configurable.get("speculative_critic") and iteration < budget:
+        reviewer = SpeculativeReviewer(current_file, file_plan)
+
     try:
-        # Invoke the chain which gives an AI message, extract its content
-        response = chain.invoke(prompt_input)
-        new_code_draft = response.content.strip()
+        new_code_draft = None
+        stopped_early = False
+
+        # A draft that was stopped early is incomplete, so it is rewritten
+        if critique and correction_mode == "patch" and not state.get("draft_stopped_early"):
+            try:
+                patch_input, _ = _compact_input(prompt_input, "patch", model_name)
+                new_code_draft = await _patch_draft(code_llm, patch_input, current_code_draft)
+                logs.append(f"🩹 Applied a patch to **{current_file}**.")
+                _emit_draft_delta(current_file, iteration, new_code_draft)
+            except PatchError as e:
+                logger.info("Patch for %s did not apply: %s", current_file, e)
+                logs.append(
+                    f"↩️ Patch did not apply to **{current_file}**. Rewriting the full file..."
+                )
+
+        if new_code_draft is None:
+            full_input, elided = prompt_input, False
+            if critique:
+                full_input, elided = _compact_input(prompt_input, "full", model_name)
+            try:
+                # A trimmed draft is shown once its marker lines are filled in
+                new_code_draft, stopped_early = await _stream_draft(
+                    chain, full_input, current_file, iteration, reviewer, emit=not elided
+                )
+            finally:
+                if reviewer is not None:
+                    reviewer.cancel()
+
+            if elided and stopped_early:
+                # Incomplete anyway, it is rewritten in full
+                new_code_draft = expand_omitted_lines(new_code_draft, current_code_draft)
+                _emit_draft_delta(current_file, iteration, new_code_draft)
+            elif elided:
+                # Lines left out of the prompt were copied as marker lines
+                restored = restore_omitted_lines(
+                    new_code_draft, current_code_draft, full_input["current_code_draft"]
+                )
+                if restored is not None:
+                    new_code_draft = restored
+                    _emit_draft_delta(current_file, iteration, new_code_draft)
+                else:
+                    logger.info(
+                        "Rewrite of %s did not keep the omitted lines, retrying with the whole draft.",
+                        current_file,
+                    )
+                    logs.append(
+                        f"↩️ The rewrite of **{current_file}** lost lines it was not shown. "
+                        "Rewriting it from the whole draft..."
+                    )
+                    new_code_draft, _ = await _stream_draft(
+                        chain, prompt_input, current_file, iteration
+                    )
 
-        # Clean up any markdown formatting
-        if new_code_draft.startswith("```"):
-            new_code_draft = new_code_draft.split("\n", 1)[1]
-            if new_code_draft.endswith("```"):
-                new_code_draft = new_code_draft.rsplit("\n", 1)[0]
+        # A review that found a blocking problem, possibly only after the draft was finished
+        verdict = reviewer.blocking_verdict() if reviewer is not None else None
+        partial_critique = None
+        if verdict is not None:
+            partial_critique = "\n".join(f"- {issue}" for issue in verdict.issues)
+            if not partial_critique:
+                partial_critique = "- The draft does not follow the plan."
+
+        if stopped_early:
+            logger.info(
+                "Stopped %s after %d chars: blocking issues found early.",
+                current_file,
+                len(new_code_draft),
+            )
+            logs.append(
+                f"⏹️ Stopped writing **{current_file}** early ({len(new_code_draft)} chars), "
+                f"the partial review found blocking issues:\n{partial_critique}"
+            )
+            return {
+                "current_code_draft": put_text(new_code_draft),
+                "coder_iterations": iteration,
+                "critique": partial_critique,
+                "critique_severity": "blocking",
+                "partial_critique": None,
+                "draft_stopped_early": True,
+                "logs": logs,
+            }
 
         logs.append(f"✅ Code draft for **{current_file}** generated.")
 
         # Return
         return {
-            "current_code_draft": new_code_draft,
-            "coder_iterations": state["coder_iterations"] + 1,
+            "current_code_draft": put_text(new_code_draft),
+            "coder_iterations": iteration,
             "critique": None,  # Clear the critique after using it
+            "critique_severity": None,
+            # The draft was finished before a partial review found a blocking
+            # problem: the full critic checks whether it is still there
+            "partial_critique": partial_critique,
+            "draft_stopped_early": False,
             "logs": logs,
         }
     except Exception as e:
+        if is_throttling_error(e):
+            # Still throttled after the retries: stop here, the run can be resumed
+            raise
         logs.append(f"❌ Error in coder: {str(e)}")
-        print(f"    > ERROR in Coder: {e}")
-        return {"logs": logs}
+        logger.error("Error in coder for %s: %s", current_file, e, exc_info=True)
+        return {"draft_stopped_early": False, "logs": logs}
 
 
-def run_critic(state: AgentState) -> dict:
+def route_coder(state: AgentState) -> str:
+    """Conditional edge after the coder: a draft stopped early goes straight back."""
+    if state.get("draft_stopped_early"):
+        return "retry_coder"
+    return "review"
+
+
+def run_code(state: AgentState, config: RunnableConfig = None) -> dict:
+    """
+    Sync version of `arun_code`.
+    """
+    return run_sync(arun_code(state, config))
+
+
+async def arun_critic(state: AgentState) -> dict:
     """
     Runs the critic node.
 
-    This node reviews the 'current_code_draft' against the 'file_plan'
-    and either responds with "PERFECT" or a critique.
+    This node reviews the 'current_code_draft' against the 'file_plan'.
+    It sets the critique to "PERFECT", or to the list of issues found
+    together with their severity. Issues a speculative review found in
+    the draft's beginning are shown to it as well.
     """
-    print(f"--- 3b. RUNNING CRITIC ---")
-    logs = state.get("logs", [])
+    logger.debug("Running critic")
+    logs = []
 
     # Get the necessary state components
     current_file = state["current_file"]
-    file_plan = state["file_plans"][current_file]
-    current_code_draft = state["current_code_draft"]
+    file_plan = get_text(state["file_plans"][current_file])
+    current_code_draft = get_text(state["current_code_draft"])
 
     # Get the critic llm
     critic_llm: Runnable = get_critic_llm()
 
-    # Create the chain for this node
-    chain = CRITIC_PROMPT | critic_llm
-
     # Prepare the input for the prompt
     prompt_input = {
         "current_file": current_file,
@@ -100,21 +473,50 @@ def run_critic(state: AgentState) -> dict:
         "current_code_draft": current_code_draft,
     }
 
+    # Create the chain for this node
+    partial_critique = state.get("partial_critique")
+    if partial_critique:
+        chain = CRITIC_NOTED_PROMPT | critic_llm
+        prompt_input["partial_critique"] = partial_critique
+    else:
+        chain = CRITIC_PROMPT | critic_llm
+
     try:
         # Invoke the chain
-        response = chain.invoke(prompt_input)
-        critique_text = response.content.strip()
+        verdict: CriticVerdict = await chain.ainvoke(prompt_input)
 
-        if "PERFECT" in critique_text.upper():
+        if verdict.passed or verdict.severity == "none":
             logs.append(f"✅ {current_file} passed review with **PERFECT**.")
-            print(f"    > Critique for {current_file}: PERFECT")
-            return {"critique": "PERFECT", "logs": logs}
+            logger.info("Critique for %s: PERFECT", current_file)
+            return {"critique": "PERFECT", "critique_severity": "none", "logs": logs}
         else:
-            logs.append(f"🛠 Found issues in **{current_file}**:\n{critique_text}")
-            print(f"    > Critique for {current_file}: \n{critique_text}")
-            return {"critique": critique_text, "logs": logs}
+            critique_text = "\n".join(f"- {issue}" for issue in verdict.issues)
+            if not critique_text:
+                critique_text = "- The draft does not fully implement the plan."
+            logs.append(
+                f"🛠 Found {verdict.severity} issues in **{current_file}**:\n{critique_text}"
+            )
+            logger.info(
+                "Critique for %s: %d %s issues", current_file, len(verdict.issues), verdict.severity
+            )
+            logger.debug("Critique for %s:\n%s", current_file, critique_text)
+            return {
+                "critique": critique_text,
+                "critique_severity": verdict.severity,
+                "logs": logs,
+            }
 
     except Exception as e:
+        if is_throttling_error(e):
+            # Still throttled after the retries: stop here, the run can be resumed
+            raise
         logs.append(f"❌ Error in critic: {str(e)}")
-        print(f"    > ERROR in Critic: {e}")
+        logger.error("Error in critic for %s: %s", current_file, e, exc_info=True)
         return {"logs": logs}
+
+
+def run_critic(state: AgentState) -> dict:
+    """
+    Sync version of `arun_critic`.
+    """
+    return run_sync(arun_critic(state))
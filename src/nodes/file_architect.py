@@ -1,41 +1,85 @@
 from langchain_core.runnables import Runnable
+from langgraph.types import Overwrite
 from agent.state import AgentState
 from agent.llm import get_file_architect_llm
 from core.prompts import ARCHITECT_PROMPT
-from core.parsers import FilePlans
-from langchain_core.messages import AIMessage
+from core.async_utils import run_sync
+from core.log import get_logger
+from core.retry import is_throttling_error
+from core.dependencies import plan_file_order, format_waves
+from core.artifacts import put_texts
+from core.json_stream import JSONObjectStream
+from nodes.plan_memo import remember_plan
 import json
+import asyncio
 
+logger = get_logger(__name__)
 
-def clean_json_response(raw_text: str) -> str:
+
+def plan_text(value) -> str:
+    """A plan as one block of text, even if the LLM sent a list of steps."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return " ".join(str(step) for step in value)
+    return json.dumps(value)
+
+
+async def stream_file_plans(chain: Runnable, prompt_input: dict, on_plan=None, config=None):
     """
-    Cleans the LLM's raw text output to extract just the JSON.
+    Streams the architect's JSON and parses it as it arrives (see
+    core/json_stream.py). Every complete plan is passed to
+    on_plan(filename, plans so far) right away.
+    Returns (plans, repairs made to the JSON).
     """
-    # Remove markdown backticks
-    if raw_text.startswith("```json"):
-        raw_text = raw_text[7:]
-    if raw_text.startswith("```"):
-        raw_text = raw_text[3:]
-    if raw_text.endswith("```"):
-        raw_text = raw_text[:-3]
+    stream = JSONObjectStream()
+    plans = {}
 
-    # Find the first '{' and the last '}'
-    start_index = raw_text.find("{")
-    end_index = raw_text.rfind("}")
+    def add(pairs):
+        for key, value in pairs:
+            filename = str(key).strip().lower()
+            plans[filename] = plan_text(value)
+            if on_plan is not None:
+                on_plan(filename, plans)
 
-    if start_index == -1 or end_index == -1:
-        raise ValueError("No valid JSON object found in the LLM response.")
+    async for chunk in chain.astream(prompt_input, config):
+        add(stream.feed(chunk.content))
+    add(stream.finish())
+    return plans, stream.repairs
 
-    return raw_text[start_index : end_index + 1]
 
+def start_coding(file_plans: dict, file_structure: list, logs: list) -> dict:
+    """
+    The state update that hands finished file plans to the coder loop.
+    Files are queued so they are coded after the files they refer to.
+    """
+    dependencies, waves = plan_file_order(file_plans, file_structure)
+    logger.debug("File dependencies: %s", dependencies)
+    logs.append(f"🧭 Coding order: {format_waves(waves)}")
+    logs.append(f"✅ Ready to start coding phase.")
+
+    return {
+        # The state keeps refs, the plans themselves go to the artifact store
+        "file_plans": put_texts(file_plans),
+        "file_dependencies": dependencies,
+        "files_to_code_queue": Overwrite([f for wave in waves for f in wave]),
+        "workspace": {},
+        "current_file": None,
+        "current_code_draft": None,
+        "critique": None,
+        "coder_iterations": 0,
+        "logs": logs,
+    }
 
-def run_file_architect(state: AgentState) -> dict:
+
+async def arun_file_architect(state: AgentState, on_plan=None) -> dict:
     """
-    Runs the file architect node with manual JSON parsing.
+    Runs the file architect node, parsing its JSON while it streams.
+    on_plan(filename, plans so far) is called for every plan as soon as
+    it is complete, e.g. to start coding it early.
     """
 
-    logs = state.get("logs", [])
-    logs.append("✅ Starting File Architecture Phase...")
+    logs = ["✅ Starting File Architecture Phase..."]
 
     # ... (Get state components, llm, chain, prompt_input ) ...
     project_description = state["project_description"]
@@ -51,49 +95,58 @@ def run_file_architect(state: AgentState) -> dict:
     }
 
     try:
-        # 1. Invoke the chain, get raw AIMessage
-        response: AIMessage = chain.invoke(prompt_input)
-        raw_response_text = response.content
+        # 1. Stream the response, parsing each file plan as it completes
+        file_plans, repairs = await stream_file_plans(chain, prompt_input, on_plan)
+        if not file_plans:
+            # Ask once more, past the response cache
+            logger.warning("No plans in the architect output (%s), retrying.", repairs)
+            logs.append("🔁 Architect output had no usable plans. Asking again...")
+            file_plans, repairs = await stream_file_plans(
+                chain, prompt_input, on_plan, {"configurable": {"bypass_llm_cache": True}}
+            )
         logs.append("✅ Received response from architect LLM.")
 
-        # 2. Clean the raw text to get JSON
-        print(f"    > LLM Raw Output: {raw_response_text[:100]}...")
-        json_text = clean_json_response(raw_response_text)
-
-        # 3. Manually parse the JSON string to get the dictionary
-        file_plans = json.loads(json_text)
-
-        # 4. Check
+        # 2. Check
         if not file_plans:
             raise ValueError("LLM generated empty plans.")
+        if repairs:
+            logger.warning("Repaired architect output: %s", ", ".join(repairs))
+            logs.append(f"🩹 Repaired the architect output ({', '.join(repairs)}).")
 
-        # 5. Sanitize the dictionary keys
-        sanitized_file_plans = {k.strip().lower(): v for k, v in file_plans.items()}
+        # 3. Files the architect forgot still get a plan
+        missing = [f for f in file_structure if f not in file_plans]
+        for filename in missing:
+            file_plans[filename] = f"Implement {filename} for this project: {project_description}"
+        if missing:
+            logs.append(f"⚠️ No plan for {', '.join(missing)}. Using the project description.")
 
-        print(f"    > Generated {len(sanitized_file_plans)} file plans.")
-        print(f"    > Architect plans keys: {list(sanitized_file_plans.keys())}")
+        logger.info("Generated %d file plans.", len(file_plans))
+        logger.debug("Architect plans keys: %s", list(file_plans))
 
-        logs.append(f"📁 File plans generated: {len(sanitized_file_plans)} files.")
-        logs.append(f"✅ Ready to start coding phase.")
+        logs.append(f"📁 File plans generated: {len(file_plans)} files.")
 
-        # 6. PREPARE the state for the Coder Loop
-        return {
-            "file_plans": sanitized_file_plans,
-            "files_to_code_queue": file_structure,
-            "workspace": {},
-            "current_file": None,
-            "current_code_draft": None,
-            "critique": None,
-            "coder_iterations": 0,
-            "logs": logs,
-        }
+        # 4. Similar requests can reuse this plan (see core/plan_memo.py)
+        await asyncio.to_thread(remember_plan, state, file_plans)
+
+        # 5. PREPARE the state for the Coder Loop
+        return start_coding(file_plans, file_structure, logs)
 
     except Exception as e:
+        if is_throttling_error(e):
+            # Still throttled after the retries: stop here, the run can be resumed
+            raise
         logs.append(f"❌ Error in File Architect: {str(e)}")
-        print(f"    > ERROR in File Architect: {e}")
+        logger.error("Error in file architect: %s", e, exc_info=True)
         return {"logs": logs}
 
 
+def run_file_architect(state: AgentState) -> dict:
+    """
+    Sync version of `arun_file_architect`.
+    """
+    return run_sync(arun_file_architect(state))
+
+
 # test
 if __name__ == "__main__":
     test_state = {
@@ -0,0 +1,86 @@
+import asyncio
+from langchain_core.runnables import Runnable
+from agent.state import AgentState
+from agent.llm import get_fused_planner_llm
+from core.prompts import FUSED_PLANNER_PROMPT
+from core.parsers import ProjectBlueprint
+from core.async_utils import run_sync
+from core.log import get_logger
+from core.retry import is_throttling_error
+from nodes.file_architect import start_coding
+from nodes.plan_memo import remember_plan
+
+logger = get_logger(__name__)
+
+
+def blueprint_file_plans(blueprint: ProjectBlueprint, file_structure: list) -> dict:
+    """
+    The blueprint's file plans as {filename: plan}, with the same key
+    sanitizing as the architect. Raises ValueError unless every planned
+    file got a non-empty plan.
+    """
+    file_plans = {
+        item.filename.strip().lower(): item.plan.strip()
+        for item in blueprint.file_plans
+        if item.plan.strip()
+    }
+    missing = [f for f in file_structure if f not in file_plans]
+    if not file_structure or missing:
+        raise ValueError(f"no plan for {', '.join(missing) or 'any file'}")
+    return {f: file_plans[f] for f in file_structure}
+
+
+async def arun_fused_planner(state: AgentState) -> dict:
+    """
+    Plans the project and every file in one structured LLM call (instead
+    of the project planner + file architect round trips).
+    On any error or an incomplete blueprint it returns no plans, and the
+    graph falls back to the two-stage path (see `route_fused_planner`).
+    """
+    logs = ["✅ Starting Project Planning (single call)..."]
+
+    planner_llm: Runnable = get_fused_planner_llm()
+    chain = FUSED_PLANNER_PROMPT | planner_llm
+
+    try:
+        blueprint: ProjectBlueprint = await chain.ainvoke({"query": state["query"]})
+
+        file_structure = [f.strip().lower() for f in blueprint.file_structure]
+        file_plans = blueprint_file_plans(blueprint, file_structure)
+
+        logger.info("Planned %s with %d files.", blueprint.project_title, len(file_structure))
+        logs.append(f"✅ Project Title: {blueprint.project_title}")
+        logs.append(f"📁 Files Generated: {', '.join(file_structure)}")
+        logs.append(f"📁 File plans generated: {len(file_plans)} files.")
+
+        plan = {
+            "project_title": blueprint.project_title,
+            "project_description": blueprint.project_description,
+            "tech_stack": blueprint.tech_stack,
+            "file_structure": file_structure,
+        }
+        await asyncio.to_thread(remember_plan, {**state, **plan}, file_plans)
+
+        return {**plan, **start_coding(file_plans, file_structure, logs)}
+
+    except Exception as e:
+        if is_throttling_error(e):
+            # Still throttled after the retries: stop here, the run can be resumed
+            raise
+        logger.warning("Single-call planning failed, using two stages: %s", e)
+        logs.append(f"⚠️ Single-call planning failed ({e}). Planning in two steps instead...")
+        return {"logs": logs}
+
+
+def run_fused_planner(state: AgentState) -> dict:
+    """
+    Sync version of `arun_fused_planner`.
+    """
+    return run_sync(arun_fused_planner(state))
+
+
+def route_fused_planner(state: AgentState) -> str:
+    """Conditional edge: start coding with the plans, or fall back to two stages."""
+    if state.get("file_plans"):
+        return "code"
+    return "fallback"
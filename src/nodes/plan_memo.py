@@ -0,0 +1,79 @@
+import sqlite3
+from langchain_core.runnables import RunnableConfig
+from langgraph.types import Overwrite
+from agent.state import AgentState
+from core.plan_memo import get_plan_memo, is_plan_memo_enabled
+from core.dependencies import plan_file_order, format_waves
+from core.artifacts import put_texts
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# The state fields a plan consists of (planner output + file plans)
+PLAN_FIELDS = ["project_title", "project_description", "tech_stack", "file_structure", "file_plans"]
+
+
+def reuse_plans_enabled(config: RunnableConfig = None) -> bool:
+    """{"configurable": {"reuse_plans": False}} or PLAN_CACHE_DISABLED=1 turn reuse off."""
+    configurable = (config or {}).get("configurable") or {}
+    return configurable.get("reuse_plans", True) is not False and is_plan_memo_enabled()
+
+
+def remember_plan(state: AgentState, file_plans: dict):
+    """Stores the finished plan of the run's query. Never fails the run."""
+    if not is_plan_memo_enabled():
+        return
+    plan = {field: state.get(field) for field in PLAN_FIELDS}
+    plan["file_plans"] = file_plans
+    try:
+        get_plan_memo().remember(state["query"], plan)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Could not remember the plan: %s", e)
+
+
+def run_plan_lookup(state: AgentState, config: RunnableConfig) -> dict:
+    """
+    Looks for the plan of a similar earlier request. On a hit, the state
+    gets the complete plan and the planner and architect are skipped
+    (see `route_plan_lookup`). Returns no updates on a miss.
+    """
+    if not reuse_plans_enabled(config):
+        return {}
+    try:
+        match = get_plan_memo().lookup(state["query"])
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Plan lookup failed: %s", e)
+        return {}
+    if match is None:
+        logger.debug("No similar plan found.")
+        return {}
+
+    plan = match["plan"]
+    file_plans = plan.get("file_plans") or {}
+    file_structure = plan.get("file_structure") or list(file_plans)
+    dependencies, waves = plan_file_order(file_plans, file_structure)
+
+    logger.info(
+        "Reusing the plan of %r (similarity %.2f).", match["query"], match["similarity"]
+    )
+    return {
+        **{field: plan.get(field) for field in PLAN_FIELDS},
+        "file_plans": put_texts(file_plans),
+        "file_structure": file_structure,
+        "file_dependencies": dependencies,
+        "files_to_code_queue": Overwrite([f for wave in waves for f in wave]),
+        "logs": [
+            f"♻️ Reusing the plan of a similar request: \"{match['query']}\" "
+            f"(similarity {match['similarity']:.2f}).",
+            f"✅ Project Title: {plan.get('project_title')}",
+            f"📁 File plans loaded: {len(file_plans)} files.",
+            f"🧭 Coding order: {format_waves(waves)}",
+        ],
+    }
+
+
+def route_plan_lookup(state: AgentState) -> str:
+    """Conditional edge after the lookup: start coding on a hit, plan otherwise."""
+    if state.get("file_plans"):
+        return "code"
+    return "plan"
@@ -3,21 +3,24 @@ from agent.state import AgentState
 from agent.llm import get_project_planner_llm
 from core.prompts import PLANNER_PROMPT
 from core.parsers import ProjectPlan
+from core.async_utils import run_sync
+from core.log import get_logger
+from core.retry import is_throttling_error
 
+logger = get_logger(__name__)
 
-def run_project_planner(state: AgentState) -> dict:
+
+async def arun_project_planner(state: AgentState) -> dict:
     """
     This node takes the initial user query and generates the high-level
     project plan (title, description, tech stack, file structure).
     """
 
-    # Get existing global logs or start new list
-    logs = state.get("logs", [])
-    logs.append("✅ Starting Project Planning...")
+    # Only new log entries are returned, they are appended to the global logs
+    logs = ["✅ Starting Project Planning..."]
 
     # Get the necessary state component
     query = state["query"]
-    logs.append("✅ Starting Project Planning...")
 
     # Get the structured LLM
     planner_llm: Runnable = get_project_planner_llm()
@@ -28,13 +31,16 @@ def run_project_planner(state: AgentState) -> dict:
     # Invoke the chain
 
     try:
-        plan_output: ProjectPlan = chain.invoke({"query": query})
+        plan_output: ProjectPlan = await chain.ainvoke({"query": query})
 
         # Sanitize the output file structure
         sanitized_file_structure = [
             f.strip().lower() for f in plan_output.file_structure
         ]
 
+        logger.info(
+            "Planned %s with %d files.", plan_output.project_title, len(sanitized_file_structure)
+        )
         logs.append(f"✅ Project Title: {plan_output.project_title}")
         logs.append(f"📁 Files Generated: {', '.join(sanitized_file_structure)}")
 
@@ -47,10 +53,21 @@ def run_project_planner(state: AgentState) -> dict:
             "logs": logs,
         }
     except Exception as e:
+        if is_throttling_error(e):
+            # Still throttled after the retries: stop here, the run can be resumed
+            raise
+        logger.error("Error while planning: %s", e, exc_info=True)
         logs.append(f"❌ Error while planning: {str(e)}")
         return {"logs": logs}
 
 
+def run_project_planner(state: AgentState) -> dict:
+    """
+    Sync version of `arun_project_planner`.
+    """
+    return run_sync(arun_project_planner(state))
+
+
 # TEST
 if __name__ == "__main__":
     test_state = {"query": "build me a simple to-do list app"}
@@ -0,0 +1,81 @@
+import os
+import threading
+from agent.state import AgentState
+from core.validators import validate_code
+from core.artifacts import get_text
+from core.log import get_logger
+
+logger = get_logger(__name__)
+
+# Files where passing the local checks is all the review they need
+# (there is no behaviour for the LLM critic to judge).
+SKIP_LLM_CRITIC_EXTENSIONS = {".json", ".md", ".txt"}
+
+# Counters for how often the LLM critic is consulted or skipped
+_stats_lock = threading.Lock()
+_stats = {
+    "checked": 0,
+    "failed": 0,
+    "llm_critic_consulted": 0,
+    "llm_critic_skipped": 0,
+}
+
+
+def _count(*names: str):
+    with _stats_lock:
+        for name in names:
+            _stats[name] += 1
+
+
+def get_static_check_stats() -> dict:
+    """
+    Returns the static check counters, including the share of drafts that
+    never reached the LLM critic.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["llm_critic_skip_rate"] = (
+        stats["llm_critic_skipped"] / stats["checked"] if stats["checked"] else 0.0
+    )
+    return stats
+
+
+def run_static_check(state: AgentState) -> dict:
+    """
+    Runs the static check node.
+
+    Validates the 'current_code_draft' locally (HTML tag balance,
+    JS/CSS tokenizer, Python/JSON parsing) before the LLM critic sees it.
+    - Hard errors become the critique, so the draft goes straight back
+      to the coder without an LLM call.
+    - Clean drafts go on to the LLM critic, except for file types that need
+      no further review, which are marked "PERFECT" right away.
+    """
+    current_file = state["current_file"]
+    errors = validate_code(current_file, get_text(state.get("current_code_draft")))
+
+    if errors:
+        _count("checked", "failed", "llm_critic_skipped")
+        logger.info("Static checks failed for %s: %s", current_file, errors)
+        critique = "Automatic checks found these errors, fix them:\n" + "\n".join(
+            f"- {error}" for error in errors
+        )
+        return {
+            "critique": critique,
+            "critique_severity": "blocking",
+            "logs": [f"🧪 Automatic checks failed for **{current_file}**:\n{critique}"],
+        }
+
+    extension = os.path.splitext(current_file)[1].lower()
+    if extension in SKIP_LLM_CRITIC_EXTENSIONS:
+        _count("checked", "llm_critic_skipped")
+        logger.debug("Static checks passed for %s. Skipping LLM critic.", current_file)
+        return {
+            "critique": "PERFECT",
+            "critique_severity": "none",
+            "logs": [f"🧪 **{current_file}** passed automatic checks. No review needed."],
+        }
+
+    _count("checked", "llm_critic_consulted")
+    logger.debug("Static checks passed for %s.", current_file)
+    return {"logs": [f"🧪 **{current_file}** passed automatic checks."]}
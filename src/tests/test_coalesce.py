@@ -0,0 +1,88 @@
+import asyncio
+
+from agent.coalesce import RunCoalescer
+
+
+class Source:
+    """An event stream that yields its events one by one, on demand."""
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.started = 0
+        self.cancelled = False
+
+    def start(self):
+        self.started += 1
+        return self.events()
+
+    async def events(self):
+        try:
+            while True:
+                event = await self.queue.get()
+                if event is None:
+                    return
+                yield event
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+
+
+def test_a_late_subscriber_gets_the_history_then_live_events():
+    async def scenario():
+        coalescer = RunCoalescer()
+        source = Source()
+
+        first = coalescer.astream("key", source.start)
+        source.queue.put_nowait({"run": 1})
+        source.queue.put_nowait({"logs": ["a"]})
+        assert await first.__anext__() == {"run": 1}
+        assert await first.__anext__() == {"logs": ["a"]}
+
+        late = coalescer.astream("key", source.start)
+        assert await late.__anext__() == {"coalesced": {"subscribers": 2}}
+        assert await late.__anext__() == {"run": 1}
+        assert await late.__anext__() == {"logs": ["a"]}
+
+        source.queue.put_nowait({"logs": ["b"]})
+        source.queue.put_nowait(None)
+        assert [event async for event in first] == [{"logs": ["b"]}]
+        assert [event async for event in late] == [{"logs": ["b"]}]
+        assert source.started == 1
+        assert coalescer.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_the_run_is_cancelled_only_when_the_last_subscriber_leaves():
+    async def scenario():
+        coalescer = RunCoalescer()
+        source = Source()
+
+        first = coalescer.astream("key", source.start)
+        second = coalescer.astream("key", source.start)
+        source.queue.put_nowait({"run": 1})
+        assert await first.__anext__() == {"run": 1}
+        assert await second.__anext__() == {"coalesced": {"subscribers": 2}}
+
+        await first.aclose()
+        await asyncio.sleep(0)
+        assert not source.cancelled
+        assert coalescer.in_flight == 1
+
+        source.queue.put_nowait({"logs": ["still running"]})
+        assert await second.__anext__() == {"run": 1}
+        assert await second.__anext__() == {"logs": ["still running"]}
+
+        await second.aclose()
+        await asyncio.sleep(0)
+        assert source.cancelled
+        assert coalescer.in_flight == 0
+
+        # The next request starts a new run
+        third = coalescer.astream("key", source.start)
+        source.queue.put_nowait({"run": 2})
+        assert await third.__anext__() == {"run": 2}
+        assert source.started == 2
+        await third.aclose()
+
+    asyncio.run(scenario())
@@ -0,0 +1,26 @@
+from core.dependencies import infer_file_dependencies, ready_files, topological_waves
+
+FILES = ["index.html", "a.js", "b.js", "style.css"]
+
+
+def test_scripts_and_styles_wait_for_the_pages():
+    dependencies = infer_file_dependencies({"index.html": "Links style.css and a.js."}, FILES)
+
+    assert dependencies["index.html"] == []
+    assert dependencies["style.css"] == ["index.html"]
+    assert topological_waves(FILES, dependencies) == [["index.html"], ["a.js", "b.js", "style.css"]]
+
+
+def test_a_cycle_is_broken_in_the_planners_order():
+    plans = {"a.js": "import { y } from 'b.js'", "b.js": "import { x } from 'a.js'"}
+
+    dependencies = infer_file_dependencies(plans, FILES)
+
+    # b.js was planned after a.js, so its edge back to a.js is dropped
+    assert dependencies["a.js"] == ["index.html", "b.js"]
+    assert dependencies["b.js"] == ["index.html"]
+    assert topological_waves(FILES, dependencies) == [["index.html"], ["b.js", "style.css"], ["a.js"]]
+
+
+def test_a_cycle_that_slipped_through_does_not_stall():
+    assert ready_files(["a.js", "b.js"], {"a.js": ["b.js"], "b.js": ["a.js"]}, []) == ["a.js"]
@@ -0,0 +1,50 @@
+from core.json_stream import JSONObjectStream, parse_json_object
+
+
+def test_pairs_are_returned_as_soon_as_they_are_complete():
+    stream = JSONObjectStream()
+
+    assert stream.feed('```json\n{"index.html": "<p>hi</p>", "style.css"') == [
+        ("index.html", "<p>hi</p>")
+    ]
+    assert stream.feed(': "body {}"}\n```') == [("style.css", "body {}")]
+    assert stream.finish() == []
+    assert stream.repairs == []
+
+
+def test_trailing_commas_are_ignored():
+    assert parse_json_object('{"a": 1, "b": [1, 2,], "c": {"x": "a,]", "y": [3,],}, }') == {
+        "a": 1,
+        "b": [1, 2],
+        "c": {"x": "a,]", "y": [3]},
+    }
+
+
+def test_a_truncated_string_is_closed():
+    stream = JSONObjectStream()
+
+    pairs = stream.feed('{"a.html": "x", "b.css": "body {\\n  col')
+
+    assert pairs == [("a.html", "x")]
+    assert stream.finish() == [("b.css", "body {\n  col")]
+    assert stream.repairs == ["truncated response", "closed the value of 'b.css'"]
+
+
+def test_truncated_brackets_are_closed():
+    assert parse_json_object('{"a": {"x": [1, 2,') == {"a": {"x": [1, 2]}}
+
+
+def test_a_value_cut_before_it_starts_is_dropped():
+    stream = JSONObjectStream()
+    stream.feed('{"a": 1, "b": ')
+
+    assert stream.finish() == []
+    assert stream.repairs == ["truncated response"]
+
+
+def test_text_without_an_object_is_reported():
+    stream = JSONObjectStream()
+    stream.feed("Sorry, I cannot do that.")
+
+    assert stream.finish() == []
+    assert stream.repairs == ["no JSON object found"]
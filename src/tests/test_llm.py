@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import RunnableLambda
+
+import core.cache as cache_module
+from agent.llm import CachedLLM
+from core.cache import ResponseCache
+from core.parsers import CriticVerdict
+
+PROMPT = PromptTemplate.from_template("Review {file}.")
+
+
+@pytest.fixture
+def response_cache(tmp_path, monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_DISABLED", raising=False)
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite"))
+    monkeypatch.setattr(cache_module, "_response_cache", cache)
+    return cache
+
+
+def no_tool_call_llm():
+    """A structured-output model whose answer had no tool call to parse."""
+    return CachedLLM(RunnableLambda(lambda _: None), "test-model", 0.0, CriticVerdict)
+
+
+def test_a_missing_structured_output_is_returned_and_not_cached(response_cache):
+    llm = no_tool_call_llm()
+    prompt = PROMPT.invoke({"file": "app.js"})
+
+    assert llm.invoke(prompt) is None
+    assert llm._cache_key(prompt) is not None
+    assert response_cache.get(llm._cache_key(prompt)) is None
+
+
+def test_a_missing_structured_output_is_not_cached_async(response_cache):
+    llm = no_tool_call_llm()
+    prompt = PROMPT.invoke({"file": "app.js"})
+
+    assert asyncio.run(llm.ainvoke(prompt)) is None
+    assert response_cache.get(llm._cache_key(prompt)) is None
@@ -0,0 +1,51 @@
+import pytest
+
+from core.patching import PatchError, apply_search_replace
+
+DRAFT = """function add(a, b) {
+  return a + b;
+}
+
+function sub(a, b) {
+  return a - b;
+}
+"""
+
+
+def patch(search, replace):
+    return f"<<<<<<< SEARCH\n{search}\n=======\n{replace}\n>>>>>>> REPLACE"
+
+
+def test_a_unique_block_is_replaced():
+    result = apply_search_replace(DRAFT, patch("  return a - b;", "  return b - a;"))
+
+    assert "return b - a;" in result
+    assert "return a + b;" in result
+
+
+def test_indentation_differences_still_match():
+    result = apply_search_replace(DRAFT, patch("return a + b;", "  return a + b + 0;"))
+
+    assert "return a + b + 0;" in result
+
+
+def test_a_search_that_is_not_in_the_draft_fails():
+    with pytest.raises(PatchError, match="not found"):
+        apply_search_replace(DRAFT, patch("return a * b;", "return 0;"))
+
+
+def test_a_search_that_matches_twice_fails():
+    with pytest.raises(PatchError, match="ambiguous"):
+        apply_search_replace(DRAFT, patch("(a, b) {", "(x, y) {"))
+
+
+def test_a_loose_match_that_is_found_twice_fails():
+    draft = "if (a) {\n    done();\n}\nif (b) {\n  done();\n}\n"
+    # Not an exact match (trailing spaces), but two once whitespace is ignored
+    with pytest.raises(PatchError, match="ambiguous"):
+        apply_search_replace(draft, patch("done();  \n}", "stop();\n}"))
+
+
+def test_a_response_without_blocks_fails():
+    with pytest.raises(PatchError, match="No SEARCH/REPLACE blocks"):
+        apply_search_replace(DRAFT, "Here is the fixed code: ...")
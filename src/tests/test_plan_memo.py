@@ -0,0 +1,36 @@
+from core.plan_memo import PlanMemo
+
+COUNTER = "a counter app with an increment button and a decrement button"
+WEATHER = "weather dashboard with a 5-day forecast"
+
+
+def make_memo(tmp_path):
+    memo = PlanMemo(str(tmp_path / "plans.sqlite"))
+    for query in (COUNTER, WEATHER):
+        memo.remember(query, {"project_title": query})
+    return memo
+
+
+def test_the_same_app_in_other_words_reuses_its_plan(tmp_path):
+    memo = make_memo(tmp_path)
+
+    match = memo.lookup("Build a counter with an increment button and a decrement button")
+
+    assert match is not None
+    assert match["plan"]["project_title"] == COUNTER
+
+
+def test_a_request_with_an_extra_feature_is_planned_again(tmp_path):
+    memo = make_memo(tmp_path)
+
+    assert memo.lookup(
+        "a counter app with an increment button, a decrement button and a reset button"
+    ) is None
+    assert memo.lookup("weather dashboard with a 7-day forecast") is None
+
+
+def test_list_and_page_are_not_stop_words(tmp_path):
+    memo = PlanMemo(str(tmp_path / "plans.sqlite"))
+    memo.remember("recipe page", {"project_title": "recipe page"})
+
+    assert memo.lookup("recipe list") is None
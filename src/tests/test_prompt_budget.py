@@ -0,0 +1,58 @@
+from core.prompt_budget import compact_correction_input, elide_draft, restore_omitted_lines
+from core.prompts import OMITTED_LINES_NOTE_FULL
+
+
+def make_draft(blocks=40):
+    """A stylesheet with one rule per block, the critique is about rule 20."""
+    return "\n\n".join(f".rule-{i} {{\n  margin: {i}px;\n  padding: {i}px;\n}}" for i in range(blocks))
+
+
+CRITIQUE = "- '.rule-20' must use a padding of 0."
+
+
+def test_full_rewrites_get_the_critiqued_region_only():
+    draft = make_draft()
+    prompt_input = {
+        "current_file": "style.css",
+        "file_plan": "1. Style the rules.",
+        "critique": CRITIQUE,
+        "current_code_draft": draft,
+    }
+
+    compacted, report = compact_correction_input(prompt_input, "full")
+
+    assert report["draft_elided"]
+    assert report["tokens_after"] < report["tokens_before"]
+    shown = compacted["current_code_draft"]
+    assert shown.startswith(OMITTED_LINES_NOTE_FULL)
+    assert ".rule-20 {" in shown
+    assert ".rule-30 {" not in shown
+
+
+def test_copied_marker_lines_are_filled_back_in():
+    draft = make_draft()
+    shown = elide_draft(draft, CRITIQUE, 200)
+    rewrite = shown.replace("padding: 20px;", "padding: 0;")
+
+    restored = restore_omitted_lines(rewrite, draft, shown)
+
+    assert restored == draft.replace("padding: 20px;", "padding: 0;")
+
+
+def test_a_dropped_marker_line_is_rejected():
+    draft = make_draft()
+    shown = elide_draft(draft, CRITIQUE, 200)
+    # The model left out the last gap: its lines would be lost
+    lines = shown.split("\n")
+    last_marker = max(i for i, line in enumerate(lines) if line.endswith("omitted] ..."))
+    rewrite = "\n".join(lines[:last_marker] + lines[last_marker + 1 :])
+
+    assert restore_omitted_lines(rewrite, draft, shown) is None
+
+
+def test_a_marker_copied_wrong_is_rejected():
+    draft = make_draft()
+    shown = elide_draft(draft, CRITIQUE, 200)
+    rewrite = shown.replace("] ...", "]", 1)
+
+    assert restore_omitted_lines(rewrite, draft, shown) is None
@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+from agent.scheduler import RunScheduler, SchedulerBusy
+
+
+def gated_run(gate: asyncio.Event, name: str):
+    async def events():
+        yield {"run": name}
+        await gate.wait()
+        yield {"done": name}
+
+    return events
+
+
+def test_runs_wait_for_a_slot_and_a_full_queue_refuses_more():
+    async def scenario():
+        scheduler = RunScheduler(max_running=1, max_queued=1)
+        gate = asyncio.Event()
+
+        first = scheduler.astream(gated_run(gate, "first"))
+        assert await first.__anext__() == {"run": "first"}
+
+        second = scheduler.astream(gated_run(gate, "second"))
+        assert await second.__anext__() == {"queue": {"position": 1, "running": 1, "queued": 1}}
+
+        third = scheduler.astream(gated_run(gate, "third"))
+        with pytest.raises(SchedulerBusy):
+            await third.__anext__()
+        assert scheduler.queued == 1
+
+        # The first run ends and hands its slot to the waiting one
+        gate.set()
+        assert [event async for event in first] == [{"done": "first"}]
+        assert await second.__anext__() == {"queue": {"position": 0, "running": 1, "queued": 0}}
+        assert [event async for event in second] == [{"run": "second"}, {"done": "second"}]
+        assert scheduler.running == 0
+
+    asyncio.run(scenario())
+
+
+def test_a_waiting_run_that_gives_up_leaves_the_queue():
+    async def scenario():
+        scheduler = RunScheduler(max_running=1, max_queued=1)
+        gate = asyncio.Event()
+
+        first = scheduler.astream(gated_run(gate, "first"))
+        await first.__anext__()
+        second = scheduler.astream(gated_run(gate, "second"))
+        await second.__anext__()
+
+        await second.aclose()
+        assert scheduler.queued == 0
+
+        gate.set()
+        assert [event async for event in first] == [{"done": "first"}]
+        assert scheduler.running == 0
+
+    asyncio.run(scenario())
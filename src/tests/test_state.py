@@ -0,0 +1,17 @@
+from agent.state import drop_queued_files, merge_workspace_writes
+
+
+def test_queued_files_are_dropped_in_any_batching():
+    queue = ["index.html", "style.css", "app.js", "util.js"]
+    writes = [["index.html"], ["app.js", "style.css"]]
+
+    one_batch = drop_queued_files(queue, writes)
+    two_batches = drop_queued_files(drop_queued_files(queue, writes[:1]), writes[1:])
+
+    assert one_batch == two_batches == ["util.js"]
+
+
+def test_per_file_writes_merge_without_overwriting_each_other():
+    merged = merge_workspace_writes({"index.html": "a"}, [{"style.css": "b"}, None, {"app.js": "c"}])
+
+    assert merged == {"index.html": "a", "style.css": "b", "app.js": "c"}
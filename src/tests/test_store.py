@@ -0,0 +1,82 @@
+import os
+
+from core.store import (
+    MANIFEST_LOG_NAME,
+    MANIFEST_NAME,
+    WorkspaceStore,
+    load_manifest,
+    save_workspace_to_disk,
+)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_unrelated_files_survive_a_save(tmp_path):
+    out = tmp_path / "project"
+    (out / ".git").mkdir(parents=True)
+    (out / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (out / ".env").write_text("SECRET=1\n")
+    (out / "notes.txt").write_text("mine")
+
+    save_workspace_to_disk({"index.html": "<p>v1</p>", "js/app.js": "let a = 1;"}, str(out))
+
+    assert read(out / ".git" / "HEAD") == "ref: refs/heads/main\n"
+    assert read(out / ".env") == "SECRET=1\n"
+    assert read(out / "notes.txt") == "mine"
+    assert read(out / "index.html") == "<p>v1</p>"
+    assert read(out / "js" / "app.js") == "let a = 1;"
+
+
+def test_files_of_an_earlier_save_are_replaced_or_dropped(tmp_path):
+    out = tmp_path / "project"
+    save_workspace_to_disk({"index.html": "<p>v1</p>", "old.js": "x"}, str(out))
+    (out / "js").mkdir()
+    (out / "js" / "user.js").write_text("kept")
+
+    result = save_workspace_to_disk({"index.html": "<p>v2</p>"}, str(out))
+
+    assert read(out / "index.html") == "<p>v2</p>"
+    assert not os.path.exists(out / "old.js")
+    assert read(out / "js" / "user.js") == "kept"
+    assert load_manifest(str(out)) == result.manifest
+    assert set(result.manifest) == {"index.html"}
+    assert os.path.exists(out / MANIFEST_NAME)
+
+
+def test_a_workspace_file_overwrites_an_unmanaged_file_of_the_same_name(tmp_path):
+    out = tmp_path / "project"
+    out.mkdir()
+    (out / "index.html").write_text("hand written")
+
+    save_workspace_to_disk({"index.html": "<p>generated</p>"}, str(out))
+
+    assert read(out / "index.html") == "<p>generated</p>"
+
+
+def test_streamed_files_are_appended_to_the_manifest_log(tmp_path):
+    out = tmp_path / "project"
+    store = WorkspaceStore(str(out))
+
+    assert store.save_file("index.html", "<p>v1</p>")
+    assert store.save_file("index.html", "<p>v2</p>")
+    assert not store.save_file("index.html", "<p>v2</p>")
+    assert store.save_file("js/app.js", "let a = 1;")
+
+    assert not os.path.exists(out / MANIFEST_NAME)
+    assert len(read(out / MANIFEST_LOG_NAME).splitlines()) == 3
+    assert load_manifest(str(out)) == store.manifest
+    assert not WorkspaceStore(str(out)).save_file("js/app.js", "let a = 1;")
+
+
+def test_a_full_save_folds_the_manifest_log_into_the_manifest(tmp_path):
+    out = tmp_path / "project"
+    WorkspaceStore(str(out)).save_file("old.js", "x")
+
+    result = save_workspace_to_disk({"index.html": "<p>v1</p>"}, str(out))
+
+    assert not os.path.exists(out / "old.js")
+    assert not os.path.exists(out / MANIFEST_LOG_NAME)
+    assert load_manifest(str(out)) == result.manifest
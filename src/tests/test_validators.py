@@ -0,0 +1,45 @@
+from core.validators import validate_code, validate_css, validate_javascript
+
+
+def test_valid_javascript_passes():
+    code = (
+        "const re = /ab[/]c/g;\n"
+        "const ratio = a / b / c;\n"
+        "const label = `${items.length} items`;\n"
+        "// a comment with an unmatched ( bracket\n"
+        "function f() { return [1, 2]; }\n"
+    )
+    assert validate_javascript(code) == []
+
+
+def test_a_division_after_a_postfix_increment_is_not_a_regex():
+    code = "let i = 0;\nconst h = i++ / 2;\nconst k = a[i]-- / 3;\nconst r = x + /ab/.test(y);\n"
+    assert validate_javascript(code) == []
+
+
+def test_an_unclosed_string_is_reported():
+    assert validate_javascript("const a = 'abc;\nfoo();") == ["Line 1: unterminated string."]
+
+
+def test_an_unclosed_template_substitution_is_reported():
+    assert validate_javascript("const t = `hi ${name;") == [
+        "Line 1: template substitution '${' is never closed."
+    ]
+
+
+def test_a_mismatched_bracket_is_reported_where_it_is():
+    assert validate_javascript("function f() {\n  return [1, 2;\n}") == ["Line 3: unexpected '}'."]
+
+
+def test_an_unclosed_css_rule_is_reported():
+    assert validate_css(".a {\n  color: red;\n") == ["Line 1: '{' is never closed."]
+
+
+def test_an_unclosed_css_string_and_comment_are_reported():
+    assert validate_css(".a {\n  content: \"x;\n}") == ["Line 2: unterminated string."]
+    assert validate_css("/* open\n.a {}") == ["Line 1: unterminated comment."]
+
+
+def test_files_are_checked_by_extension():
+    assert validate_code("style.css", ".a { color: red; }") == []
+    assert validate_code("app.js", "if (a) { b();") == ["Line 1: '{' is never closed."]